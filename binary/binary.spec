@@ -6,7 +6,7 @@ block_cipher = None
 a = Analysis(['../dcos_management/cli.py'],
              pathex=[os.getcwd(), 'env/lib/python2.7/site-packages', 'cli/env/lib/python2.7/site-packages'],
              binaries=None,
-            datas=[],
+            datas=[('../dcos_management/shell/*', 'dcos_management/shell')],
              hiddenimports=[],
              hookspath=[],
              runtime_hooks=[],
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from dcos import util
+
+DEFAULT_TTL = 30
+"""Default time to live of cached master state, in seconds"""
+
+logger = util.get_logger(__name__)
+
+
+def get_cache_dir():
+    """
+    :returns: directory holding cached master state, next to dcos config
+    :rtype: string
+    """
+    return os.path.join(os.path.dirname(util.get_config_path()),
+                        'management', 'cache')
+
+
+def get_ttl():
+    """
+    :returns: TTL from `management.cache_ttl` dcos config, or default
+    :rtype: int
+    """
+    ttl = util.get_config().get('management.cache_ttl')
+    if ttl is None:
+        return DEFAULT_TTL
+    return int(ttl)
+
+
+class Cache(object):
+    """ On-disk cache of master datasets, keyed by cluster URL
+
+    :param url: cluster URL
+    :type url: string
+    :param ttl: seconds a cached dataset stays fresh
+    :type ttl: int
+    :param refresh: ignore cached datasets, still store fetched ones
+    :type refresh: boolean
+    :param directory: cache root directory
+    :type directory: string
+    """
+
+    def __init__(self, url, ttl=DEFAULT_TTL, refresh=False, directory=None):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        self.path = os.path.join(directory or get_cache_dir(), key)
+        self.url = url
+        self.ttl = ttl
+        self.refresh = refresh
+
+    def _dataset_path(self, name):
+        return os.path.join(self.path, name + '.json')
+
+    def load(self, name):
+        """
+        :param name: dataset name
+        :type name: string
+        :returns: cached dataset if fresh, else None
+        :rtype: dict
+        """
+        if self.refresh:
+            return None
+        try:
+            with open(self._dataset_path(name)) as f:
+                entry = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if entry.get('url') != self.url:
+            return None
+        if time.time() - entry.get('fetched', 0) > self.ttl:
+            return None
+        logger.info('Serving %s from cache %s', name, self.path)
+        return entry['data']
+
+    def store(self, name, data):
+        """ Atomically write a dataset to the cache
+
+        :param name: dataset name
+        :type name: string
+        :param data: dataset
+        :type data: dict
+        """
+        util.ensure_dir_exists(self.path)
+        entry = {'url': self.url, 'fetched': time.time(), 'data': data}
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix='.' + name)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.rename(tmp, self._dataset_path(name))
+        except (IOError, OSError) as e:
+            logger.exception(e)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def invalidate(self):
+        """ Drop every cached dataset of the cluster """
+        shutil.rmtree(self.path, ignore_errors=True)
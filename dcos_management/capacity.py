@@ -0,0 +1,213 @@
+"""Capacity of a cluster during maintenance windows
+
+Resources of registered agents are loaded from the master state summary
+into arrays, one row per agent and one column per scalar resource type.
+For every window, the capacity unavailable at the worst moment of the
+window is computed at once for all windows, in O(n log n) of windows:
+vectorized with numpy when available, with plain python loops otherwise.
+"""
+import bisect
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from dcos import mesos
+from dcos.errors import DCOSException
+from dcos_management import schedule
+from dcos_management.machines import MachineId
+from dcos_management.sources import SCALAR_RESOURCES as RESOURCES
+
+NEVER = 2 ** 63 - 1
+"""End of windows without duration, in nanoseconds"""
+
+
+def parse_percent(value):
+    """
+    :param value: a percentage, as "20" or "20%"
+    :type: string
+    :returns: the percentage
+    :rtype: float
+    """
+    try:
+        percent = float(value.rstrip('%'))
+    except ValueError:
+        raise DCOSException("Invalid percentage: " + value)
+    if not 0 <= percent <= 100:
+        raise DCOSException("Invalid percentage: " + value)
+    return percent
+
+
+def _end(window):
+    end = schedule.window_end(window)
+    return NEVER if end is None else end
+
+
+def _prefix(rows, columns):
+    sums = [[0.0] * columns]
+    for row in rows:
+        sums.append([a + b for a, b in zip(sums[-1], row)])
+    return sums
+
+
+def _peaks(starts, ends, lost):
+    # lost[j] is unavailable from starts[j] to ends[j]. Unavailable capacity
+    # only grows when a window starts: the worst moment of window i is the
+    # start of a window starting while i runs. Capacity unavailable at a
+    # start is the capacity of windows started minus the one of windows
+    # ended, as prefix sums over windows sorted by start and by end.
+    if numpy is not None:
+        starts = numpy.asarray(starts, dtype=numpy.int64)
+        ends = numpy.asarray(ends, dtype=numpy.int64)
+        lost = numpy.asarray(lost, dtype=numpy.float64)
+        by_start = numpy.argsort(starts, kind='mergesort')
+        sorted_starts, sorted_ends = starts[by_start], numpy.sort(ends)
+        zero = numpy.zeros((1, lost.shape[1]))
+        started = numpy.vstack([zero, numpy.cumsum(lost[by_start], axis=0)])
+        ended = numpy.vstack([zero, numpy.cumsum(lost[numpy.argsort(ends, kind='mergesort')],
+                                                 axis=0)])
+        at_start = (started[numpy.searchsorted(sorted_starts, sorted_starts, 'right')] -
+                    ended[numpy.searchsorted(sorted_ends, sorted_starts, 'right')])
+        # windows starting while window i runs are a range of the start order
+        lo = numpy.searchsorted(sorted_starts, starts, 'left')
+        hi = numpy.searchsorted(sorted_starts, ends, 'left')
+        bounds = numpy.column_stack([lo, hi]).ravel()
+        peaks = numpy.maximum.reduceat(numpy.vstack([at_start, zero]), bounds, axis=0)[::2]
+        peaks[hi <= lo] = 0
+        return peaks.tolist()
+
+    n, columns = len(starts), len(lost[0])
+    by_start = sorted(range(n), key=lambda j: starts[j])
+    by_end = sorted(range(n), key=lambda j: ends[j])
+    sorted_starts = [starts[j] for j in by_start]
+    sorted_ends = [ends[j] for j in by_end]
+    started = _prefix([lost[j] for j in by_start], columns)
+    ended = _prefix([lost[j] for j in by_end], columns)
+    at_start = [[a - b for a, b in zip(started[bisect.bisect_right(sorted_starts, t)],
+                                       ended[bisect.bisect_right(sorted_ends, t)])]
+                for t in sorted_starts]
+    peaks = []
+    for i in range(n):
+        running = at_start[bisect.bisect_left(sorted_starts, starts[i]):
+                           bisect.bisect_left(sorted_starts, ends[i])]
+        peaks.append([max(c) for c in zip(*running)] if running else [0.0] * columns)
+    return peaks
+
+
+class Capacity(object):
+    """ Resources and used resources of registered agents
+
+    :param state_summary: master state summary, with agent resources
+    :type state_summary: dict
+    """
+
+    def __init__(self, state_summary):
+        self.rows = {}
+        self.resources = []
+        self.used = []
+        for agent in (state_summary or {}).get('slaves', []):
+            key = MachineId(agent['hostname'], mesos.parse_pid(agent['pid'])[1])
+            if key in self.rows:
+                continue
+            self.rows[key] = len(self.resources)
+            resources = agent.get('resources') or {}
+            used = agent.get('used_resources') or {}
+            # first column counts agents
+            self.resources.append([1] + [float(resources.get(r) or 0) for r in RESOURCES])
+            self.used.append([float(used.get(r) or 0) for r in RESOURCES])
+        columns = len(RESOURCES) + 1
+        self.total = [sum(row[c] for row in self.resources) for c in range(columns)]
+        self.total_used = [sum(row[c] for row in self.used) for c in range(len(RESOURCES))]
+        if numpy is not None:
+            # explicit shape: without agents, still a column per resource
+            self.resources = numpy.array(self.resources, dtype=numpy.float64).reshape(
+                len(self.resources), columns)
+
+    def _lost(self, windows):
+        # agent rows and windows they belong to
+        rows, owners = [], []
+        index = self.rows
+        for i, window in enumerate(windows):
+            for m in window['machine_ids']:
+                # plain tuples are equal to, and hash as, MachineId keys
+                row = index.get((m.get('hostname'), m.get('ip')))
+                if row is not None:
+                    rows.append(row)
+                    owners.append(i)
+        columns = len(RESOURCES) + 1
+        if numpy is not None:
+            resources = self.resources[numpy.array(rows, dtype=numpy.int64)]
+            owners = numpy.array(owners, dtype=numpy.int64)
+            return numpy.column_stack([
+                numpy.bincount(owners, weights=resources[:, c], minlength=len(windows))
+                for c in range(columns)])
+        lost = [[0.0] * columns for _ in windows]
+        for row, i in zip(rows, owners):
+            for c in range(columns):
+                lost[i][c] += self.resources[row][c]
+        return lost
+
+    def impact(self, scheduled, now):
+        """
+        :param scheduled: a schedule, or None
+        :type: dict
+        :param now: windows ended before now are left out, in nanoseconds
+        :type: long
+        :returns: for every window, in schedule order, agents and share of
+                  every resource unavailable at the worst moment of the
+                  window, and share of the remaining resources the current
+                  usage needs
+        :rtype: list of dict
+        """
+        windows = [w for w in schedule.windows(scheduled) if _end(w) > now]
+        if not windows:
+            return []
+        starts = [schedule.unavailability_key(w)[0] for w in windows]
+        ends = [_end(w) for w in windows]
+        peaks = _peaks(starts, ends, self._lost(windows))
+
+        impact = []
+        for window, start, peak in zip(windows, starts, peaks):
+            duration = schedule.unavailability_key(window)[1]
+            row = {"start": start // 1000000000,
+                   "duration": duration // 1000000000 if duration is not None else None,
+                   "hosts": int(round(peak[0]))}
+            for c, r in enumerate(RESOURCES):
+                total, lost = self.total[c + 1], peak[c + 1]
+                row[r + "_lost"] = round(100 * lost / total, 1) if total else 0.0
+                remaining = total - lost
+                row[r + "_used"] = (round(100 * self.total_used[c] / remaining, 1)
+                                    if remaining else None)
+            impact.append(row)
+        return impact
+
+
+def exceeded(impact, max_loss):
+    """
+    :param impact: windows impact, as `Capacity.impact` returns it
+    :type: list of dict
+    :param max_loss: max share of any resource allowed to be lost, in percent
+    :type: float
+    :returns: windows losing more, along with the resource lost the most
+    :rtype: list of (dict, string)
+    """
+    result = []
+    for row in impact:
+        worst = max(RESOURCES, key=lambda r: row[r + "_lost"])
+        if row[worst + "_lost"] > max_loss:
+            result.append((row, worst))
+    return result
+
+
+def describe(row, resource):
+    """
+    :param row: impact of a window
+    :type: dict
+    :param resource: resource to report
+    :type: string
+    :returns: one line summary of the window impact
+    :rtype: string
+    """
+    return "window starting at {} for {}s: {} host(s), {}% of {} unavailable".format(
+        row['start'], row['duration'], row['hosts'], row[resource + "_lost"], resource)
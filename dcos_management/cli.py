@@ -2,49 +2,177 @@
 
 Usage:
     dcos management --info
-    dcos management maintenance list [--json]
-    dcos management maintenance up ( <hostname>... | --all)
-    dcos management maintenance down <hostname>...
-    dcos management maintenance schedule add [--start=<date>] [--duration=<duration>] [<hostname>...]
-    dcos management maintenance schedule remove  ( [<hostname>...] | --all)
+    dcos management serve [--interval=<secs>] [--expired [--older-than=<secs>]]
+    dcos management maintenance list [--json | --ndjson] [--columns=<columns>] [--sort-by=<column>] [--state=<states>] [--host=<pattern>] [--expired | --active] [--starting-before=<time>] [--starting-after=<time>] [--clusters=<names> | --all-clusters] [--no-cache | --refresh | --snapshot=<file>]
+    dcos management maintenance list --watch [--interval=<secs>]
+    dcos management maintenance timeline [--json] [--from=<time>] [--to=<time>] [--step=<secs>] [--no-cache | --refresh | --snapshot=<file>]
+    dcos management maintenance at <time> [--json] [--no-cache | --refresh | --snapshot=<file>]
+    dcos management maintenance progress [<hostname>... | --from-file=<path>] [--json] [--wait-until-empty [--interval=<secs>] [--timeout=<secs>]] [--no-cache | --refresh | --snapshot=<file>]
+    dcos management maintenance up ( <hostname>... | --all | --from-file=<path>) [--chunk-size=<n>] [--parallel=<n>] [--dry-run] [--no-cache | --refresh | --snapshot=<file>]
+    dcos management maintenance down ( <hostname>... | --from-file=<path>) [--max-capacity-loss=<pct>] [--chunk-size=<n>] [--parallel=<n>] [--dry-run] [--no-cache | --refresh | --snapshot=<file>]
+    dcos management maintenance schedule add [--start=<date>] [--duration=<duration>] ( [<hostname>...] | --from-file=<path>) [--max-capacity-loss=<pct>] [--no-cache | --refresh | --snapshot=<file>]
+    dcos management maintenance schedule remove  ( [<hostname>...] | --all | --expired [--older-than=<secs>] | --from-file=<path>) [--no-cache | --refresh | --snapshot=<file>]
+    dcos management maintenance impact [--json] [--max-capacity-loss=<pct>] [--start=<date>] [--duration=<duration>] [<hostname>... | --from-file=<path>] [--no-cache | --refresh | --snapshot=<file>]
+    dcos management maintenance snapshot save <file>
+    dcos management maintenance rollout --wave-size=<size> [--start=<date>] [--duration=<duration>] [--gap=<gap>] ( <hostname>... | --from-file=<path>) [--no-cache | --refresh | --snapshot=<file>]
 
 Options:
     --help           Show this screen
     --version        Show version
+    --from-file=<path>
+                     Read newline-delimited hosts from a file, `-` for stdin
+    --wave-size=<size>
+                     Hosts per rollout wave, as a count or a percentage (e.g. 10%)
+    --gap=<gap>      Seconds between two rollout waves [default: 0]
+    --ndjson         Stream one json record per line
+    --columns=<columns>
+                     Comma separated columns to show (e.g. HOST,STATE)
+    --sort-by=<column>
+                     Column to sort on [default: STATE]
+    --from=<time>    Timeline start, in seconds since epoch. Defaults to now
+    --to=<time>      Timeline end, in seconds since epoch. Defaults to the end
+                     of the last maintenance window
+    --step=<secs>    Timeline bucket length, in seconds [default: 3600]
+    --state=<states>
+                     Only list machines in these comma separated states
+                     (DRAINING, DOWN)
+    --host=<pattern>
+                     Only list machines whose hostname or IP match this
+                     shell-style pattern (e.g. 'agent-1*')
+    --expired        Remove maintenance windows already ended. With `serve`,
+                     after every refresh. With `list`, only list them
+    --active         Only list maintenance windows not ended yet
+    --starting-before=<time>
+                     Only list windows starting before, in seconds since epoch
+    --starting-after=<time>
+                     Only list windows starting at or after, in seconds since
+                     epoch
+    --clusters=<names>
+                     List comma separated clusters attached to the DC/OS CLI
+                     at once, by name or ID
+    --all-clusters   List every cluster attached to the DC/OS CLI at once
+    --max-capacity-loss=<pct>
+                     Refuse windows leaving more than this percentage of any
+                     cluster resource unavailable at once. With `impact`, exit
+                     with status 1 when a window does
+    --chunk-size=<n>
+                     Machines per machine/up or machine/down request, 500 by
+                     default. Refused requests are split until the machines
+                     refused are isolated
+    --parallel=<n>   Requests sent at once, 4 by default
+    --dry-run        Print the master calls, in order, instead of sending them
+    --older-than=<secs>
+                     Only remove windows ended for more than this many seconds
+    --watch          Keep listing changes of maintenance status
+    --wait-until-empty
+                     Wait until no task runs on the machines anymore
+    --timeout=<secs>
+                     Seconds to wait at most, exit with status 1 past them
+    --interval=<secs>
+                     Seconds between two refreshes of maintenance status, of
+                     master state kept by `serve`, or of running tasks
+    --no-cache       Neither read nor write the local cache of master state
+    --refresh        Ignore cached master state and refresh it
+    --snapshot=<file>
+                     Run against a snapshot saved by `snapshot save` instead of
+                     the master, printing POST payloads instead of sending them
+    --profile        With any command, print time spent in each phase, bytes
+                     transferred and records handled, on stderr
+    --trace-file=<file>
+                     With any command, write phases as Chrome trace events
+                     (chrome://tracing, Perfetto)
 """
-# check IP (crappy)
-import socket
-import json
-import time
+import sys
 
-import docopt
-from dcos import cmds, emitting, http, util, mesos
-from dcos.errors import DCOSException
-from dcos_management import constants, tables, maintenance
-from dcoscli.util import decorate_docopt_usage
+from dcos_management import constants
 
-emitter = emitting.FlatEmitter()
-logger = util.get_logger(__name__)
+# heavy modules (dcos stack, requests, docopt...) are imported by the
+# commands that use them, so that `--info`, `--version` and commands run
+# by a `serve` daemon start fast
 
 
 def main():
+    argv = sys.argv[1:]
+    if argv[:2] == ['management', 'complete']:
+        # hidden, run by shell completion on every keypress
+        from dcos_management import completion
+        return completion.main(argv[2:], __doc__)
+    if argv == ['management', '--info']:
+        print(_summary())
+        return 0
+    if '--version' in argv:
+        print('dcos-management version {}'.format(constants.version))
+        return 0
+    argv, profile, trace_file = _profiling_options(argv)
+    if profile or trace_file:
+        return _profiled(argv, profile, trace_file)
+    return _run(argv)
+
+def _run(argv):
+    from dcos.errors import DCOSException
     try:
-        return _main()
+        return _main(argv)
     except DCOSException as e:
-        emitter.publish(e)
+        _publish(e)
         return 1
 
-@decorate_docopt_usage
-def _main():
-    util.configure_process_from_environ()
+def _profiling_options(argv):
+    # accepted by every command, taken out before parsing
+    profile, trace_file, rest = False, None, []
+    args = iter(argv)
+    for arg in args:
+        if arg == '--profile':
+            profile = True
+        elif arg == '--trace-file':
+            trace_file = next(args, None)
+        elif arg.startswith('--trace-file='):
+            trace_file = arg.split('=', 1)[1]
+        else:
+            rest.append(arg)
+    return rest, profile, trace_file
+
+def _profiled(argv, profile, trace_file):
+    from dcos_management import profiling
+    profiling.start()
+    try:
+        with profiling.span("command"):
+            return _run(argv)
+    finally:
+        recorder = profiling.stop()
+        if trace_file:
+            profiling.write_trace(recorder, trace_file)
+        if profile:
+            from dcos_management import tables
+            sys.stderr.write(tables.profile_table(recorder.summary()) + "\n")
+
+def _main(argv):
+    from dcos_management.profiling import span
+    with span("parse arguments"):
+        import docopt
+        try:
+            args = docopt.docopt(__doc__, argv=argv)
+        except docopt.DocoptExit as e:
+            _publish("Command not recognized\n")
+            _publish(e)
+            return 1
 
-    args = docopt.docopt(
-        __doc__,
-        version='dcos-management version {}'.format(constants.version))
+    # commands are run by a warm daemon when one serves the cluster
+    from dcos_management import dispatch
+    with span("dispatch"):
+        status = dispatch.delegate(args)
+    if status is not None:
+        return status
 
+    with span("import dcos"):
+        from dcos import cmds, http, util
+        commands = _cmds()
+    util.configure_process_from_environ()
     http.silence_requests_warnings()
+    return cmds.execute(commands, args)
 
-    return cmds.execute(_cmds(), args)
+def _publish(event):
+    from dcos import emitting
+    emitting.FlatEmitter().publish(event)
 
 
 def _cmds():
@@ -52,6 +180,8 @@ def _cmds():
     :returns: All of the supported commands
     :rtype: [Command]
     """
+    from dcos import cmds
+    from dcos_management import maintenance
 
     return [
         cmds.Command(
@@ -59,33 +189,87 @@ def _cmds():
             arg_keys=[],
             function=_info),
 
+        cmds.Command(
+            hierarchy=['management', 'serve'],
+            arg_keys=['--interval', '--expired', '--older-than'],
+            function=_serve),
+
         cmds.Command(
             hierarchy=['management','maintenance', 'list'],
-            arg_keys=['--json'],
+            arg_keys=['--json', '--ndjson', '--columns', '--sort-by', '--watch', '--interval',
+                      '--state', '--host', '--expired', '--active', '--starting-before',
+                      '--starting-after', '--clusters', '--all-clusters', '--no-cache',
+                      '--refresh', '--snapshot'],
             function=maintenance.list),
 
+        cmds.Command(
+            hierarchy=['management','maintenance', 'timeline'],
+            arg_keys=['--json', '--from', '--to', '--step', '--no-cache', '--refresh', '--snapshot'],
+            function=maintenance.timeline),
+
+        cmds.Command(
+            hierarchy=['management','maintenance', 'at'],
+            arg_keys=['<time>', '--json', '--no-cache', '--refresh', '--snapshot'],
+            function=maintenance.at),
+
+        cmds.Command(
+            hierarchy=['management','maintenance', 'progress'],
+            arg_keys=['<hostname>', '--from-file', '--json', '--wait-until-empty', '--interval',
+                      '--timeout', '--no-cache', '--refresh', '--snapshot'],
+            function=maintenance.progress),
+
         cmds.Command(
             hierarchy=['management','maintenance', 'up'],
-            arg_keys=['<hostname>', '--all'],
+            arg_keys=['<hostname>', '--all', '--from-file', '--chunk-size', '--parallel',
+                      '--dry-run', '--no-cache', '--refresh', '--snapshot'],
             function=maintenance.up),
 
         cmds.Command(
             hierarchy=['management','maintenance', 'down'],
-            arg_keys=['<hostname>'],
+            arg_keys=['<hostname>', '--from-file', '--max-capacity-loss', '--chunk-size',
+                      '--parallel', '--dry-run', '--no-cache', '--refresh', '--snapshot'],
             function=maintenance.down),
 
         cmds.Command(
             hierarchy=['management','maintenance', 'schedule', 'remove'],
-            arg_keys=['<hostname>','--all'],
+            arg_keys=['<hostname>', '--all', '--expired', '--older-than', '--from-file',
+                      '--no-cache', '--refresh', '--snapshot'],
             function=maintenance.flush_schedule),
 
         cmds.Command(
             hierarchy=['management','maintenance', 'schedule', 'add'],
-            arg_keys=['--start', '--duration', '<hostname>'],
+            arg_keys=['--start', '--duration', '<hostname>', '--from-file', '--max-capacity-loss',
+                      '--no-cache', '--refresh', '--snapshot'],
             function=maintenance.schedule_maintenance),
 
+        cmds.Command(
+            hierarchy=['management','maintenance', 'impact'],
+            arg_keys=['--json', '--max-capacity-loss', '--start', '--duration', '<hostname>',
+                      '--from-file', '--no-cache', '--refresh', '--snapshot'],
+            function=maintenance.impact),
+
+        cmds.Command(
+            hierarchy=['management','maintenance', 'snapshot', 'save'],
+            arg_keys=['<file>'],
+            function=maintenance.save_snapshot),
+
+        cmds.Command(
+            hierarchy=['management','maintenance', 'rollout'],
+            arg_keys=['--start', '--duration', '--gap', '--wave-size', '<hostname>', '--from-file', '--no-cache', '--refresh', '--snapshot'],
+            function=maintenance.rollout),
+
     ]
 
+def _serve(interval, expired, older_than):
+    from dcos_management import serve
+    return serve.serve(_cmds(), interval, expired, older_than)
+
+def _summary():
+    return __doc__.split('\n')[0]
+
 def _info():
-    emitter.publish(__doc__.split('\n')[0])
+    _publish(_summary())
     return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
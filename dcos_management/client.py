@@ -0,0 +1,238 @@
+"""HTTP client of the leading mesos master
+
+A single keep-alive session is shared by every request of an invocation.
+The leader URL, learnt from master redirects, is cached on disk for a
+short while so that following invocations go straight to the leader.
+Credentials prompted by dcos http on a 401 are sent on the session from
+then on.
+"""
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from six.moves.urllib.parse import urljoin, urlparse
+
+from dcos import constants, http, mesos, util
+from dcos.errors import DCOSException, DCOSHTTPException
+from dcos_management import cache, profiling
+
+LEADER_TTL = 60
+"""Seconds a discovered leader URL is trusted without redirect"""
+
+MAX_REDIRECTS = 3
+"""Leader redirects followed by a single request"""
+
+RETRIES = 3
+"""Retries of a request answered with 503, as during leader elections"""
+
+BACKOFF = 0.5
+"""Base backoff between two retries, in seconds, doubled on each retry"""
+
+BACKOFF_MAX = 4
+"""Max backoff between two retries, in seconds"""
+
+logger = util.get_logger(__name__)
+
+
+def get_verify():
+    """
+    :returns: whether to verify SSL certs or path to cert(s), from the
+              environment as dcos http does
+    :rtype: bool | str
+    """
+    verify = os.environ.get(constants.DCOS_SSL_VERIFY_ENV)
+    if verify is None:
+        return None
+    if verify.lower() == "true":
+        return True
+    if verify.lower() == "false":
+        return False
+    return verify
+
+
+def backoff(attempt):
+    """
+    :param attempt: retry number, starting at 0
+    :type: int
+    :returns: seconds to wait, full jitter over an exponential backoff
+    :rtype: float
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF * 2 ** attempt))
+
+
+def leader_base(url, location, path):
+    """
+    :param url: redirected request URL
+    :type: string
+    :param location: `Location` header of the redirect
+    :type: string
+    :param path: master endpoint of the request
+    :type: string
+    :returns: base URL of the master the request was redirected to
+    :rtype: string
+    """
+    target = urlparse(urljoin(url, location))
+    base_path = target.path
+    if path and base_path.endswith(path):
+        base_path = base_path[:-len(path)]
+    return "{}://{}{}".format(target.scheme, target.netloc, base_path or "/")
+
+
+class MasterClient(object):
+    """ Client of the leading master, for a single invocation
+
+    :param dcos_client: client of the cluster, configured one by default
+    :type dcos_client: DCOSClient
+    :param no_cache: neither read nor write the cached leader URL
+    :type no_cache: boolean
+    :param cache_dir: cache root directory
+    :type cache_dir: string
+    :param token: ACS token of the cluster, sent on every request
+    :type token: string
+    """
+
+    def __init__(self, dcos_client=None, no_cache=False, cache_dir=None, token=None):
+        dcos_client = dcos_client or mesos.DCOSClient()
+        self.url = dcos_client.master_url('')
+        self.timeout = util.get_config().get('core.timeout') or http.DEFAULT_TIMEOUT
+        self.leader_cache = None
+        if not no_cache:
+            self.leader_cache = cache.Cache(
+                self.url, ttl=LEADER_TTL,
+                directory=os.path.join(cache_dir or cache.get_cache_dir(), 'leader'))
+        self.session = requests.Session()
+        self.session.headers['Accept'] = 'application/json'
+        if token:
+            self.session.headers['Authorization'] = 'token=' + token
+        self.verify = get_verify()
+        self._leader = None
+        # a single prompt for credentials among concurrent requests
+        self._auth_lock = threading.Lock()
+
+    @property
+    def leader(self):
+        """
+        :returns: base URL of the leading master, the configured one until
+                  a redirect tells otherwise
+        :rtype: string
+        """
+        if self._leader is None:
+            with profiling.span("leader lookup"):
+                cached = self.leader_cache.load('leader') if self.leader_cache else None
+            self._leader = cached or self.url
+        return self._leader
+
+    def set_leader(self, leader):
+        self._leader = leader
+        if self.leader_cache:
+            if leader == self.url:
+                self.leader_cache.invalidate()
+            else:
+                self.leader_cache.store('leader', leader)
+
+    def master_url(self, path):
+        """
+        :param path: master endpoint
+        :type: string
+        :returns: URL of the endpoint on the leading master
+        :rtype: string
+        """
+        return urljoin(self.leader, path)
+
+    def get(self, path, **kwargs):
+        return self.request('get', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('post', path, **kwargs)
+
+    def request(self, method, path, **kwargs):
+        """ Send a request to the leading master, following leader redirects
+        and retrying 503s with a jittered backoff.
+
+        :param method: HTTP method
+        :type: string
+        :param path: master endpoint
+        :type: string
+        :param kwargs: additional arguments to requests
+        :type: dict
+        :rtype: Response
+        """
+        with profiling.span("{} {}".format(method.upper(), path)) as span:
+            response = self._request(method, path, **kwargs)
+            if profiling.enabled():
+                sent = len(json.dumps(kwargs['json'])) if 'json' in kwargs else 0
+                span.count(bytes=sent + len(response.content))
+        return response
+
+    def _request(self, method, path, **kwargs):
+        auth = self.session.auth
+        response = self._follow(method, path, **kwargs)
+        if response.status_code == 401:
+            with self._auth_lock:
+                if self.session.auth is auth:
+                    return self._authenticate(method, path, **kwargs)
+            # credentials were resolved by a concurrent request meanwhile
+            response = self._follow(method, path, **kwargs)
+        if not 200 <= response.status_code < 300:
+            raise DCOSHTTPException(response)
+        return response
+
+    def _authenticate(self, method, path, **kwargs):
+        """ Let dcos http prompt for credentials, or use the ones it resolved
+        before, then send them on the session
+
+        :rtype: Response
+        """
+        url = self.master_url(path)
+        response = http.request(method, url, timeout=self.timeout,
+                                verify=self.verify, **kwargs)
+        hostname = urlparse(url).hostname
+        for (host, _), auth in list(http.AUTH_CREDS.items()):
+            if host == hostname:
+                self.session.auth = auth
+                break
+        return response
+
+    def _follow(self, method, path, **kwargs):
+        redirects = 0
+        attempt = 0
+        while True:
+            response = self._send(method, path, **kwargs)
+            location = response.headers.get('Location')
+            if response.is_redirect and location and redirects < MAX_REDIRECTS:
+                redirects += 1
+                leader = leader_base(response.url, location, path)
+                logger.info('Master redirected to leader %s', leader)
+                self.set_leader(leader)
+                continue
+            if response.status_code == 503 and attempt < RETRIES:
+                delay = backoff(attempt)
+                attempt += 1
+                logger.info('Master unavailable, retrying in %.2fs', delay)
+                time.sleep(delay)
+                continue
+            break
+        return response
+
+    def _send(self, method, path, **kwargs):
+        url = self.master_url(path)
+        logger.info('Sending HTTP [%r] to [%r]', method, url)
+        try:
+            return self.session.request(method, url, timeout=self.timeout,
+                                        verify=self.verify,
+                                        allow_redirects=False, **kwargs)
+        except requests.exceptions.ConnectionError as e:
+            if self.leader == self.url:
+                raise DCOSException('URL [{0}] is unreachable: {1}'.format(url, e))
+            # the cached leader is gone, start over from the configured master
+            logger.info('Leader %s unreachable, falling back to %s',
+                        self.leader, self.url)
+            self.set_leader(self.url)
+            return self._send(method, path, **kwargs)
+        except requests.exceptions.Timeout:
+            raise DCOSException('Request to URL [{0}] timed out.'.format(url))
+        except requests.exceptions.RequestException as e:
+            raise DCOSException('HTTP Exception: {}'.format(e))
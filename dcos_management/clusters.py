@@ -0,0 +1,129 @@
+"""Clusters attached to the DC/OS CLI
+
+The DC/OS CLI keeps one config per attached cluster, in
+`~/.dcos/clusters/<cluster id>/dcos.toml`. Commands fanned out to several
+clusters run on a bounded pool of workers: a fleet-wide run takes as long
+as the slowest cluster, and a failing cluster only fails its own result.
+"""
+import os
+
+import toml
+from concurrent import futures
+from six.moves.urllib.parse import urljoin
+
+from dcos.errors import DCOSException
+from dcos_management import dispatch
+
+MAX_WORKERS = 8
+"""Clusters queried at once"""
+
+
+class Cluster(object):
+    """ A cluster attached to the DC/OS CLI, usable as a DCOSClient by
+    `MasterClient`
+
+    :param cluster_id: cluster ID, name of its config directory
+    :type cluster_id: string
+    :param config_path: dcos config of the cluster
+    :type config_path: string
+    """
+
+    def __init__(self, cluster_id, config_path):
+        self.id = cluster_id
+        self.config_path = config_path
+        with open(config_path) as f:
+            config = toml.loads(f.read())
+        self.name = config.get('cluster', {}).get('name') or cluster_id
+        self.token = config.get('core', {}).get('dcos_acs_token')
+        self.url = dispatch.get_master_url(config_path)
+
+    def master_url(self, path):
+        """
+        :param path: master endpoint
+        :type: string
+        :returns: URL of the endpoint on the configured master
+        :rtype: string
+        """
+        if self.url is None:
+            raise DCOSException(
+                "Missing core.dcos_url in config of cluster " + self.name)
+        return urljoin(self.url, path)
+
+
+def get_clusters_dir():
+    """
+    :returns: directory of cluster configs, next to dcos config
+    :rtype: string
+    """
+    return os.path.join(os.path.dirname(dispatch.get_config_path()), 'clusters')
+
+
+def load_clusters(directory=None):
+    """
+    :param directory: directory of cluster configs, DC/OS CLI one by default
+    :type: string
+    :returns: attached clusters, by name
+    :rtype: list of Cluster
+    """
+    directory = directory or get_clusters_dir()
+    if not os.path.isdir(directory):
+        return []
+    clusters = []
+    for cluster_id in os.listdir(directory):
+        path = os.path.join(directory, cluster_id, 'dcos.toml')
+        if os.path.isfile(path):
+            clusters.append(Cluster(cluster_id, path))
+    return sorted(clusters, key=lambda c: c.name)
+
+
+def select(names=None, all_clusters=False, directory=None):
+    """
+    :param names: comma separated cluster names or IDs
+    :type: string
+    :param all_clusters: select every attached cluster
+    :type: boolean
+    :param directory: directory of cluster configs, DC/OS CLI one by default
+    :type: string
+    :returns: selected clusters
+    :rtype: list of Cluster
+    """
+    clusters = load_clusters(directory)
+    if not clusters:
+        raise DCOSException("No cluster attached, see `dcos cluster setup`")
+    if all_clusters:
+        return clusters
+    selected = []
+    for name in names.split(','):
+        name = name.strip()
+        for cluster in clusters:
+            if name in (cluster.name, cluster.id):
+                if cluster not in selected:
+                    selected.append(cluster)
+                break
+        else:
+            raise DCOSException("Unknown cluster: {}. Attached clusters: {}".format(
+                name, ", ".join(c.name for c in clusters)))
+    return selected
+
+
+def fan_out(clusters, function, workers=MAX_WORKERS):
+    """ Run a function against every cluster, at most `workers` at once
+
+    :param clusters: clusters to run against
+    :type: list of Cluster
+    :param function: called with a cluster
+    :type: function
+    :param workers: clusters run at once
+    :type: int
+    :returns: cluster, result and error message (None on success), as
+              clusters complete
+    :rtype: generator of (Cluster, object, string)
+    """
+    with futures.ThreadPoolExecutor(max(1, min(workers, len(clusters)))) as pool:
+        jobs = dict((pool.submit(function, c), c) for c in clusters)
+        for job in futures.as_completed(jobs):
+            try:
+                yield jobs[job], job.result(), None
+            except Exception as e:
+                # a failing cluster never fails the others
+                yield jobs[job], None, str(e) or e.__class__.__name__
@@ -0,0 +1,312 @@
+"""Shell completion of `dcos management`
+
+Completion runs on every keypress: it only loads a few modules of the
+standard library, not even `dispatch`, and never reads the dcos config.
+Commands and options are completed from the usage of the CLI. Hosts
+(hostnames, IPs and agent IDs) are completed from a local index: a file of
+sorted candidates, searched by bisection over a memory map without being
+read, so a query costs a few page reads whatever the size of the cluster.
+A missing or stale index is rebuilt by a background process, or by `serve`
+after every refresh; completion answers from the current one meanwhile.
+An index is kept by dcos config, which identifies the cluster.
+"""
+import hashlib
+import mmap
+import os
+import re
+import sys
+import time
+
+from dcos import constants
+
+INDEX_TTL = 300
+"""Seconds an index of hosts is used before being rebuilt"""
+
+REFRESH_TIMEOUT = 120
+"""Seconds a rebuild may take before another one is started"""
+
+MAX_CANDIDATES = 1000
+"""Hosts offered at most for a prefix"""
+
+SHELLS = ['bash', 'zsh']
+
+_LITERAL = re.compile(r'^[a-z][a-z-]*$')
+_OPTION = re.compile(r'--[a-z][a-z-]*=?')
+
+
+def _config_path():
+    # as dispatch.get_config_path, without the imports of dispatch
+    default = os.path.expanduser(os.path.join("~", constants.DCOS_DIR, 'dcos.toml'))
+    return os.environ.get(constants.DCOS_CONFIG_ENV, default)
+
+
+def get_index_path(config_path=None):
+    """
+    :param config_path: dcos config, the configured one by default
+    :type: string
+    :returns: index of the hosts of the cluster, next to the dcos config
+    :rtype: string
+    """
+    config_path = config_path or _config_path()
+    key = hashlib.sha1(os.path.abspath(config_path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(os.path.dirname(config_path), 'management', 'completion',
+                        key + '.idx')
+
+
+def index_words(agents, status):
+    """
+    :param agents: agents in the (trimmed) state summary format, or None
+    :type: dict
+    :param status: raw maintenance status, or None
+    :type: dict
+    :returns: hostnames, IPs and agent IDs of registered agents and
+              machines under maintenance
+    :rtype: set of string
+    """
+    from dcos import mesos
+
+    words = set()
+    for agent in (agents or {}).get('slaves', []):
+        words.update([agent['hostname'], mesos.parse_pid(agent['pid'])[1], agent['id']])
+    status = status or {}
+    machine_ids = [m['id'] for m in status.get('draining_machines', [])]
+    machine_ids.extend(status.get('down_machines', []))
+    for machine_id in machine_ids:
+        words.update([machine_id.get('hostname'), machine_id.get('ip')])
+    words.discard(None)
+    return words
+
+
+def write_index(path, words):
+    """ Replace an index, atomically
+
+    :param path: index file
+    :type: string
+    :param words: candidates
+    :type: iterable of string
+    """
+    lines = sorted(set(w.encode('utf-8') for w in words if w and '\n' not in w))
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(b''.join(line + b'\n' for line in lines))
+    os.rename(tmp, path)
+
+
+def search(path, prefix, limit=MAX_CANDIDATES):
+    """
+    :param path: index file
+    :type: string
+    :param prefix: prefix of candidates
+    :type: string
+    :param limit: max number of candidates
+    :type: int
+    :returns: candidates starting with prefix, sorted
+    :rtype: list of string
+    """
+    prefix = prefix.encode('utf-8')
+    try:
+        f = open(path, 'rb')
+    except IOError:
+        return []
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            # lo and hi are line starts, lo ends on the first line >= prefix
+            lo, hi = 0, size
+            while lo < hi:
+                start = index.rfind(b'\n', 0, (lo + hi) // 2) + 1
+                end = index.find(b'\n', start)
+                if index[start:end] < prefix:
+                    lo = end + 1
+                else:
+                    hi = start
+            found = []
+            while lo < size and len(found) < limit:
+                end = index.find(b'\n', lo)
+                line = index[lo:end]
+                if not line.startswith(prefix):
+                    break
+                found.append(line.decode('utf-8'))
+                lo = end + 1
+            return found
+        finally:
+            index.close()
+
+
+def refresh_in_background(path, ttl=INDEX_TTL):
+    """ Rebuild a missing or stale index in a detached process, unless one
+    already does
+
+    :param path: index file
+    :type: string
+    :param ttl: seconds an index is used before being rebuilt
+    :type: int
+    :returns: True if a rebuild was started
+    :rtype: boolean
+    """
+    now = time.time()
+    try:
+        if now - os.stat(path).st_mtime < ttl:
+            return False
+    except OSError:
+        pass
+    marker = path + '.refreshing'
+    try:
+        if now - os.stat(marker).st_mtime < REFRESH_TIMEOUT:
+            return False
+        os.remove(marker)
+    except OSError:
+        pass
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except OSError:
+        return False
+    import subprocess
+    with open(os.devnull, 'r+b') as devnull:
+        subprocess.Popen(_command() + ['--refresh'], stdin=devnull, stdout=devnull,
+                         stderr=devnull, close_fds=True,
+                         preexec_fn=getattr(os, 'setsid', None))
+    return True
+
+
+def refresh(path):
+    """ Rebuild an index from the configured cluster. A failed rebuild
+    isn't retried before REFRESH_TIMEOUT
+
+    :param path: index file
+    :type: string
+    """
+    from dcos import util
+    from dcos_management import sources
+    source = sources.MasterSource(token=util.get_config().get('core.dcos_acs_token'))
+    write_index(path, index_words(source.fetch(sources.AGENTS),
+                                  source.fetch(sources.STATUS)))
+    try:
+        os.remove(path + '.refreshing')
+    except OSError:
+        pass
+
+
+def _usage_lines(usage):
+    lines = []
+    in_usage = False
+    for line in usage.splitlines():
+        if line.strip() == 'Usage:':
+            in_usage = True
+        elif in_usage:
+            if not line.strip():
+                break
+            # words after `dcos`
+            lines.append(line.split()[1:])
+    return lines
+
+
+def complete(usage, words, index_path=None):
+    """
+    :param usage: docopt usage of the CLI
+    :type: string
+    :param words: words after `dcos`, the last one being completed
+    :type: list of string
+    :param index_path: index of hosts, None to leave hosts out
+    :type: string
+    :returns: candidates for the last word
+    :rtype: list of string
+    """
+    prefix = words[-1] if words else ""
+    if prefix.startswith('-') and '=' in prefix:
+        # option values aren't completed
+        return []
+    typed = [w for w in words[:-1] if not w.startswith('-')]
+    candidates = set()
+    hosts = False
+    for line in _usage_lines(usage):
+        path = []
+        for token in line:
+            if not _LITERAL.match(token):
+                break
+            path.append(token)
+        if path[:len(typed)] == typed and len(typed) < len(path):
+            candidates.add(path[len(typed)])
+        elif typed[:len(path)] == path:
+            rest = line[len(path):]
+            if len(typed) > len(path) and not any('<' in t for t in rest):
+                # more words typed than the command takes
+                continue
+            if prefix.startswith('-'):
+                candidates.update(_OPTION.findall(" ".join(rest)))
+            elif any(t.strip('([|').startswith('<hostname>') for t in rest):
+                hosts = True
+    found = sorted(c for c in candidates if c.startswith(prefix))
+    if hosts and index_path:
+        found.extend(search(index_path, prefix))
+    return found
+
+
+def _command():
+    # runs `dcos-management management complete`, skipping entry point scripts
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, 'management', 'complete']
+    return [sys.executable, '-m', 'dcos_management.cli', 'management', 'complete']
+
+
+def script(shell):
+    """
+    :param shell: bash or zsh
+    :type: string
+    :returns: completion script of the shell, calling this installation
+    :rtype: string
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'shell', 'dcos-management.' + shell)
+    with open(path) as f:
+        template = f.read()
+    command = " ".join("'{}'".format(arg.replace("'", "'\\''")) for arg in _command())
+    return template.replace('@COMPLETE@', command)
+
+
+def main(args, usage):
+    """ `dcos management complete`, hidden from usage
+
+    :param args: `--script=<shell>`, `--refresh`, or `--` and the words to
+                 complete
+    :type: list of string
+    :param usage: docopt usage of the CLI
+    :type: string
+    :returns: process status
+    :rtype: int
+    """
+    config_path = _config_path()
+    index_path = get_index_path(config_path) if os.path.exists(config_path) else None
+    if args and args[0].startswith('--script='):
+        shell = args[0].split('=', 1)[1]
+        if shell not in SHELLS:
+            sys.stderr.write("Unsupported shell: {}. Supported shells: {}\n".format(
+                shell, ", ".join(SHELLS)))
+            return 1
+        sys.stdout.write(script(shell))
+        return 0
+    if args == ['--refresh']:
+        from dcos.errors import DCOSException
+        try:
+            if index_path:
+                refresh(index_path)
+        except DCOSException as e:
+            sys.stderr.write("{}\n".format(e))
+            return 1
+        return 0
+    if args and args[0] == '--':
+        args = args[1:]
+    candidates = complete(usage, args, index_path)
+    if index_path:
+        refresh_in_background(index_path)
+    if candidates:
+        sys.stdout.write("\n".join(candidates) + "\n")
+    return 0
@@ -4,6 +4,6 @@ version = '0.1.0'
 resource_types = {
 'cpus': 'SCALAR',
 'mem': 'SCALAR',
-'disks': 'SCALAR',
+'disk': 'SCALAR',
 'ports': 'range'
 }
@@ -0,0 +1,154 @@
+"""Lightweight dispatch of commands to a `serve` daemon
+
+Imported on every invocation, before anything else: only the standard
+library, toml and dcos constants are loaded here, so that commands run by a
+daemon don't pay for the imports of the dcos stack.
+"""
+import hashlib
+import json
+import os
+import socket
+import sys
+
+import toml
+from six.moves.urllib.parse import urljoin
+
+from dcos import constants
+from dcos.errors import DCOSException
+
+PROTOCOL = 1
+"""Version of requests and replies"""
+
+CONNECT_TIMEOUT = 0.5
+"""Seconds to wait for the daemon to accept a connection"""
+
+REPLY_TIMEOUT = 600
+"""Seconds to wait for the daemon to run a command"""
+
+
+def get_config_path():
+    """
+    :returns: path to the dcos config, as dcos util finds it
+    :rtype: string
+    """
+    default = os.path.expanduser(os.path.join("~", constants.DCOS_DIR, 'dcos.toml'))
+    return os.environ.get(constants.DCOS_CONFIG_ENV, default)
+
+
+def get_master_url(config_path=None):
+    """
+    :param config_path: dcos config, the configured one by default
+    :type: string
+    :returns: configured master URL, as DCOSClient builds it, None if the
+              config can't tell
+    :rtype: string
+    """
+    try:
+        with open(config_path or get_config_path()) as f:
+            core = toml.loads(f.read()).get('core', {})
+    except Exception:
+        return None
+    if core.get('mesos_master_url'):
+        return urljoin(core['mesos_master_url'], '')
+    if core.get('dcos_url'):
+        return urljoin(core['dcos_url'], 'mesos/')
+    return None
+
+
+def get_socket_path(url):
+    """
+    :param url: cluster URL
+    :type: string
+    :returns: socket of the daemon serving the cluster, next to dcos config
+    :rtype: string
+    """
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(os.path.dirname(get_config_path()),
+                        'management', 'serve-{}.sock'.format(key))
+
+
+def delegated(args):
+    """
+    :param args: parsed command line
+    :type: dict
+    :returns: True if the command can be run by a daemon
+    :rtype: boolean
+    """
+    if not args.get('maintenance') or args.get('snapshot') or args.get('--watch'):
+        return False
+    # long waits would hold the daemon
+    if args.get('--wait-until-empty'):
+        return False
+    if args.get('--clusters') or args.get('--all-clusters'):
+        return False
+    return not (args.get('--snapshot') or args.get('--no-cache') or args.get('--refresh'))
+
+
+def call(path, args):
+    """ Run a command on the daemon listening on `path`
+
+    :param path: daemon socket
+    :type: string
+    :param args: parsed command line
+    :type: dict
+    :returns: reply of the daemon, None if no daemon answered
+    :rtype: dict
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(CONNECT_TIMEOUT)
+        try:
+            client.connect(path)
+        except socket.error:
+            return None
+        client.settimeout(REPLY_TIMEOUT)
+        request = {"protocol": PROTOCOL, "args": args}
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        reply = client.makefile('rb').readline()
+    finally:
+        client.close()
+    if not reply:
+        return None
+    reply = json.loads(reply.decode('utf-8'))
+    if reply.get('protocol') != PROTOCOL:
+        return None
+    return reply
+
+
+def _publish(output):
+    if sys.stdout.isatty():
+        # long output is paged, as any other command does
+        from dcos import emitting
+        emitting.FlatEmitter().publish(output)
+    else:
+        print(output)
+
+
+def delegate(args):
+    """ Run a command on the daemon serving the configured cluster, if any
+
+    :param args: parsed command line
+    :type: dict
+    :returns: process status, None if no daemon ran the command
+    :rtype: int
+    """
+    if not delegated(args):
+        return None
+    url = get_master_url()
+    if url is None or not os.path.exists(get_socket_path(url)):
+        return None
+    if args.get('--from-file'):
+        # the daemon doesn't share our working directory nor stdin
+        from dcos_management.maintenance import read_hosts
+        args = dict(args, **{'<hostname>': list(read_hosts(args['--from-file'])),
+                             '--from-file': None})
+    reply = call(get_socket_path(url), args)
+    if reply is None:
+        return None
+    if reply.get('output'):
+        _publish(reply['output'].rstrip('\n'))
+    if reply.get('errors'):
+        sys.stderr.write(reply['errors'])
+    if reply.get('error'):
+        raise DCOSException(reply['error'])
+    return reply['status']
@@ -0,0 +1,85 @@
+"""Filters of `maintenance list`
+
+Filters are tested as early as the join allows: windows on their
+unavailability, before any machine is joined, and maintenance status
+entries on their raw machine_id, before their agent is looked up.
+"""
+import fnmatch
+import time
+
+from dcos.errors import DCOSException
+from dcos_management import schedule
+
+STATES = ["DRAINING", "DOWN"]
+"""Maintenance states of machines"""
+
+
+def parse_states(states):
+    """
+    :param states: comma separated states, case insensitive, None for all
+    :type: string
+    :returns: states
+    :rtype: list of string
+    """
+    if not states:
+        return STATES
+    parsed = [s.strip().upper() for s in states.split(',')]
+    for state in parsed:
+        if state not in STATES:
+            raise DCOSException("Unknown state: {}. Valid states: {}".format(
+                state, ", ".join(STATES)))
+    return parsed
+
+
+class ListFilter(object):
+    """ Machines and windows to list
+
+    :param states: maintenance states to keep
+    :type states: list of string
+    :param host: shell-style pattern matching hostname or IP
+    :type host: string
+    :param expired: True for ended windows only, False for running or
+                    upcoming ones only, None for both
+    :type expired: boolean
+    :param starting_before: keep windows starting before, in nanoseconds
+    :type starting_before: long
+    :param starting_after: keep windows starting at or after, in nanoseconds
+    :type starting_after: long
+    """
+
+    def __init__(self, states=STATES, host=None, expired=None,
+                 starting_before=None, starting_after=None):
+        self.states = states
+        self.host = host.lower() if host else None
+        self.expired = expired
+        self.starting_before = starting_before
+        self.starting_after = starting_after
+        self.now = time.time() * 1000000000
+
+    def accepts_window(self, window):
+        """
+        :param window: a maintenance window
+        :type: dict
+        :rtype: boolean
+        """
+        start = schedule.unavailability_key(window)[0]
+        if self.starting_before is not None and start >= self.starting_before:
+            return False
+        if self.starting_after is not None and start < self.starting_after:
+            return False
+        if self.expired is not None:
+            end = schedule.window_end(window)
+            if (end is not None and self.now >= end) != self.expired:
+                return False
+        return True
+
+    def accepts_machine(self, machine_id):
+        """
+        :param machine_id: a machine_id
+        :type: MachineId
+        :rtype: boolean
+        """
+        if self.host is None:
+            return True
+        return any(fnmatch.fnmatchcase(value.lower(), self.host)
+                   for value in machine_id if value)
@@ -0,0 +1,105 @@
+"""Static interval tree
+
+Intervals are half-open, `[start, end)`, an `end` of None never ends. The
+tree is centered: every node holds the intervals containing its center,
+sorted by start and by end, smaller intervals go to the left or right
+subtree. Queries walk down a single path and only scan intervals they
+report: O(log n + k) for k intervals found.
+"""
+import bisect
+
+INFINITY = float('inf')
+
+
+def _build(intervals):
+    if not intervals:
+        return None
+    # median start: left and right subtrees hold at most half the intervals
+    starts = sorted(i[0] for i in intervals)
+    center = starts[len(starts) // 2]
+    here, left, right = [], [], []
+    for interval in intervals:
+        if interval[1] <= center:
+            left.append(interval)
+        elif interval[0] > center:
+            right.append(interval)
+        else:
+            here.append(interval)
+    return (center,
+            sorted(here, key=lambda i: i[0]),
+            sorted(here, key=lambda i: i[1], reverse=True),
+            _build(left), _build(right))
+
+
+class IntervalTree(object):
+    """ Intervals built once, queried many times
+
+    :param intervals: (start, end, value) triples
+    :type intervals: iterable of tuple
+    """
+
+    def __init__(self, intervals):
+        intervals = [(start, INFINITY if end is None else end, value)
+                     for start, end, value in intervals]
+        # empty intervals contain nothing
+        intervals = [i for i in intervals if i[0] < i[1]]
+        self._by_start = sorted(intervals, key=lambda i: i[0])
+        self._starts = [i[0] for i in self._by_start]
+        self._root = _build(intervals)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def at(self, point):
+        """
+        :param point: a point in time
+        :type: long
+        :returns: values of intervals containing point
+        :rtype: list
+        """
+        found = []
+        node = self._root
+        while node is not None:
+            center, by_start, by_end, left, right = node
+            if point < center:
+                # every interval of the node ends after center
+                for start, _, value in by_start:
+                    if start > point:
+                        break
+                    found.append(value)
+                node = left
+            else:
+                # every interval of the node starts before center
+                for _, end, value in by_end:
+                    if end <= point:
+                        break
+                    found.append(value)
+                node = right
+        return found
+
+    def overlapping(self, start, end):
+        """
+        :param start: range start
+        :type: long
+        :param end: range end, excluded
+        :type: long
+        :returns: values of intervals overlapping the range: containing its
+                  start, or starting within it
+        :rtype: list
+        """
+        found = self.at(start)
+        first = bisect.bisect_right(self._starts, start)
+        last = bisect.bisect_left(self._starts, end)
+        found.extend(i[2] for i in self._by_start[first:last])
+        return found
+
+    def last_end(self):
+        """
+        :returns: end of the interval ending last, None if one never ends
+                  or the tree is empty
+        :rtype: long
+        """
+        ends = [i[1] for i in self._by_start]
+        if not ends or max(ends) == INFINITY:
+            return None
+        return max(ends)
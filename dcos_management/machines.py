@@ -0,0 +1,200 @@
+"""Machines of a cluster, as immutable records
+
+`MachineId` is the hashable identity of a machine, as mesos machine_ids
+dicts are. `AgentRecord` holds a machine along with its agent ID and
+maintenance state. Both are tuples: they're shared freely between indexes,
+partitions and rows, and never modified.
+"""
+import contextlib
+import gc
+from collections import namedtuple
+
+
+class MachineId(namedtuple('MachineId', ['hostname', 'ip'])):
+    """ Hashable machine_id, equal to the `(hostname, ip)` tuple """
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """
+        :returns: mesos machine_id, fields mesos didn't give left out
+        :rtype: dict
+        """
+        return dict((f, v) for f, v in zip(self._fields, self) if v is not None)
+
+
+class AgentRecord(namedtuple('AgentRecord', ['machine_id', 'id', 'state'])):
+    """ A machine, its agent ID ("" when it isn't registered) and its
+    maintenance state (None when it isn't under maintenance). Records of a
+    same machine share its MachineId.
+    """
+
+    __slots__ = ()
+
+    @property
+    def hostname(self):
+        return self.machine_id.hostname
+
+    @property
+    def ip(self):
+        return self.machine_id.ip
+
+    def tagged(self, state):
+        """
+        :param state: maintenance state
+        :type: string
+        :returns: the same machine, in this maintenance state
+        :rtype: AgentRecord
+        """
+        return AgentRecord(self.machine_id, self.id, state)
+
+    def to_dict(self):
+        """
+        :returns: extended machine_id, as maintenance status rows show it
+        :rtype: dict
+        """
+        return {"hostname": self.hostname, "ip": self.ip,
+                "id": self.id, "state": self.state}
+
+
+def machine_key(machine_id):
+    """
+    :param machine_id: machine_id, or any record or dict holding hostname and ip
+    :type: dict | MachineId | AgentRecord
+    :returns: hashable key identifying the machine
+    :rtype: MachineId
+    """
+    if isinstance(machine_id, MachineId):
+        return machine_id
+    if isinstance(machine_id, AgentRecord):
+        return machine_id.machine_id
+    return MachineId(machine_id.get('hostname'), machine_id.get('ip'))
+
+
+@contextlib.contextmanager
+def building():
+    """ Pause the cyclic garbage collector while records are built in bulk:
+    records never hold cycles, but allocating thousands of them triggers
+    full collections walking the raw master datasets they come from.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class MachineIndex(object):
+    """ Hash based lookups over agents and maintenance status entries
+
+    Every lookup keeps "first match win" semantics of the previous linear
+    scans: when several entries share a key, the first one added is kept.
+    """
+
+    def __init__(self, agents=[], maintenance_status=[]):
+        self._agent_entries = []
+        self._status_entries = []
+        self._hosts = None
+        self._agents = {}
+        self._status = {}
+        self._scheduled = {}
+        # scheduled machines, partitioned by maintenance state
+        self._partitions = {}
+        for agent in agents:
+            self.add_agent(agent)
+        for ms in maintenance_status:
+            self.add_status(ms)
+
+    def _build_hosts(self):
+        # built on first lookup, once maintenance status is known. Agents
+        # always take precedence over maintenance status entries, whatever
+        # the loading order was.
+        self._hosts = {}
+        for entry in self._agent_entries + self._status_entries:
+            keys = list(entry.machine_id)
+            # down agents can't be resolved by their (stale) agent ID
+            status = self._status.get(entry.machine_id, entry)
+            if status.state != "DOWN":
+                keys.append(entry.id)
+            for key in keys:
+                self._hosts.setdefault(key, entry)
+
+    def add_agent(self, agent):
+        """
+        :param agent: a registered agent
+        :type: AgentRecord
+        """
+        self._agents.setdefault(agent.machine_id, agent)
+        self._agent_entries.append(agent)
+        self._hosts = None
+
+    def add_status(self, ms):
+        """
+        :param ms: tagged maintenance status entry
+        :type: AgentRecord
+        """
+        self._status.setdefault(ms.machine_id, ms)
+        self._status_entries.append(ms)
+        self._hosts = None
+
+    def add_scheduled(self, ms):
+        """
+        :param ms: maintenance status entry matching a scheduled window
+        :type: AgentRecord
+        """
+        key = ms.machine_id
+        if key not in self._scheduled:
+            self._scheduled[key] = ms
+            self._partitions.setdefault(ms.state, set()).add(key)
+
+    def find_machine_id(self, host):
+        """
+        :param host: Host to find. Can be ip, hostname of agent ID
+        :type: string
+        :returns: a machine_id
+        :rtype: MachineId
+        """
+        if self._hosts is None:
+            self._build_hosts()
+        entry = self._hosts.get(host)
+        if entry is None:
+            return None
+        return entry.machine_id
+
+    def find_agent(self, machine_id):
+        """
+        :param machine_id: a machine_id
+        :type: dict | MachineId
+        :returns: matching agent if found
+        :rtype: AgentRecord
+        """
+        return self._agents.get(machine_key(machine_id))
+
+    def find_status(self, machine_id):
+        """
+        :param machine_id: a machine_id
+        :type: dict | MachineId
+        :returns: matching maintenance status entry if found
+        :rtype: AgentRecord
+        """
+        return self._status.get(machine_key(machine_id))
+
+    def find_scheduled(self, machine_id):
+        """
+        :param machine_id: a machine_id
+        :type: dict | MachineId
+        :returns: matching scheduled maintenance status entry if found
+        :rtype: AgentRecord
+        """
+        return self._scheduled.get(machine_key(machine_id))
+
+    def scheduled(self, state):
+        """
+        :param state: maintenance state, DRAINING or DOWN
+        :type: string
+        :returns: scheduled machines in this state
+        :rtype: set of MachineId
+        """
+        return self._partitions.get(state, frozenset())
@@ -1,249 +1,860 @@
-import socket
 import json
+import math
+import sys
 import time
+import types
 
+from concurrent import futures
 
-from dcos import emitting, http, util, mesos
-from dcos_management import tables
-from dcos.errors import DCOSException
+from dcos import emitting, util, mesos
+from dcos_management import (cache, filters, intervals, profiling, schedule, sources, submit,
+                             tables, transitions)
+from dcos_management.client import backoff
+from dcos_management.machines import (AgentRecord, MachineId, MachineIndex, building,
+                                      machine_key)
+from dcos_management.sources import (AGENTS, ALL_DATASETS, SCHEDULE, STATUS, TASKS,
+                                     fetch_maintenance_status)
+from dcos.errors import DCOSException, DefaultError
 
 stons = 1000000000
 DEFAULT_DURATION = 3600
+# timeline buckets, in seconds
+DEFAULT_STEP = 3600
+MAX_BUCKETS = 10000
+# seconds between two polls of running tasks
+DEFAULT_PROGRESS_INTERVAL = 5
+
+# mutations must read-modify-write the live schedule
+MUTATION_CACHED_DATASETS = [AGENTS]
+# attempts to update a schedule changing concurrently
+SCHEDULE_RETRIES = 5
 
 emitter = emitting.FlatEmitter()
 logger = util.get_logger(__name__)
 
 # First match win
 # FIXME: be more pedantic on returns
-def find_machine_id(agents, host):
+def find_machine_id(index, host):
     """
-    :param agents: Array of mesos agents properties (machine_id + additional infos)
-    :type: list of dict
+    :param index: Index of mesos agents properties (machine_id + additional infos)
+    :type: MachineIndex
     :param host: Host to find. Can be ip, hostname of agent ID
     :type: string
     :returns: a machine_id
-    :rtype: dict
+    :rtype: MachineId
     """
-    for agent in agents:
-        # down agent
-        if 'state' in agent:
-            if agent['state'] == "DOWN":
-                agent['id'] = ""
-        if host in [agent['hostname'], agent['ip'], agent['id']]:
-            return {"hostname": agent['hostname'], "ip": agent['ip']}
-    return None
+    return index.find_machine_id(host)
 
 def compare_machine_ids( machine_id_a, machine_id_b):
     """
     :param machine_id_a: machine_id
-    :type: dict
+    :type: dict | MachineId
     :param machine_id_a: machine_id
-    :type: dict
+    :type: dict | MachineId
     :return: true if both machine_id match, else False
     :rtype: boolean
     """
-    return machine_id_a['hostname'] == machine_id_b['hostname'] and machine_id_a['ip'] == machine_id_b['ip']
+    return machine_key(machine_id_a) == machine_key(machine_id_b)
 
-def find_matching_agent(agents, machine_id):
+def find_matching_agent(index, machine_id):
     """
-    :param agents: a list machine_id (dict)
-    :type: array of dict
-    :param machine_id: a machine_id dict
-    :type: dict
-    :return: machine_id if found
-    :rtype: dict
+    :param index: Index of agents
+    :type: MachineIndex
+    :param machine_id: a machine_id
+    :type: dict | MachineId
+    :return: agent if found
+    :rtype: AgentRecord
     """
-    for agent in agents:
-        if compare_machine_ids(agent, machine_id):
-            return agent
-    return None
+    return index.find_agent(machine_id)
 
-def lookup_and_tag(machine_ids, state, agents, attribute=None):
+def lookup_and_tag(machine_ids, state, index, attribute=None, accept=None):
     """
-    :param machine_ids: An object containing extended machine ids dicts
+    :param machine_ids: raw maintenance status entries, left untouched
     :type: list of dict
     :param state: State arbitrally associated with machine_ids
     :type: string
-    :param agents: A list of extended machine ids dict from agents list
-    :type: list of dict
+    :param index: Index of agents
+    :type: MachineIndex
     :param attribute: key to locate machine_ids inside `machines_ids`
     :type: string
+    :param accept: machine_ids to tag, others are skipped before lookup
+    :type: function
     :return: tagged agents
-    :rtype: array of dict
+    :rtype: list of AgentRecord
 
     """
     _machine_ids = []
     for m in machine_ids:
         if attribute:
-            machine_id = m[attribute]
+            machine_id = machine_key(m[attribute])
         else:
-            machine_id = m
-        agent = find_matching_agent(agents,machine_id)
+            machine_id = machine_key(m)
+        if accept and not accept(machine_id):
+            continue
+        agent = find_matching_agent(index, machine_id)
         if not agent:
-            machine_id['id'] = ""
-        else:
-            machine_id = agent
-        machine_id['state'] = state
-        _machine_ids.append(machine_id)
+            agent = AgentRecord(machine_id, "", None)
+        _machine_ids.append(agent.tagged(state))
     return _machine_ids
 
-def get_maintenance_status(dcos_client, agents=[]):
+def tag_maintenance_status(req, index, states=filters.STATES, accept=None):
     """
-    :param dcos_client: DCOSClient
-    :type dcos_client: DCOSClient
-    :params hostnames: list of hostnames
-    :type: list
-    :returns: list of dict of maintenance status, list found in maintenance status
-    :rtype: list,list
+    :param req: raw maintenance status
+    :type: dict
+    :param index: Index of agents
+    :type: MachineIndex
+    :param states: states to tag, entries in other states are skipped
+    :type: list of string
+    :param accept: machine_ids to tag, others are skipped before lookup
+    :type: function
+    :returns: maintenance status
+    :rtype: list of AgentRecord
     """
     maintenance_status = []
-    try:
-        url = dcos_client.master_url('maintenance/status')
-        req = http.get(url).json()
-        # XXX: to refactor
-        if 'draining_machines' in req:
-            maintenance_status.extend(lookup_and_tag(req['draining_machines'], "DRAINING", agents, "id"))
-        if 'down_machines' in req:
-            maintenance_status.extend(lookup_and_tag(req['down_machines'], "DOWN", agents, None))
+    if not req:
         return maintenance_status
-    except DCOSException as e:
-        logger.exception(e)
-    except Exception as (e):
-        raise DCOSException("Unable to fetch maintenance status from mesos master: " + str(e))
+    # XXX: to refactor
+    if 'draining_machines' in req and "DRAINING" in states:
+        maintenance_status.extend(lookup_and_tag(req['draining_machines'], "DRAINING", index, "id",
+                                                 accept))
+    if 'down_machines' in req and "DOWN" in states:
+        maintenance_status.extend(lookup_and_tag(req['down_machines'], "DOWN", index, None,
+                                                 accept))
+    return maintenance_status
+
+def get_maintenance_status(client, index):
+    """
+    :param client: client of the leading master
+    :type client: MasterClient
+    :param index: Index of agents
+    :type: MachineIndex
+    :returns: maintenance status
+    :rtype: list of AgentRecord
+    """
+    return tag_maintenance_status(fetch_maintenance_status(client), index)
+
+def read_hosts(path):
+    """
+    :param path: newline-delimited file of hosts, `-` for stdin
+    :type: string
+    :returns: hosts, blank lines and comments skipped
+    :rtype: generator of string
+    """
+    if path == '-':
+        lines = sys.stdin
+    else:
+        lines = _read_lines(path)
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+def _read_lines(path):
+    with util.open_file(path) as f:
+        for line in f:
+            yield line
+
+def get_hosts(hosts, from_file=None):
+    """
+    :param hosts: hosts given on the command line
+    :type: list of string
+    :param from_file: file to read hosts from
+    :type: string
+    :returns: hosts to operate on
+    :rtype: iterable of string
+    """
+    if from_file:
+        return read_hosts(from_file)
+    return hosts
 
-def get_scheduled(dcos_client):
+def is_machine_id(host):
     """
-    :param dcos_client: DCOSClient
-    :type dcos_client: DCOSClient
-    :returns: an object of maintenance schedule
-    :rtype: dict of array
+    :param host: host as given on the command line
+    :type: string
+    :returns: True if host is a raw machine_id json, which doesn't need to
+              be resolved against agents
+    :rtype: boolean
     """
     try:
-        url = dcos_client.master_url('maintenance/schedule')
-        current_scheduled = http.get(url).json()
-        if "windows" not in current_scheduled:
-            return None
-        return current_scheduled
-    except DCOSException as e:
-        logger.exception(e)
-    except Exception:
-        raise DCOSException("Unable to fetch scheduled maintenance windows from mesos master")
+        json.loads(host)
+        return True
+    except ValueError:
+        return False
 
-def get_machine_ids(hosts, agents=[], maintenance_status=[]):
+def summarize_hosts(message, hosts, limit=10):
     """
-    :param host:
-    :type:
-    :param agents:
-    :type:
-    :param maintenance_status: list of dict of maintenance status,
-    :type:
-    :returns: list of  machine_ids
-    :rtype: list of machine_id, dict
+    :param message: what happened to hosts
+    :type: string
+    :param hosts: hosts to report
+    :type: list of string
+    :param limit: max number of hosts to print
+    :type: int
+    :returns: a one line summary
+    :rtype: string
+    """
+    summary = "{} host(s) {}: {}".format(len(hosts), message, ", ".join(hosts[:limit]))
+    if len(hosts) > limit:
+        summary += ", ... ({} more)".format(len(hosts) - limit)
+    return summary
+
+def get_machine_ids(hosts, index):
+    """
+    :param hosts: hosts to resolve, consumed in a single pass
+    :type: iterable of string
+    :param index: Index of agents and maintenance status
+    :type: MachineIndex
+    :returns: list of unique machine_ids
+    :rtype: list of MachineId
     """
     machine_ids = []
-    md = agents + maintenance_status
+    seen = set()
+    malformed = []
+    unresolved = []
     for h in hosts:
         try:
-             machine_id = json.loads(h)
-             if len(machine_id) == 2 and "ip" in machine_id and "hostname" in machine_id:
-                machine_ids.append(machine_id)
-             else:
-                emitter.publish("malformed unmanaged host entry: " + str(h))
-        except ValueError as e:
-            machine_id = find_machine_id(md, h)
-            if machine_id:
-                machine_ids.append(machine_id)
+            machine_id = json.loads(h)
+            if not (isinstance(machine_id, dict) and len(machine_id) == 2 and
+                    "ip" in machine_id and "hostname" in machine_id):
+                malformed.append(h)
+                continue
+            machine_id = machine_key(machine_id)
+        except ValueError:
+            machine_id = find_machine_id(index, h)
+            if not machine_id:
+                unresolved.append(h)
+                continue
+        if machine_id not in seen:
+            seen.add(machine_id)
+            machine_ids.append(machine_id)
+    if malformed:
+        emitter.publish(summarize_hosts("with malformed unmanaged entry", malformed))
+    if unresolved:
+        emitter.publish(summarize_hosts("not found", unresolved))
     return machine_ids
 
-def filter_agents(machine_ids=[], maintenance_status=[]):
-    not_scheduled = []
-    down = []
-    draining = []
-    for machine_id in machine_ids:
-        scheduled = False
-        for ms in maintenance_status:
-            if compare_machine_ids(machine_id,ms):
-                if ms['state'] == "DOWN":
-                    down.append(machine_id)
-                if ms['state'] == "DRAINING":
-                    draining.append(machine_id)
-                scheduled = True
-                break
-        if not scheduled:
-            not_scheduled.append(machine_id)
-    return not_scheduled, down, draining
-
-
-class Maintenance():
-    """ Maintenance """
-    """ init is slow """
-    def __init__(self,hosts=[]):
-        self.dcos_client = mesos.DCOSClient()
-        self.agents = []
-        self.scheduled = None
-        self.maintenance_status = None
-        self.machine_ids = []
-        self.full_maintenance_status = []
-
-        self.get_agents()
-        self.get_scheduled()
-        self.get_maintenance_status()
-        self.get_machines_ids(hosts)
-        self.get_full_maintenance_status()
+def parse_window(start, duration):
+    """
+    :param start: window start, in seconds since epoch. Defaults to now
+    :type: string
+    :param duration: window duration, in seconds. Defaults to DEFAULT_DURATION
+    :type: string
+    :returns: start and duration, in nanoseconds
+    :rtype: long, long
+    """
+    if not duration:
+        duration = long( DEFAULT_DURATION * stons)
+    else:
+        duration = long(int(duration) * stons)
+
+    if not start:
+        start = long(time.time() * stons )
+    else:
+        start = long(int(start) * stons)
+    return start, duration
+
+def expired_before(older_than=None):
+    """
+    :param older_than: seconds since windows ended. Defaults to 0
+    :type: string
+    :returns: windows ended before this time are expired, in nanoseconds
+    :rtype: long
+    """
+    return long(time.time() * stons) - long(int(older_than or 0) * stons)
+
+def parse_time(value, option):
+    """
+    :param value: seconds since epoch, or a number of seconds
+    :type: string
+    :param option: option the value was given to, for errors
+    :type: string
+    :returns: value, in nanoseconds
+    :rtype: long
+    """
+    try:
+        return long(int(value) * stons)
+    except ValueError:
+        raise DCOSException("Invalid {}: {}".format(option, value))
+
+def window_row(record, window, now):
+    """
+    :param record: maintenance status entry
+    :type: AgentRecord
+    :param window: window of the machine
+    :type: dict
+    :param now: current time, in seconds
+    :type: float
+    :returns: maintenance status row, as `list` shows it
+    :rtype: dict
+    """
+    start, duration = schedule.unavailability_key(window)
+    row = record.to_dict()
+    row['start'] = long(start) / stons
+    if duration is None:
+        row['duration'] = None
+        row['expired'] = False
+    else:
+        row['duration'] = long(duration) / stons
+        row['expired'] = now >= row['start'] + row['duration']
+    return row
+
+def split_waves(machine_ids, wave_size):
+    """
+    :param machine_ids: machine_ids to split
+    :type: list of MachineId
+    :param wave_size: hosts per wave, either a count or a percentage ("10%")
+    :type: string
+    :returns: waves of machine_ids
+    :rtype: list of list of MachineId
+    """
+    try:
+        if wave_size.endswith('%'):
+            size = int(math.ceil(len(machine_ids) * float(wave_size[:-1]) / 100))
+        else:
+            size = int(wave_size)
+    except ValueError:
+        raise DCOSException("Invalid wave size: " + wave_size)
+    if size <= 0:
+        raise DCOSException("Invalid wave size: " + wave_size)
+    return [machine_ids[i:i + size] for i in range(0, len(machine_ids), size)]
+
+def to_machine_ids(entries):
+    """
+    :param entries: extended machine_ids (agents, maintenance status...)
+    :type: list of AgentRecord
+    :returns: bare machine_ids
+    :rtype: list of MachineId
+    """
+    return [machine_key(e) for e in entries]
+
+def to_dicts(machine_ids):
+    """
+    :param machine_ids: machine_ids
+    :type: list of MachineId
+    :returns: machine_ids, as mesos endpoints take them
+    :rtype: list of dict
+    """
+    return [m.to_dict() for m in machine_ids]
+
+def filter_agents(machine_ids, index):
+    """
+    :param machine_ids: machine_ids to classify, order is kept
+    :type: list of MachineId
+    :param index: Index of scheduled maintenance status
+    :type: MachineIndex
+    :returns: not scheduled, down and draining machine_ids
+    :rtype: list, list, list
+    """
+    down = index.scheduled("DOWN")
+    draining = index.scheduled("DRAINING")
+    return ([m for m in machine_ids if m not in down and m not in draining],
+            [m for m in machine_ids if m in down],
+            [m for m in machine_ids if m in draining])
+
+
+class Maintenance(object):
+    """ Maintenance
+
+    Master datasets are fetched lazily: datasets given to the constructor
+    are fetched concurrently up front, any other one on first access.
+    Datasets listed in `cached` are served from the local cache when fresh.
+    Schedule updates leaving less than `max_capacity_loss` percent of any
+    resource unavailable are refused. Machines are brought up or down
+    `chunk_size` at a time, `parallel` chunks at once.
+    """
+    def __init__(self, hosts=[], datasets=ALL_DATASETS, no_cache=False, refresh=False,
+                 cached=ALL_DATASETS, source=None, data=None, max_capacity_loss=None,
+                 chunk_size=submit.DEFAULT_CHUNK_SIZE, parallel=submit.DEFAULT_PARALLEL):
+        self.source = source or sources.MasterSource()
+        self.hosts = hosts
+        self.max_capacity_loss = max_capacity_loss
+        self.chunk_size = chunk_size
+        self.parallel = parallel
+        self.datasets = datasets
+        self.cached = cached
+        self.cache = None
+        if not no_cache and self.source.cacheable:
+            self.cache = cache.Cache(self.source.url,
+                                     ttl=cache.get_ttl(), refresh=refresh)
+        self.index = MachineIndex()
+        # raw datasets, possibly provided by the caller
+        self._raw = dict(data or {})
+        self._agents = None
+        self._scheduled = None
+        self._window_index = None
+        self._maintenance_status = None
+        self._machine_ids = None
+        self._full_maintenance_status = None
+        self._capacity = None
+
+        self.fetch(datasets)
+
+    def fetch(self, datasets):
+        """
+        :param datasets: datasets to fetch from the source
+        :type: list of string
+        """
+        missing = []
+        for d in datasets:
+            if d in self._raw:
+                continue
+            cached = None
+            if self.cache and d in self.cached:
+                with profiling.span("cache load " + d):
+                    cached = self.cache.load(d)
+            if cached is None:
+                missing.append(d)
+            else:
+                self._raw[d] = cached
+        if len(missing) == 1:
+            self._raw[missing[0]] = self.source.fetch(missing[0])
+        elif len(missing) > 1:
+            with futures.ThreadPoolExecutor(len(missing)) as pool:
+                jobs = dict((d, pool.submit(self.source.fetch, d)) for d in missing)
+            for d, job in jobs.items():
+                self._raw[d] = job.result()
+        if self.cache:
+            for d in missing:
+                # failed fetches come back as None, never cache them
+                if self._raw[d] is not None:
+                    with profiling.span("cache store " + d):
+                        self.cache.store(d, self._raw[d])
+
+    def post(self, path, json_):
+        """ POST to the source. Cached master state is invalidated
+
+        :param path: master endpoint
+        :type: string
+        :param json_: payload
+        :type: dict or list
+        :rtype: Response
+        """
+        try:
+            return self.source.post(path, json_)
+        finally:
+            if self.cache:
+                self.cache.invalidate()
+
+    def save_snapshot(self, path):
+        """
+        :param path: snapshot file to write
+        :type: string
+        """
+        self.fetch(ALL_DATASETS)
+        sources.save_snapshot(path, self.source.url,
+                              dict((d, self._raw[d]) for d in ALL_DATASETS))
+
+    @property
+    def agents(self):
+        if self._agents is None:
+            self.get_agents()
+        return self._agents
+
+    @property
+    def scheduled(self):
+        if self._scheduled is None:
+            self.get_scheduled()
+        return self._scheduled
+
+    @scheduled.setter
+    def scheduled(self, scheduled):
+        self._scheduled = scheduled
+        self._window_index = None
+
+    @property
+    def window_index(self):
+        """
+        :returns: windows of the schedule, by unavailability
+        :rtype: IntervalTree of dict
+        """
+        if self._window_index is None:
+            self._window_index = intervals.IntervalTree(
+                (schedule.unavailability_key(w)[0], schedule.window_end(w), w)
+                for w in schedule.windows(self.scheduled))
+        return self._window_index
+
+    @property
+    def maintenance_status(self):
+        if self._maintenance_status is None:
+            self.get_maintenance_status()
+        return self._maintenance_status
+
+    @property
+    def machine_ids(self):
+        if self._machine_ids is None:
+            self.get_machines_ids(self.hosts)
+        return self._machine_ids
+
+    @property
+    def full_maintenance_status(self):
+        if self._full_maintenance_status is None:
+            self.get_full_maintenance_status()
+        return self._full_maintenance_status
 
     def get_agents(self):
-        _agents = self.dcos_client.get_state_summary()['slaves']
-        for agent in agents:
-            self.agents.append(
-                {"hostname": agent['hostname'],
-                "ip": mesos.parse_pid(agent['pid'])[1], "id": agent['id']
-                }
-            )
+        self.fetch([AGENTS])
+        self._agents = []
+        with profiling.span("index agents") as span, building():
+            for agent in self._raw[AGENTS]['slaves']:
+                machine_id = MachineId(agent['hostname'], mesos.parse_pid(agent['pid'])[1])
+                self._agents.append(AgentRecord(machine_id, agent['id'], None))
+                self.index.add_agent(self._agents[-1])
+            span.count(records=len(self._agents))
+
     def get_all_agents(self):
-        md = self.agents + self.maintenance_status
-        agents = []
-        for i in md:
-            if i not in agents:
-                agents.append({"hostname": i["hostname"], "ip": i["ip"]})
+        """
+        :returns: registered agents and machines under maintenance, once each
+        :rtype: list of MachineId
+        """
+        agents = to_machine_ids(self.agents)
+        known = set(agents)
+        agents.extend(m for m in to_machine_ids(self.maintenance_status) if m not in known)
         return agents
 
     def get_scheduled(self, force=False):
-        if not self.scheduled or force:
-            self.scheduled = get_scheduled(self.dcos_client)
+        if force:
+            self._raw.pop(SCHEDULE, None)
+        self.fetch([SCHEDULE])
+        self.scheduled = self._raw[SCHEDULE]
 
     def get_maintenance_status(self, force=False):
-        if not self.maintenance_status or force:
-            self.maintenance_status = get_maintenance_status(self.dcos_client,
-                                                                agents=self.agents)
+        if force:
+            self._raw.pop(STATUS, None)
+        # tag entries with agent IDs only when agents are wanted
+        if AGENTS in self.datasets:
+            self.agents
+        self.fetch([STATUS])
+        with profiling.span("tag status") as span, building():
+            self._maintenance_status = tag_maintenance_status(self._raw[STATUS],
+                                                              self.index)
+            for ms in self._maintenance_status:
+                self.index.add_status(ms)
+            span.count(records=len(self._maintenance_status))
 
     def get_machines_ids(self,hosts):
-        self.machine_ids = get_machine_ids(hosts, agents=self.agents, maintenance_status=self.maintenance_status)
-
+        # streamed hosts are only read once, while resolving
+        if isinstance(hosts, types.GeneratorType) or not all(is_machine_id(h) for h in hosts):
+            self.agents
+            self.maintenance_status
+        with profiling.span("resolve hosts") as span:
+            self._machine_ids = get_machine_ids(hosts, self.index)
+            span.count(records=len(self._machine_ids))
 
     def get_full_maintenance_status(self):
-        for host in self.maintenance_status:
-            host['start'] = "None"
-            host['duration'] = None
-            if self.scheduled:
-                for schedule in self.scheduled['windows']:
-                    for scheduled_host in schedule['machine_ids']:
-                        if compare_machine_ids(scheduled_host,host):
-                            host['start'] = long(schedule['unavailability']['start']['nanoseconds']) / stons
-                            host['duration'] = long(schedule['unavailability']['duration']['nanoseconds']) / stons
-                            host["expired"] = False if (time.time() < (host['start'] + host['duration'])) else True
-                            self.full_maintenance_status.append(host)
-
-    def list(self, json_):
-        emitting.publish_table(emitter, self.full_maintenance_status, tables.maintenance_table, json_)
+        self._full_maintenance_status = []
+        # fetched and tagged beforehand, out of the join
+        self.scheduled
+        self.maintenance_status
+        with profiling.span("join schedule") as span, building():
+            for host in self.maintenance_rows():
+                self._full_maintenance_status.append(host)
+            span.count(records=len(self._full_maintenance_status))
+
+    def maintenance_rows(self, row_filter=None):
+        """ Join maintenance status and schedule
+
+        :param row_filter: rows to keep, tested before joining
+        :type: ListFilter
+        :returns: scheduled maintenance status entries, as they are joined
+        :rtype: generator of dict
+        """
+        windows = {}
+        for window in schedule.windows(self.scheduled):
+            if row_filter and not row_filter.accepts_window(window):
+                continue
+            for scheduled_host in window['machine_ids']:
+                windows.setdefault(machine_key(scheduled_host), []).append(window)
+        if row_filter is None:
+            records = self.maintenance_status
+        elif windows:
+            records = self.filter_status(row_filter, windows)
+        else:
+            records = []
+        now = time.time()
+        for record in records:
+            for window in windows.get(record.machine_id, []):
+                if row_filter is None:
+                    self.index.add_scheduled(record)
+                yield window_row(record, window, now)
+
+    def filter_status(self, row_filter, windows):
+        """ Maintenance status entries of given windows, matching a filter.
+        Other entries are neither looked up among agents nor kept.
+
+        :param row_filter: entries to keep
+        :type: ListFilter
+        :param windows: scheduled machines
+        :type: dict of MachineId
+        :returns: maintenance status
+        :rtype: list of AgentRecord
+        """
+        if AGENTS in self.datasets:
+            self.agents
+        self.fetch([STATUS])
+        accept = lambda m: m in windows and row_filter.accepts_machine(m)
+        with building():
+            return tag_maintenance_status(self._raw[STATUS], self.index,
+                                          row_filter.states, accept)
+
+    def filter(self, machine_ids):
+        """
+        :param machine_ids: machine_ids to classify
+        :type: list of MachineId
+        :returns: not scheduled, down and draining machine_ids
+        :rtype: list, list, list
+        """
+        self.full_maintenance_status
+        return filter_agents(machine_ids, self.index)
+
+    def list(self, json_, ndjson_=False, columns=None, sort_by=None, row_filter=None):
+        if ndjson_:
+            # streamed as rows are joined, never held in memory
+            for line in tables.ndjson(self.maintenance_rows(row_filter), columns):
+                sys.stdout.write(line + "\n")
+            return
+        if row_filter is None:
+            rows = self.full_maintenance_status
+        else:
+            self.scheduled
+            with profiling.span("join schedule") as span, building():
+                rows = [row for row in self.maintenance_rows(row_filter)]
+                span.count(records=len(rows))
+        if json_:
+            emitter.publish(rows)
+            return
+        output = tables.maintenance_table(rows, columns, sort_by or "STATE")
+        if output:
+            emitter.publish(output)
+
+    def timeline(self, json_, from_=None, to=None, step=None):
+        """ Publish the number of DRAINING and DOWN machines of windows
+        overlapping every time bucket
+
+        :param from_: timeline start, in seconds since epoch. Defaults to now
+        :type: string
+        :param to: timeline end, in seconds since epoch. Defaults to the end
+                   of the last window
+        :type: string
+        :param step: bucket length, in seconds
+        :type: string
+        """
+        step = parse_time(step or DEFAULT_STEP, "--step")
+        if step <= 0:
+            raise DCOSException("Invalid --step: {}".format(step // stons))
+        start = parse_time(from_, "--from") if from_ else long(time.time() * stons)
+        if to:
+            end = parse_time(to, "--to")
+        elif len(self.window_index):
+            end = self.window_index.last_end() or start + 24 * 3600 * stons
+        else:
+            end = start + step
+        if (end - start) // step > MAX_BUCKETS:
+            raise DCOSException("Too many buckets, use a larger --step")
+
+        # windows are counted once, whatever the number of buckets
+        self.maintenance_status
+        counts = {}
+        for window in schedule.windows(self.scheduled):
+            states = [self.index.find_status(m) for m in window['machine_ids']]
+            down = sum(1 for ms in states if ms and ms.state == "DOWN")
+            counts[id(window)] = (len(states) - down, down)
+
+        rows = []
+        for bucket in range(0, max(end - start, 1), step):
+            bucket = start + bucket
+            windows = self.window_index.overlapping(bucket, bucket + step)
+            rows.append({"from": bucket // stons, "to": (bucket + step) // stons,
+                         "windows": len(windows),
+                         "draining": sum(counts[id(w)][0] for w in windows),
+                         "down": sum(counts[id(w)][1] for w in windows)})
+        if json_:
+            emitter.publish(rows)
+        else:
+            emitter.publish(tables.timeline_table(rows))
+
+    def at(self, json_, time_):
+        """ Publish machines of windows running at a given time
+
+        :param time_: seconds since epoch
+        :type: string
+        """
+        self.maintenance_status
+        now = time.time()
+        rows = []
+        for window in self.window_index.at(parse_time(time_, "time")):
+            for m in window['machine_ids']:
+                record = (self.index.find_status(m) or
+                          AgentRecord(machine_key(m), "", "DRAINING"))
+                rows.append(window_row(record, window, now))
+        if json_:
+            emitter.publish(rows)
+        elif rows:
+            emitter.publish(tables.maintenance_table(rows))
+        else:
+            emitter.publish("No maintenance window at {}".format(time_))
+
+    def get_tasks(self):
+        """ Running tasks, always fetched live: they're what changes while
+        machines drain
+
+        :returns: tasks and framework names
+        :rtype: dict
+        """
+        tasks = self.source.fetch(TASKS)
+        if tasks is None:
+            raise DCOSException("Running tasks are unavailable from " + self.source.url)
+        return tasks
+
+    def progress(self, json_, wait=False, interval=None, timeout=None):
+        """ Publish tasks and resources remaining on draining machines, or
+        on given hosts
+
+        :param wait: poll running tasks until every machine is empty
+        :type: boolean
+        :param interval: seconds between two polls
+        :type: string
+        :param timeout: seconds to wait at most
+        :type: string
+        :returns: process status
+        :rtype: int
+        """
+        from dcos_management.progress import progress_rows
+
+        # tasks are joined on agent IDs
+        self.agents
+        if self.hosts:
+            records = [self.index.find_status(m) or self.index.find_agent(m) or
+                       AgentRecord(m, "", None) for m in self.machine_ids]
+        else:
+            records = [r for r in self.maintenance_status if r.state == "DRAINING"]
+        rows = progress_rows(records, self.get_tasks())
+        if json_:
+            emitter.publish(rows)
+        elif rows:
+            emitter.publish(tables.progress_table(rows))
+        else:
+            emitter.publish("No machine is draining")
+        if not wait:
+            return 0
+
+        interval = float(interval or DEFAULT_PROGRESS_INTERVAL)
+        deadline = time.time() + float(timeout) if timeout else None
+        # machines already empty are never joined again
+        pending = [r for r, row in zip(records, rows) if row['tasks']]
+        while pending:
+            if deadline is not None and time.time() >= deadline:
+                raise DCOSException(summarize_hosts(
+                    "still running tasks", [r.hostname or r.ip for r in pending]))
+            delay = interval
+            if deadline is not None:
+                delay = min(interval, deadline - time.time())
+            time.sleep(max(0, delay))
+            remaining = []
+            for record, row in zip(pending, progress_rows(pending, self.get_tasks())):
+                if row['tasks']:
+                    remaining.append(record)
+                elif not json_:
+                    emitter.publish("{} ({}) is empty".format(record.hostname, record.ip))
+            pending = remaining
+        if not json_:
+            emitter.publish("{} machine(s) empty".format(len(records)))
+        return 0
 
     def flush_all(self):
-        not_scheduled, down, draining = filter_agents(self.get_all_agents(),self.full_maintenance_status)
+        not_scheduled, down, draining = self.filter(to_machine_ids(self.maintenance_status))
         self.flush(draining)
 
-    # WIP
-    #   def flush_expired(self):
-    #     not_scheduled, down, draining = filter_agents(self.get_all_agents(),self.full_maintenance_status, True)
-    #     self.flush(draining)
+    def flush_expired(self, older_than=None):
+        """ Remove windows ended (for more than `older_than` seconds), in
+        a single update. DOWN machines stay in their window, as mesos
+        requires.
+
+        :param older_than: seconds since windows ended
+        :type: string
+        """
+        before = expired_before(older_than)
+        down = [m for m in self.maintenance_status if m.state == "DOWN"]
+        _, expired = schedule.remove_expired(self.scheduled, before)
+        _, removed = schedule.remove_expired(self.scheduled, before, down)
+
+        stuck = set(machine_key(m) for m in down)
+        stuck = [m.get('hostname') or m.get('ip') for w in expired
+                 for m in w['machine_ids'] if machine_key(m) in stuck]
+        if stuck:
+            emitter.publish(summarize_hosts("DOWN in expired windows, kept until UP", stuck))
+        if not removed:
+            emitter.publish("No expired maintenance window to remove")
+            return 0
+        for w in removed:
+            start, duration = schedule.unavailability_key(w)
+            emitter.publish(summarize_hosts(
+                "reclaimed from window started at {} for {}s".format(start / stons, duration / stons),
+                [m.get('hostname') or m.get('ip') for m in w['machine_ids']]))
+        self.update_schedule(lambda s: schedule.remove_expired(s, before, down)[0])
+
+    def capacity_impact(self, scheduled):
+        """
+        :param scheduled: a schedule
+        :type: dict
+        :returns: capacity impact of every window not ended yet
+        :rtype: list of dict
+        """
+        from dcos_management import capacity
+        if self._capacity is None:
+            self.fetch([AGENTS])
+            self._capacity = capacity.Capacity(self._raw[AGENTS])
+        return self._capacity.impact(scheduled, long(time.time() * stons))
+
+    def check_capacity(self, base, scheduled):
+        """ Refuse a schedule update making windows lose more than
+        `max_capacity_loss` percent of any resource, when they lose more
+        than they did before the update.
+
+        :param base: schedule before the update
+        :type: dict
+        :param scheduled: schedule after the update
+        :type: dict
+        """
+        from dcos_management import capacity
+        before = dict(((row['start'], row['duration']), row)
+                      for row in self.capacity_impact(base))
+        refused = []
+        for row, resource in capacity.exceeded(self.capacity_impact(scheduled),
+                                               self.max_capacity_loss):
+            previous = before.get((row['start'], row['duration']))
+            if previous is None or row[resource + "_lost"] > previous[resource + "_lost"]:
+                refused.append(capacity.describe(row, resource))
+        if refused:
+            raise DCOSException(
+                "Refused, capacity loss above {}%:\n".format(self.max_capacity_loss) +
+                "\n".join(refused))
+
+    def impact(self, json_, start=None, duration=None):
+        """ Publish the capacity impact of scheduled windows, along with a
+        new window for given hosts, as `schedule add` would add it.
+
+        :returns: 1 if a window loses more than `max_capacity_loss`
+        :rtype: int
+        """
+        from dcos_management import capacity
+        scheduled = self.scheduled
+        up, down, draining = self.filter(self.machine_ids)
+        if up + draining:
+            start, duration = parse_window(start, duration)
+            scheduled = schedule.compact(schedule.add_windows(
+                scheduled, [schedule.window(up + draining, start, duration)]))
+        impact = self.capacity_impact(scheduled)
+        if json_:
+            emitter.publish(impact)
+        elif impact:
+            emitter.publish(tables.impact_table(impact, capacity.RESOURCES))
+        else:
+            emitter.publish("No maintenance window ahead")
+        if self.max_capacity_loss is None:
+            return 0
+        exceeded = capacity.exceeded(impact, self.max_capacity_loss)
+        for row, resource in exceeded:
+            emitter.publish(DefaultError(capacity.describe(row, resource)))
+        return 1 if exceeded else 0
 
     def flush(self, m_ids=[]):
         if len(m_ids) == 0:
@@ -251,148 +862,441 @@ class Maintenance():
         if not self.scheduled:
             emitter.publish("No maintenance schedule found on mesos master")
             return 0
-        # remove conflicting entries
-        to_popi = []
-        for sched in self.scheduled['windows']:
-            to_popj = []
-            for s in sched['machine_ids']:
-                for h in m_ids:
-                    if compare_machine_ids(s, h):
-                        to_popj.append(j)
-                        break
-            # remove
-            offset = 0
-            for jj in to_popj:
-                sched['machine_ids'].pop(jj - offset)
-                offset += 1
-            if len(sched['machine_ids']) == 0:
-                to_popi.append(i)
-        offset = 0
-        for ii in to_popi:
-            self.scheduled['windows'].pop(ii - offset)
-            offset += 1
         emitter.publish("Flushing specified host(s)")
-        try:
-            url = self.dcos_client.master_url('maintenance/schedule')
-            http.post(url, data=None, json=self.scheduled)
+        self.update_schedule(lambda s: schedule.remove_machines(s, m_ids))
+
+    def update_schedule(self, delta):
+        """ Apply a change to the live schedule, as a compare-and-swap: the
+        schedule is fetched again right before POST, and the change is
+        applied again on top of it whenever it changed since last read.
+
+        :param delta: the change, returns a new schedule given the current one
+        :type: function
+        """
+        base = self.scheduled
+        for attempt in range(SCHEDULE_RETRIES):
+            scheduled = schedule.compact(delta(base))
+            if scheduled == schedule.compact(base):
+                emitter.publish("Schedules already up to date")
+                return 0
+            if self.max_capacity_loss is not None:
+                self.check_capacity(base, scheduled)
+            self.get_scheduled(force=True)
+            if self.scheduled != base:
+                logger.info("Schedule changed on master, applying change again")
+                base = self.scheduled
+                time.sleep(backoff(attempt))
+                continue
+            # a failed update must stop the calls depending on it
+            try:
+                self.post('maintenance/schedule', scheduled)
+            except DCOSException:
+                raise
+            except Exception:
+                raise DCOSException("Can't complete operation on mesos master")
+            self.scheduled = self._raw[SCHEDULE] = scheduled
             emitter.publish("Schedules updated")
-        except DCOSException as e:
-            logger.exception(e)
-        except Exception:
-            raise DCOSException("Can't complete operation on mesos master")
+            return 0
+        raise DCOSException("Schedule kept changing on mesos master, "
+                            "gave up after {} attempts".format(SCHEDULE_RETRIES))
 
     def schedule_maintenance(self,start,duration, m_ids = []):
         if len(m_ids) == 0:
             m_ids = self.machine_ids
-        up, down, draining = filter_agents(m_ids, self.full_maintenance_status)
+        up, down, draining = self.filter(m_ids)
 
         machine_ids = up + draining
         if len(machine_ids) == 0:
             emitter.publish("Agents are already DOWN")
+            return 0
 
-        if not duration:
-            duration = long( DEFAULT_DURATION * stons)
-        else:
-            duration = long(int(duration) * stons)
-
-        if not start:
-            start = long(time.time() * stons )
-        else:
-            start = long(int(start) * stons)
+        start, duration = parse_window(start, duration)
+        new_window = schedule.window(machine_ids, start, duration)
+        self.update_schedule(lambda s: schedule.add_windows(s, [new_window]))
 
-        if not self.scheduled:
-            self.scheduled = dict()
-            self.scheduled['windows'] = []
+    def rollout(self, start, duration, gap, wave_size, m_ids=[]):
+        if len(m_ids) == 0:
+            m_ids = self.machine_ids
+        up, down, draining = self.filter(m_ids)
 
-        unavailibitiyObj= dict()
-        unavailibitiyObj['machine_ids'] = self.machine_ids
-        unavailibitiyObj['unavailability']= {
-            "start" : { "nanoseconds": start },
-            "duration" : { "nanoseconds": duration }
-        }
-        self.scheduled['windows'].append(unavailibitiyObj)
+        if len(down + draining) > 0:
+            emitter.publish(summarize_hosts("already scheduled, skipped",
+                                            [m.hostname for m in down + draining]))
+        if len(up) == 0:
+            emitter.publish("No host to schedule")
+            return 0
 
-        try:
-            url = self.dcos_client.master_url('maintenance/schedule')
-            http.post(url, data=None, json=self.scheduled)
-            emitter.publish("Schedules updated")
-        except DCOSException as e:
-            logger.exception(e)
-        except Exception:
-            raise DCOSException("Can't complete operation on mesos master")
+        start, duration = parse_window(start, duration)
+        gap = long(int(gap or 0) * stons)
+        windows = []
+        for i, wave in enumerate(split_waves(up, wave_size)):
+            wave_start = start + i * (duration + gap)
+            windows.append(schedule.window(wave, wave_start, duration))
+            emitter.publish("wave {}: {} host(s) starting at {} for {}s".format(
+                i + 1, len(wave), wave_start / stons, duration / stons))
+        self.update_schedule(lambda s: schedule.add_windows(s, windows))
 
-    def up_all(self):
-        not_scheduled, down, draining = filter_agents(self.get_all_agents(),self.full_maintenance_status)
-        self.up(down)
-        self.flush(draining)
+    def up_all(self, dry_run=False):
+        return self.up(to_machine_ids(self.maintenance_status), dry_run)
 
-    def up(self,m_ids=[]):
+    def up(self, m_ids=[], dry_run=False):
         if len(m_ids) == 0:
             m_ids = self.machine_ids
-        not_scheduled, down, draining = filter_agents(m_ids, self.full_maintenance_status)
-        if len(draining) > 0:
-            self.flush(machine_ids=draining)
+        not_scheduled, down, draining = self.filter(m_ids)
+        # draining machines leave the schedule, machine/up unschedules down ones
+        plan = transitions.Plan(self.scheduled, unscheduled=draining, up=down)
+        return self.run_plan(plan, dry_run)
 
-        try:
-            url = self.dcos_client.master_url('machine/up')
-            http.post(url, data=None, json=down)
-            emitter.publish("submitted hosts are now UP")
-        except DCOSException as e:
-            logger.exception(e)
-        except Exception:
-            raise DCOSException("Can't complete operation on mesos master")
-        return 0
-
-    def down(self, m_ids=[]):
+    def down(self, m_ids=[], dry_run=False):
         if len(m_ids) == 0:
             m_ids = self.machine_ids
-        not_scheduled, down, draining = filter_agents(m_ids, self.full_maintenance_status)
+        not_scheduled, down, draining = self.filter(m_ids)
+        windows = []
+        if not_scheduled:
+            start, duration = parse_window(None, None)
+            windows.append(schedule.window(not_scheduled, start, duration))
+        plan = transitions.Plan(self.scheduled, windows=windows,
+                                down=not_scheduled + draining)
+        return self.run_plan(plan, dry_run)
 
-        self.schedule_maintenance(None,None, not_scheduled)
+    def run_plan(self, plan, dry_run=False):
+        """ Issue master calls of a transition, in order
+
+        :param plan: planned transition
+        :type: Plan
+        :param dry_run: only publish the calls
+        :type: boolean
+        :returns: process status
+        :rtype: int
+        """
+        calls = plan.calls()
+        if dry_run:
+            for i, (path, payload) in enumerate(calls):
+                if path == transitions.SCHEDULE_PATH:
+                    emitter.publish("{}. POST {}: {} window(s) of {} host(s)".format(
+                        i + 1, path, len(payload['windows']),
+                        sum(len(w['machine_ids']) for w in payload['windows'])))
+                else:
+                    emitter.publish("{}. POST {}: {}".format(i + 1, path, summarize_hosts(
+                        "to bring " + transitions.TARGET_STATES[path],
+                        [m.hostname or m.ip for m in payload])))
+            if not calls:
+                emitter.publish("Nothing to do")
+            return 0
+        status = 0
+        for path, payload in calls:
+            if path == transitions.SCHEDULE_PATH:
+                # applied again on top of the live schedule if it changed
+                self.update_schedule(plan.apply)
+            else:
+                status = (self.post_machines(path, payload, transitions.TARGET_STATES[path]) or
+                          status)
+        if not calls:
+            emitter.publish("Nothing to do")
+        return status
 
-        to_down = not_scheduled + draining
+    def post_machines(self, path, machine_ids, state):
+        """ POST machine_ids to `machine/up` or `machine/down`, in chunks.
+        Machines refused by the master are isolated and reported, others
+        go through.
+
+        :param path: master endpoint
+        :type: string
+        :param machine_ids: machine_ids to bring up or down
+        :type: list of MachineId
+        :param state: state machines are brought to, for reporting
+        :type: string
+        :returns: process status, 1 if machines failed
+        :rtype: int
+        """
+        def report(number, count, accepted, failed):
+            if count > 1:
+                emitter.publish("chunk {}/{}: {} host(s) {}, {} failed".format(
+                    number, count, len(accepted), state, len(failed)))
 
         try:
-            url = self.dcos_client.master_url('machine/down')
-            http.post(url, data=None, json=to_down)
-            emitter.publish("submitted hosts are now DOWN")
-        except DCOSException as e:
-            logger.exception(e)
+            accepted, failed = submit.submit(
+                lambda chunk: self.post(path, to_dicts(chunk)), machine_ids,
+                self.chunk_size, self.parallel, report)
+        except DCOSException:
+            raise
         except Exception:
             raise DCOSException("Can't complete operation on mesos master")
-        return 0
+        if not failed:
+            emitter.publish("submitted hosts are now " + state)
+            return 0
+        reasons = {}
+        for machine_id, reason in failed:
+            reasons.setdefault(reason, []).append(machine_id.hostname or machine_id.ip)
+        for reason, hosts in sorted(reasons.items()):
+            emitter.publish(DefaultError(summarize_hosts("failed ({})".format(reason), hosts)))
+        emitter.publish("{} host(s) are now {}, {} failed".format(len(accepted), state,
+                                                                  len(failed)))
+        return 1
+
+def required_datasets(hosts, datasets=[SCHEDULE, STATUS]):
+    """
+    :param hosts: hosts given on the command line, or streamed from a file
+    :type: iterable of string
+    :param datasets: datasets required by the command itself
+    :type: list of string
+    :returns: datasets to fetch, agents are only needed to resolve hosts
+    :rtype: list of string
+    """
+    if not isinstance(hosts, types.GeneratorType) and all(is_machine_id(h) for h in hosts):
+        return datasets
+    return ALL_DATASETS
+
+def parse_count(value, option, default):
+    """
+    :param value: a positive count, None for the default
+    :type: string
+    :param option: option giving the count, for errors
+    :type: string
+    :param default: count when none is given
+    :type: int
+    :rtype: int
+    """
+    if value is None:
+        return default
+    try:
+        count = int(value)
+    except ValueError:
+        count = 0
+    if count < 1:
+        raise DCOSException("Invalid {}: {}".format(option, value))
+    return count
+
+def parse_max_capacity_loss(max_capacity_loss):
+    """
+    :param max_capacity_loss: percentage, None to leave capacity unchecked
+    :type: string
+    :rtype: float
+    """
+    if max_capacity_loss is None:
+        return None
+    from dcos_management import capacity
+    return capacity.parse_percent(max_capacity_loss)
+
+def get_source(snapshot=None, no_cache=False):
+    """
+    :param snapshot: snapshot file to read instead of the live master
+    :type: string
+    :param no_cache: neither read nor write the cached leader URL
+    :type: boolean
+    :returns: source of master datasets
+    :rtype: MasterSource | SnapshotSource
+    """
+    if snapshot:
+        return sources.SnapshotSource(snapshot)
+    return sources.MasterSource(no_cache=no_cache,
+                                token=util.get_config().get('core.dcos_acs_token'))
+
+def watch_list(interval):
+    from dcos_management import watch
+    source = get_source()
+    interval = float(interval or watch.DEFAULT_INTERVAL)
+    # maintenance schedule and status of the last refresh
+    fetched = {}
 
-def list(json_):
-    m = Maintenance()
-    m.list(json_)
+    def load_rows(state_summary, refetch):
+        data = {} if refetch else dict(fetched)
+        if state_summary:
+            data[AGENTS] = state_summary
+        m = Maintenance(datasets=ALL_DATASETS, no_cache=True,
+                        source=source, data=data)
+        fetched.update((d, m._raw[d]) for d in (SCHEDULE, STATUS))
+        return m.full_maintenance_status
 
-def up(hosts, all):
-    m = Maintenance(hosts=hosts)
+    try:
+        events = watch.subscribe(source.client)
+    except DCOSException as e:
+        logger.exception(e)
+        emitter.publish("Master event stream unavailable, polling every {}s".format(interval))
+        events = None
+    try:
+        watch.run(load_rows, emitter.publish, events, interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def get_list_filter(state=None, host=None, expired=False, active=False,
+                    starting_before=None, starting_after=None):
+    """
+    :returns: filter of listed rows, None to list them all
+    :rtype: ListFilter
+    """
+    if not (state or host or expired or active or starting_before or starting_after):
+        return None
+    return filters.ListFilter(
+        filters.parse_states(state), host, True if expired else False if active else None,
+        parse_time(starting_before, "--starting-before") if starting_before else None,
+        parse_time(starting_after, "--starting-after") if starting_after else None)
+
+def list_clusters(selected, json_, ndjson_, columns, sort_by, row_filter, datasets,
+                  no_cache=False, refresh=False):
+    """ List maintenance status of several clusters at once, rows of every
+    cluster tagged with its name. Clusters failing are reported, others are
+    still listed.
+
+    :param selected: clusters to list
+    :type: list of Cluster
+    :returns: process status, 1 if a cluster failed
+    :rtype: int
+    """
+    from dcos_management import clusters
+
+    def load_rows(cluster):
+        m = Maintenance(datasets=datasets, no_cache=no_cache, refresh=refresh,
+                        source=sources.MasterSource(cluster, no_cache, cluster.token))
+        with building():
+            return [dict(row, cluster=cluster.name) for row in m.maintenance_rows(row_filter)]
+
+    rows, failed = [], []
+    for cluster, cluster_rows, error in clusters.fan_out(selected, load_rows):
+        if error is not None:
+            failed.append(cluster)
+            emitter.publish(DefaultError("Cluster {}: {}".format(cluster.name, error)))
+        elif ndjson_:
+            # streamed as clusters complete
+            for line in tables.ndjson(cluster_rows, ["CLUSTER"] + columns):
+                sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+        else:
+            rows.extend(cluster_rows)
+    if json_:
+        emitter.publish(sorted(rows, key=lambda row: row['cluster']))
+    elif not ndjson_:
+        output = tables.clusters_table(rows, columns, sort_by or "STATE")
+        if output:
+            emitter.publish(output)
+    return 1 if failed else 0
+
+def list(json_, ndjson_=False, columns=None, sort_by=None, watch_=False, interval=None,
+         state=None, host=None, expired=False, active=False, starting_before=None,
+         starting_after=None, clusters=None, all_clusters=False, no_cache=False,
+         refresh=False, snapshot=None, source=None):
+    if watch_:
+        return watch_list(interval)
+    columns = tables.parse_columns(columns)
+    sort_column = tables.column_header(sort_by) if sort_by else None
+    row_filter = get_list_filter(state, host, expired, active, starting_before, starting_after)
+    # agents only give IDs to rows
+    datasets = ALL_DATASETS
+    if "ID" not in columns + [sort_column] and not json_:
+        datasets = [SCHEDULE, STATUS]
+    if clusters or all_clusters:
+        if snapshot:
+            raise DCOSException("Snapshots hold a single cluster, drop --clusters")
+        from dcos_management.clusters import select
+        return list_clusters(select(clusters, all_clusters), json_, ndjson_, columns, sort_by,
+                             row_filter, datasets, no_cache, refresh)
+    m = Maintenance(datasets=datasets, no_cache=no_cache, refresh=refresh,
+                    source=source or get_source(snapshot, no_cache))
+    m.list(json_, ndjson_, columns, sort_by, row_filter)
+
+def timeline(json_, from_, to, step, no_cache=False, refresh=False, snapshot=None, source=None):
+    m = Maintenance(datasets=[SCHEDULE, STATUS], no_cache=no_cache, refresh=refresh,
+                    source=source or get_source(snapshot, no_cache))
+    m.timeline(json_, from_, to, step)
+
+def at(time_, json_, no_cache=False, refresh=False, snapshot=None, source=None):
+    m = Maintenance(datasets=ALL_DATASETS, no_cache=no_cache, refresh=refresh,
+                    source=source or get_source(snapshot, no_cache))
+    m.at(json_, time_)
+
+def progress(hosts, from_file=None, json_=False, wait=False, interval=None, timeout=None,
+             no_cache=False, refresh=False, snapshot=None, source=None):
+    hosts = get_hosts(hosts, from_file) or []
+    m = Maintenance(hosts=hosts, datasets=[AGENTS, STATUS], no_cache=no_cache, refresh=refresh,
+                    source=source or get_source(snapshot, no_cache))
+    return m.progress(json_, wait, interval, timeout)
+
+def rollout(start, duration, gap, wave_size, hosts, from_file=None, no_cache=False, refresh=False,
+            snapshot=None, source=None):
+    hosts = get_hosts(hosts, from_file)
+    m = Maintenance(hosts=hosts, datasets=required_datasets(hosts),
+                    no_cache=no_cache, refresh=refresh, cached=MUTATION_CACHED_DATASETS,
+                    source=source or get_source(snapshot, no_cache))
+    if len(m.machine_ids) == 0:
+        emitter.publish("You must defined at least one host")
+        return 0
+    m.rollout(start, duration, gap, wave_size)
+
+def up(hosts, all, from_file=None, chunk_size=None, parallel=None, dry_run=False,
+       no_cache=False, refresh=False, snapshot=None, source=None):
+    chunk_size = parse_count(chunk_size, "--chunk-size", submit.DEFAULT_CHUNK_SIZE)
+    parallel = parse_count(parallel, "--parallel", submit.DEFAULT_PARALLEL)
+    hosts = get_hosts(hosts, from_file)
+    m = Maintenance(hosts=hosts, datasets=required_datasets(hosts),
+                    no_cache=no_cache, refresh=refresh, cached=MUTATION_CACHED_DATASETS,
+                    source=source or get_source(snapshot, no_cache),
+                    chunk_size=chunk_size, parallel=parallel)
     if all:
-        m.up_all()
+        return m.up_all(dry_run)
     else:
-        if len(hosts) == 0:
+        if len(m.machine_ids) == 0:
             emitter.publish("You must defined at least one host")
             return 0
-        m.up()
+        return m.up(dry_run=dry_run)
 
-def down(hosts):
-    m = Maintenance(hosts=hosts)
-    m.down()
+def down(hosts, from_file=None, max_capacity_loss=None, chunk_size=None, parallel=None,
+         dry_run=False, no_cache=False, refresh=False, snapshot=None, source=None):
+    max_capacity_loss = parse_max_capacity_loss(max_capacity_loss)
+    chunk_size = parse_count(chunk_size, "--chunk-size", submit.DEFAULT_CHUNK_SIZE)
+    parallel = parse_count(parallel, "--parallel", submit.DEFAULT_PARALLEL)
+    hosts = get_hosts(hosts, from_file)
+    m = Maintenance(hosts=hosts, datasets=required_datasets(hosts),
+                    no_cache=no_cache, refresh=refresh, cached=MUTATION_CACHED_DATASETS,
+                    source=source or get_source(snapshot, no_cache),
+                    max_capacity_loss=max_capacity_loss,
+                    chunk_size=chunk_size, parallel=parallel)
+    if len(m.machine_ids) == 0:
+        emitter.publish("You must defined at least one host")
+        return 0
+    return m.down(dry_run=dry_run)
 
-def flush_schedule(hosts, all):
-    m = Maintenance(hosts=hosts)
+def flush_schedule(hosts, all, expired=False, older_than=None, from_file=None, no_cache=False,
+                   refresh=False, snapshot=None, source=None):
+    hosts = get_hosts(hosts, from_file)
+    if all or expired:
+        datasets = [SCHEDULE, STATUS]
+    else:
+        datasets = required_datasets(hosts, [SCHEDULE])
+    m = Maintenance(hosts=hosts, datasets=datasets,
+                    no_cache=no_cache, refresh=refresh, cached=MUTATION_CACHED_DATASETS,
+                    source=source or get_source(snapshot, no_cache))
     if all:
         m.flush_all()
-    # WIP
-    # elif expired:
-    #     m.flush_expired()
+    elif expired:
+        m.flush_expired(older_than)
     else:
-        if len(hosts) == 0:
+        if len(m.machine_ids) == 0:
             emitter.publish("You must defined at least one host")
             return 0
         m.flush()
 
-def schedule_maintenance(start, duration, hosts):
-    m = Maintenance(hosts=hosts)
+def schedule_maintenance(start, duration, hosts, from_file=None, max_capacity_loss=None,
+                         no_cache=False, refresh=False, snapshot=None, source=None):
+    max_capacity_loss = parse_max_capacity_loss(max_capacity_loss)
+    hosts = get_hosts(hosts, from_file)
+    m = Maintenance(hosts=hosts, datasets=required_datasets(hosts),
+                    no_cache=no_cache, refresh=refresh, cached=MUTATION_CACHED_DATASETS,
+                    source=source or get_source(snapshot, no_cache),
+                    max_capacity_loss=max_capacity_loss)
     m.schedule_maintenance(start, duration)
+
+def impact(json_, max_capacity_loss, start, duration, hosts, from_file=None, no_cache=False,
+           refresh=False, snapshot=None, source=None):
+    max_capacity_loss = parse_max_capacity_loss(max_capacity_loss)
+    hosts = get_hosts(hosts, from_file)
+    m = Maintenance(hosts=hosts, datasets=ALL_DATASETS, no_cache=no_cache, refresh=refresh,
+                    source=source or get_source(snapshot, no_cache),
+                    max_capacity_loss=max_capacity_loss)
+    return m.impact(json_, start, duration)
+
+def save_snapshot(path):
+    m = Maintenance(datasets=ALL_DATASETS, no_cache=True, source=get_source(no_cache=True))
+    m.save_snapshot(path)
+    emitter.publish("Snapshot of {} saved to {}".format(m.source.url, path))
+    return 0
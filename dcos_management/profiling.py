@@ -0,0 +1,153 @@
+"""Spans of time spent in each phase of a command
+
+Phases are wrapped in `span(name)`. Until `start()` is called, `span()`
+returns a shared no-op span: instrumented code pays a global lookup and
+a function call. Once started, spans are recorded with their duration,
+thread and counts (bytes, records...), to be summarized with `--profile`
+or written as Chrome trace events (chrome://tracing, Perfetto) with
+`--trace-file`.
+"""
+import json
+import os
+import threading
+import time
+
+_recorder = None
+
+
+class _NullSpan(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def count(self, **counts):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span(object):
+
+    __slots__ = ('recorder', 'name', 'counts', 'start')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+        self.counts = {}
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.record(self.name, self.start, time.time(), self.counts)
+        return False
+
+    def count(self, **counts):
+        """
+        :param counts: amounts to add to the counts of the span, by unit
+        :type: dict of int
+        """
+        for unit, value in counts.items():
+            self.counts[unit] = self.counts.get(unit, 0) + value
+
+
+class Recorder(object):
+    """ Spans recorded by every thread """
+
+    def __init__(self):
+        self.started = time.time()
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def record(self, name, start, end, counts):
+        span = (name, start, end, threading.current_thread().ident, counts)
+        with self.lock:
+            self.spans.append(span)
+
+    def summary(self):
+        """
+        :returns: calls, seconds and counts of every phase, in order of
+                  first call
+        :rtype: list of dict
+        """
+        phases = {}
+        for name, start, end, _, counts in sorted(self.spans, key=lambda s: s[1]):
+            phase = phases.get(name)
+            if phase is None:
+                phase = phases[name] = {"phase": name, "calls": 0, "seconds": 0.0,
+                                        "bytes": None, "records": None, "first": start}
+            phase['calls'] += 1
+            phase['seconds'] += end - start
+            for unit, value in counts.items():
+                phase[unit] = (phase.get(unit) or 0) + value
+        return sorted(phases.values(), key=lambda p: p.pop('first'))
+
+    def trace_events(self):
+        """
+        :returns: spans, as complete events of the Chrome trace event format
+        :rtype: dict
+        """
+        pid = os.getpid()
+        events = [{"name": name, "ph": "X", "pid": pid, "tid": tid,
+                   "ts": int((start - self.started) * 1000000),
+                   "dur": int((end - start) * 1000000), "args": counts}
+                  for name, start, end, tid, counts in self.spans]
+        return {"traceEvents": sorted(events, key=lambda e: e['ts']),
+                "displayTimeUnit": "ms"}
+
+
+def start():
+    """ Record spans from now on
+
+    :rtype: Recorder
+    """
+    global _recorder
+    _recorder = Recorder()
+    return _recorder
+
+
+def stop():
+    """ Stop recording spans
+
+    :returns: recorded spans, None if recording wasn't started
+    :rtype: Recorder
+    """
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def enabled():
+    """
+    :returns: True while spans are recorded, to skip measuring otherwise
+    :rtype: boolean
+    """
+    return _recorder is not None
+
+
+def span(name):
+    """
+    :param name: phase name
+    :type: string
+    :returns: context manager timing the phase
+    :rtype: _Span
+    """
+    if _recorder is None:
+        return NULL_SPAN
+    return _Span(_recorder, name)
+
+
+def write_trace(recorder, path):
+    """
+    :param recorder: recorded spans
+    :type: Recorder
+    :param path: file to write Chrome trace events to
+    :type: string
+    """
+    with open(path, 'w') as f:
+        json.dump(recorder.trace_events(), f)
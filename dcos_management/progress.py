@@ -0,0 +1,63 @@
+"""Drain progress of machines under maintenance
+
+Tasks of the master state are hash joined to watched machines by agent ID,
+in a single pass: tasks of other agents are skipped at the cost of a set
+lookup, so a poll only costs the master state download.
+"""
+from dcos_management.sources import SCALAR_RESOURCES
+
+TERMINAL_STATES = frozenset(['TASK_FINISHED', 'TASK_FAILED', 'TASK_KILLED', 'TASK_LOST',
+                             'TASK_ERROR', 'TASK_DROPPED', 'TASK_GONE',
+                             'TASK_GONE_BY_OPERATOR'])
+"""States of tasks no longer holding resources on their agent"""
+
+
+def tasks_by_agent(tasks, agent_ids):
+    """
+    :param tasks: tasks, as `sources.trim_state` keeps them
+    :type: list of dict
+    :param agent_ids: agents to keep tasks of
+    :type: set of string
+    :returns: tasks still holding resources, by agent ID
+    :rtype: dict of list
+    """
+    joined = {}
+    for task in tasks:
+        agent_id = task['slave_id']
+        if agent_id in agent_ids and task['state'] not in TERMINAL_STATES:
+            joined.setdefault(agent_id, []).append(task)
+    return joined
+
+
+def machine_progress(record, tasks, frameworks):
+    """
+    :param record: a machine under maintenance
+    :type: AgentRecord
+    :param tasks: tasks still running on its agent
+    :type: list of dict
+    :param frameworks: framework names, by framework ID
+    :type: dict
+    :returns: remaining tasks, their frameworks and resources
+    :rtype: dict
+    """
+    row = record.to_dict()
+    row['tasks'] = len(tasks)
+    row['frameworks'] = sorted(set(frameworks.get(t['framework_id']) or t['framework_id']
+                                   for t in tasks))
+    for r in SCALAR_RESOURCES:
+        row[r] = round(sum(t['resources'].get(r) or 0 for t in tasks), 2)
+    return row
+
+
+def progress_rows(records, state):
+    """
+    :param records: machines to report on
+    :type: list of AgentRecord
+    :param state: running tasks, as `sources.trim_state` keeps them
+    :type: dict
+    :returns: progress of every machine, in order
+    :rtype: list of dict
+    """
+    joined = tasks_by_agent(state['tasks'], set(r.id for r in records if r.id))
+    return [machine_progress(r, joined.get(r.id, []), state['frameworks'])
+            for r in records]
@@ -0,0 +1,169 @@
+"""Maintenance schedule operations
+
+Schedules are the json documents of mesos `maintenance/schedule` endpoint.
+Operations never modify their input, they return a new schedule.
+"""
+from collections import OrderedDict
+
+from dcos_management.machines import machine_key
+
+
+def empty():
+    """
+    :returns: a schedule without any window
+    :rtype: dict
+    """
+    return {"windows": []}
+
+
+def unavailability_key(window):
+    """
+    :param window: a maintenance window
+    :type: dict
+    :returns: hashable key of window unavailability
+    :rtype: tuple
+    """
+    unavailability = window['unavailability']
+    duration = unavailability.get('duration') or {}
+    return (unavailability['start']['nanoseconds'],
+            duration.get('nanoseconds'))
+
+
+def windows(scheduled):
+    """
+    :param scheduled: a schedule, or None
+    :type: dict
+    :returns: windows of the schedule
+    :rtype: list of dict
+    """
+    if not scheduled:
+        return []
+    return scheduled.get('windows', [])
+
+
+def remove_machines(scheduled, machine_ids):
+    """
+    :param scheduled: a schedule
+    :type: dict
+    :param machine_ids: machine_ids to remove from every window
+    :type: list of dict | list of MachineId
+    :returns: schedule without machine_ids, empty windows dropped
+    :rtype: dict
+    """
+    removed = set(machine_key(m) for m in machine_ids)
+    result = empty()
+    for window in windows(scheduled):
+        kept = [m for m in window['machine_ids']
+                if machine_key(m) not in removed]
+        if kept:
+            result['windows'].append(
+                {"machine_ids": kept,
+                 "unavailability": window['unavailability']})
+    return result
+
+
+def window(machine_ids, start, duration):
+    """
+    :param machine_ids: machine_ids to schedule
+    :type: list of dict | list of MachineId
+    :param start: window start, in nanoseconds
+    :type: long
+    :param duration: window duration, in nanoseconds
+    :type: long
+    :returns: a maintenance window
+    :rtype: dict
+    """
+    return {
+        "machine_ids": [machine_key(m).to_dict() for m in machine_ids],
+        "unavailability": {
+            "start": {"nanoseconds": start},
+            "duration": {"nanoseconds": duration}
+        }
+    }
+
+
+def add_windows(scheduled, new_windows):
+    """ Add windows to a schedule. Their machines are moved out of other
+    windows, as mesos allows a machine in a single window only.
+
+    :param scheduled: a schedule, or None
+    :type: dict
+    :param new_windows: windows to add
+    :type: list of dict
+    :returns: updated schedule
+    :rtype: dict
+    """
+    moved = [m for w in new_windows for m in w['machine_ids']]
+    result = remove_machines(scheduled, moved)
+    result['windows'].extend(new_windows)
+    return result
+
+
+def compact(scheduled):
+    """ Merge windows sharing the same unavailability, drop duplicate
+    machine_ids (first one wins) and empty windows.
+
+    :param scheduled: a schedule, or None
+    :type: dict
+    :returns: compacted schedule
+    :rtype: dict
+    """
+    merged = OrderedDict()
+    seen = set()
+    for window in windows(scheduled):
+        key = unavailability_key(window)
+        for m in window['machine_ids']:
+            if machine_key(m) in seen:
+                continue
+            seen.add(machine_key(m))
+            if key not in merged:
+                merged[key] = {"machine_ids": [],
+                               "unavailability": window['unavailability']}
+            merged[key]['machine_ids'].append(m)
+    return {"windows": list(merged.values())}
+
+
+def window_end(window):
+    """
+    :param window: a maintenance window
+    :type: dict
+    :returns: window end, in nanoseconds, None for a window without duration
+    :rtype: long
+    """
+    start, duration = unavailability_key(window)
+    if duration is None:
+        return None
+    return start + duration
+
+
+def remove_expired(scheduled, before, kept=[]):
+    """ Drop windows ended before a given time, looking at windows only.
+
+    :param scheduled: a schedule, or None
+    :type: dict
+    :param before: windows ended before, in nanoseconds, are removed
+    :type: long
+    :param kept: machine_ids kept in their window anyway, as mesos refuses
+                 to unschedule DOWN machines
+    :type: list of dict
+    :returns: updated schedule and removed windows
+    :rtype: dict, list of dict
+    """
+    kept = set(machine_key(m) for m in kept)
+    result = empty()
+    removed = []
+    for window in windows(scheduled):
+        end = window_end(window)
+        if end is None or end >= before:
+            result['windows'].append(window)
+            continue
+        remaining = [m for m in window['machine_ids'] if machine_key(m) in kept]
+        if remaining:
+            result['windows'].append(
+                {"machine_ids": remaining,
+                 "unavailability": window['unavailability']})
+        reclaimed = [m for m in window['machine_ids'] if machine_key(m) not in kept]
+        if reclaimed:
+            removed.append({"machine_ids": reclaimed,
+                            "unavailability": window['unavailability']})
+    return result, removed
@@ -0,0 +1,309 @@
+"""Daemon keeping master state warm in memory
+
+`dcos management serve` keeps master datasets in memory, refreshed in the
+background, and runs maintenance commands sent by the CLI over a local Unix
+socket (see `dispatch`). Requests and replies are json documents, one per
+line.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+from concurrent import futures
+from six import StringIO
+from six.moves import socketserver
+
+from dcos import emitting, util
+from dcos.errors import DCOSException
+from dcos_management import completion, maintenance, schedule, sources
+from dcos_management.dispatch import PROTOCOL, call, get_socket_path
+from dcos_management.sources import ALL_DATASETS, AGENTS, STATUS, SCHEDULE
+
+DEFAULT_INTERVAL = 10
+"""Seconds between two background refreshes of master datasets"""
+
+READS = ['list', 'impact', 'timeline', 'at', 'progress']
+"""Commands served from the warm model only"""
+
+emitter = emitting.FlatEmitter()
+logger = util.get_logger(__name__)
+
+
+class Model(object):
+    """ Master datasets kept in memory
+
+    :param source: source of master datasets
+    :type source: MasterSource
+    :param interval: seconds between two background refreshes
+    :type interval: float
+    """
+
+    def __init__(self, source, interval=DEFAULT_INTERVAL):
+        self.source = source
+        self.interval = interval
+        self.datasets = {}
+        self.refreshed = 0
+
+    @property
+    def fresh(self):
+        """
+        :returns: False if background refreshes failed for a while
+        :rtype: boolean
+        """
+        return time.time() - self.refreshed < 3 * self.interval
+
+    def refresh(self, datasets=ALL_DATASETS):
+        """
+        :param datasets: datasets to fetch again from the source
+        :type: list of string
+        """
+        with futures.ThreadPoolExecutor(len(datasets)) as pool:
+            jobs = dict((d, pool.submit(self.source.fetch, d)) for d in datasets)
+        fetched = dict((d, job.result()) for d, job in jobs.items())
+        self.update(fetched)
+        if set(datasets) == set(ALL_DATASETS):
+            self.refreshed = time.time()
+
+    def update(self, fetched):
+        """
+        :param fetched: fresh datasets, keyed by name
+        :type: dict
+        """
+        # readers keep the previous dict, it's never modified in place
+        datasets = dict(self.datasets)
+        datasets.update(fetched)
+        self.datasets = datasets
+
+    def get(self, dataset):
+        """
+        :param dataset: dataset name
+        :type: string
+        :returns: dataset, shared with other readers: never modify it
+        :rtype: dict
+        """
+        return self.datasets.get(dataset)
+
+    def run(self, after=None):
+        """ Refresh every dataset until the process ends
+
+        :param after: called after every refresh
+        :type: function
+        """
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+                if after:
+                    after()
+            except Exception as e:
+                logger.exception(e)
+
+
+class WarmSource(object):
+    """ Source serving datasets of a warm model, or of the master for
+    datasets that must be read live. Mutations go to the master, the model
+    is refreshed once they're all done.
+
+    :param model: warm model
+    :type model: Model
+    :param warm: datasets served from the model
+    :type warm: list of string
+    """
+
+    cacheable = False
+
+    def __init__(self, model, warm=ALL_DATASETS):
+        self.model = model
+        self.warm = warm
+        self.posted = False
+
+    @property
+    def url(self):
+        return self.model.source.url
+
+    def master_url(self, path):
+        return self.model.source.master_url(path)
+
+    def fetch(self, dataset):
+        if dataset in self.warm and self.model.fresh:
+            return self.model.get(dataset)
+        data = self.model.source.fetch(dataset)
+        self.model.update({dataset: data})
+        return self.model.get(dataset)
+
+    def post(self, path, json_):
+        self.posted = True
+        return self.model.source.post(path, json_)
+
+    def refresh(self):
+        """ Refresh maintenance schedule and status of the model, if
+        anything was posted
+        """
+        if not self.posted:
+            return
+        try:
+            self.model.refresh([SCHEDULE, STATUS])
+        except Exception as e:
+            # refreshed again in the background
+            logger.exception(e)
+
+
+class Daemon(socketserver.UnixStreamServer):
+    """ Run commands against a warm model, one at a time
+
+    :param path: socket to listen on
+    :type path: string
+    :param model: warm model
+    :type model: Model
+    :param commands: commands to run, taking a `source` keyword argument
+    :type commands: list of Command
+    """
+
+    def __init__(self, path, model, commands):
+        self.model = model
+        self.commands = commands
+        # commands and sweeps swap process output, one at a time
+        self.lock = threading.Lock()
+        socketserver.UnixStreamServer.__init__(self, path, _Handler)
+
+    def sweep(self, older_than=None):
+        """ Remove expired windows, if the warm model has any. Output goes
+        to the daemon output.
+
+        :param older_than: seconds since windows ended
+        :type: string
+        """
+        before = maintenance.expired_before(older_than)
+        down = (self.model.get(STATUS) or {}).get('down_machines', [])
+        if not schedule.remove_expired(self.model.get(SCHEDULE), before, down)[1]:
+            return
+        source = WarmSource(self.model, [sources.AGENTS])
+        with self.lock:
+            try:
+                maintenance.flush_schedule([], False, True, older_than, source=source)
+            finally:
+                source.refresh()
+
+    def execute(self, request):
+        """
+        :param request: request of the CLI
+        :type: dict
+        :returns: reply, with `status`, `output` and `errors` or `error`
+        :rtype: dict
+        """
+        if request.get('protocol') != PROTOCOL:
+            return {"protocol": PROTOCOL, "status": 1,
+                    "error": "Unsupported protocol: {}".format(request.get('protocol'))}
+        args = request['args']
+        for hierarchy, arg_keys, function in self.commands:
+            if all(args.get(k) for k in hierarchy):
+                break
+        else:
+            return {"protocol": PROTOCOL, "status": 1,
+                    "error": "Could not find a command with the passed arguments"}
+
+        # reads are served warm, mutations read schedule and status live
+        warm = ALL_DATASETS if hierarchy[-1] in READS else [sources.AGENTS]
+        source = WarmSource(self.model, warm)
+        with self.lock:
+            stdout, stderr = sys.stdout, sys.stderr
+            sys.stdout, sys.stderr = StringIO(), StringIO()
+            try:
+                status = function(*[args.get(k) for k in arg_keys], source=source)
+                error = None
+            except DCOSException as e:
+                status, error = 1, str(e)
+            finally:
+                output, errors = sys.stdout.getvalue(), sys.stderr.getvalue()
+                sys.stdout, sys.stderr = stdout, stderr
+                source.refresh()
+        reply = {"protocol": PROTOCOL, "status": status or 0,
+                 "output": output, "errors": errors}
+        if error:
+            reply['error'] = error
+        return reply
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            reply = self.server.execute(json.loads(line.decode('utf-8')))
+        except Exception as e:
+            logger.exception(e)
+            reply = {"protocol": PROTOCOL, "status": 1, "error": str(e)}
+        self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+
+
+def listen(path, model, commands):
+    """
+    :param path: socket to listen on, a stale one is replaced
+    :type: string
+    :param model: warm model
+    :type model: Model
+    :param commands: commands to run
+    :type commands: list of Command
+    :rtype: Daemon
+    """
+    if os.path.exists(path):
+        if call(path, {}) is not None:
+            raise DCOSException("A daemon already listens on " + path)
+        os.remove(path)
+    util.ensure_dir_exists(os.path.dirname(path))
+    return Daemon(path, model, commands)
+
+
+def index_hosts(model, path):
+    """ Rebuild the index of hosts used by shell completion
+
+    :param model: refreshed datasets
+    :type: Model
+    :param path: index file
+    :type: string
+    """
+    completion.write_index(path, completion.index_words(model.get(AGENTS),
+                                                        model.get(STATUS)))
+
+
+def serve(commands, interval=None, sweep_expired=False, older_than=None):
+    """ Serve commands for the configured cluster until interrupted
+
+    :param commands: commands to run, taking a `source` keyword argument
+    :type commands: list of Command
+    :param interval: seconds between two background refreshes
+    :type interval: string
+    :param sweep_expired: remove expired windows after every refresh
+    :type sweep_expired: boolean
+    :param older_than: only remove windows ended for more than this many seconds
+    :type older_than: string
+    :rtype: int
+    """
+    source = maintenance.get_source()
+    model = Model(source, float(interval or DEFAULT_INTERVAL))
+    model.refresh()
+    index_path = completion.get_index_path()
+    index_hosts(model, index_path)
+    path = get_socket_path(source.url)
+    daemon = listen(path, model, commands)
+
+    def after():
+        if sweep_expired:
+            daemon.sweep(older_than)
+        index_hosts(model, index_path)
+    refresher = threading.Thread(target=model.run, args=(after,))
+    refresher.daemon = True
+    refresher.start()
+    emitter.publish("Serving {} on {}".format(source.url, path))
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+        os.remove(path)
+    return 0
@@ -0,0 +1,46 @@
+# bash completion of `dcos management`
+#
+#   eval "$(dcos-management management complete --script=bash)"
+#
+# Only `dcos management ...` is completed here, other subcommands are left
+# to the completion of dcos registered before, if any.
+
+_dcos_management_spec=$(complete -p dcos 2>/dev/null)
+if [[ "$_dcos_management_spec" != *" -F _dcos_management "* ]]; then
+    _dcos_management_previous=$(sed -n 's/.* -F \([^ ]*\) .*/\1/p' <<< "$_dcos_management_spec")
+fi
+
+_dcos_management() {
+    local line="${COMP_LINE:0:COMP_POINT}"
+    local -a words
+    read -r -a words <<< "$line"
+    # completing a new word
+    [[ "$line" =~ [[:space:]]$ ]] && words+=("")
+    if [[ ${#words[@]} -le 2 || "${words[1]}" != "management" ]]; then
+        COMPREPLY=()
+        if [[ -n "$_dcos_management_previous" ]]; then
+            "$_dcos_management_previous" "$@"
+        fi
+        if [[ ${#words[@]} -le 2 && "management" == "${words[1]}"* &&
+              " ${COMPREPLY[*]} " != *" management "* ]]; then
+            COMPREPLY+=("management")
+        fi
+        return 0
+    fi
+    local IFS=$'\n'
+    COMPREPLY=($(@COMPLETE@ -- "${words[@]:1}" 2>/dev/null))
+    if [[ ${#COMPREPLY[@]} -eq 0 ]]; then
+        # option values, such as files
+        compopt -o default 2>/dev/null
+    elif [[ ${#COMPREPLY[@]} -eq 1 && "${COMPREPLY[0]}" == *= ]]; then
+        compopt -o nospace 2>/dev/null
+    fi
+    return 0
+}
+
+# keep the options of the completion registered before
+if [[ -n "$_dcos_management_previous" ]]; then
+    eval "${_dcos_management_spec/ -F $_dcos_management_previous / -F _dcos_management }"
+elif [[ "$_dcos_management_spec" != *" -F _dcos_management "* ]]; then
+    complete -F _dcos_management dcos
+fi
@@ -0,0 +1,234 @@
+"""Sources of master datasets
+
+A source serves raw datasets (agents, schedule, status) and receives
+mutations. `MasterSource` talks to a live mesos master, `SnapshotSource`
+plays a captured snapshot back and prints mutations instead of sending them.
+"""
+import gzip
+import json
+import time
+
+from dcos import emitting, util
+from dcos.errors import DCOSException
+from dcos_management import constants, profiling
+from dcos_management.client import MasterClient
+
+# datasets served by sources
+AGENTS = "agents"
+SCHEDULE = "schedule"
+STATUS = "status"
+ALL_DATASETS = [AGENTS, SCHEDULE, STATUS]
+# running tasks, only read live: never cached nor saved in snapshots
+TASKS = "tasks"
+
+SCALAR_RESOURCES = sorted(r for r, t in constants.resource_types.items() if t == 'SCALAR')
+"""Resources accounted for in capacity and drain progress"""
+
+SNAPSHOT_FORMAT = 1
+
+emitter = emitting.FlatEmitter()
+logger = util.get_logger(__name__)
+
+
+def _scalars(resources):
+    return dict((r, v) for r, v in (resources or {}).items()
+                if constants.resource_types.get(r) == 'SCALAR')
+
+
+def trim_state_summary(state_summary):
+    """
+    :param state_summary: mesos master state summary
+    :type: dict
+    :returns: state summary stripped down to agent fields in use, scalar
+              resources included
+    :rtype: dict
+    """
+    return {"slaves": [{"hostname": agent['hostname'], "pid": agent['pid'], "id": agent['id'],
+                        "resources": _scalars(agent.get('resources')),
+                        "used_resources": _scalars(agent.get('used_resources'))}
+                       for agent in state_summary['slaves']]}
+
+
+def trim_state(state):
+    """
+    :param state: mesos master state
+    :type: dict
+    :returns: master state stripped down to tasks of active frameworks, with
+              scalar resources, and framework names
+    :rtype: dict
+    """
+    frameworks = {}
+    tasks = []
+    for framework in state.get('frameworks', []):
+        frameworks[framework['id']] = framework.get('name')
+        for task in framework.get('tasks', []):
+            tasks.append({"id": task['id'], "framework_id": framework['id'],
+                          "slave_id": task.get('slave_id'), "state": task.get('state'),
+                          "resources": _scalars(task.get('resources'))})
+    return {"frameworks": frameworks, "tasks": tasks}
+
+
+def fetch_maintenance_status(client):
+    """
+    :param client: client of the leading master
+    :type client: MasterClient
+    :returns: raw maintenance status from mesos master
+    :rtype: dict
+    """
+    try:
+        response = client.get('maintenance/status')
+        with profiling.span("decode status") as span:
+            status = response.json()
+            span.count(records=sum(len(status.get(k, []))
+                                   for k in ('draining_machines', 'down_machines')))
+        return status
+    except DCOSException as e:
+        logger.exception(e)
+    except Exception as e:
+        raise DCOSException("Unable to fetch maintenance status from mesos master: " + str(e))
+
+
+def get_scheduled(client):
+    """
+    :param client: client of the leading master
+    :type client: MasterClient
+    :returns: an object of maintenance schedule, None if there's no window.
+              A schedule that can't be read raises: mistaking it for an
+              empty one would drop every window on the next update
+    :rtype: dict of array
+    """
+    try:
+        response = client.get('maintenance/schedule')
+        with profiling.span("decode schedule") as span:
+            current_scheduled = response.json()
+            span.count(records=len(current_scheduled.get('windows', [])))
+        if "windows" not in current_scheduled:
+            return None
+        return current_scheduled
+    except DCOSException:
+        raise
+    except Exception:
+        raise DCOSException("Unable to fetch scheduled maintenance windows from mesos master")
+
+
+class MasterSource(object):
+    """ Datasets of the live mesos master, all requests of the source share
+    a single keep-alive session to the leader
+
+    :param dcos_client: client of the cluster, configured one by default
+    :type dcos_client: DCOSClient
+    :param no_cache: neither read nor write the cached leader URL
+    :type no_cache: boolean
+    :param token: ACS token of the cluster
+    :type token: string
+    """
+
+    cacheable = True
+
+    def __init__(self, dcos_client=None, no_cache=False, token=None):
+        self.client = MasterClient(dcos_client, no_cache=no_cache, token=token)
+
+    @property
+    def url(self):
+        return self.client.url
+
+    def master_url(self, path):
+        return self.client.master_url(path)
+
+    def fetch(self, dataset):
+        """
+        :param dataset: one of ALL_DATASETS, or TASKS
+        :type: string
+        :returns: raw dataset, None if unavailable
+        :rtype: dict
+        """
+        if dataset == AGENTS:
+            response = self.client.get('master/state-summary')
+            with profiling.span("decode agents") as span:
+                agents = trim_state_summary(response.json())
+                span.count(records=len(agents['slaves']))
+            return agents
+        if dataset == SCHEDULE:
+            return get_scheduled(self.client)
+        if dataset == TASKS:
+            response = self.client.get('master/state')
+            with profiling.span("decode tasks") as span:
+                tasks = trim_state(response.json())
+                span.count(records=len(tasks['tasks']))
+            return tasks
+        return fetch_maintenance_status(self.client)
+
+    def post(self, path, json_):
+        """
+        :param path: master endpoint
+        :type: string
+        :param json_: payload
+        :type: dict or list
+        :rtype: Response
+        """
+        return self.client.post(path, json=json_)
+
+
+class SnapshotSource(object):
+    """ Datasets of a snapshot saved by `save_snapshot`. Mutations are
+    published instead of being sent, and applied to the in-memory snapshot.
+
+    :param path: snapshot file
+    :type path: string
+    """
+
+    cacheable = False
+
+    def __init__(self, path):
+        self.path = path
+        snapshot = load_snapshot(path)
+        self.url = snapshot['master']
+        self.captured = snapshot['captured']
+        self.datasets = snapshot['datasets']
+
+    def master_url(self, path):
+        return self.url + path
+
+    def fetch(self, dataset):
+        return self.datasets.get(dataset)
+
+    def post(self, path, json_):
+        emitter.publish("Snapshot {}, not sent: POST {}".format(self.path, path))
+        emitter.publish(json_)
+        if path == 'maintenance/schedule':
+            self.datasets[SCHEDULE] = json_
+
+
+def save_snapshot(path, url, datasets):
+    """
+    :param path: snapshot file, gzip compressed json
+    :type: string
+    :param url: master URL datasets were captured from
+    :type: string
+    :param datasets: raw datasets, keyed by name
+    :type: dict
+    """
+    snapshot = {"format": SNAPSHOT_FORMAT, "master": url,
+                "captured": time.time(), "datasets": datasets}
+    try:
+        with gzip.open(path, 'wb') as f:
+            f.write(json.dumps(snapshot).encode('utf-8'))
+    except (IOError, OSError) as e:
+        raise DCOSException("Unable to write snapshot {}: {}".format(path, e))
+
+
+def load_snapshot(path):
+    """
+    :param path: snapshot file
+    :type: string
+    :returns: snapshot, with `master`, `captured` and `datasets` keys
+    :rtype: dict
+    """
+    try:
+        with gzip.open(path, 'rb') as f:
+            snapshot = json.loads(f.read().decode('utf-8'))
+    except (IOError, OSError, ValueError) as e:
+        raise DCOSException("Unable to read snapshot {}: {}".format(path, e))
+    if not isinstance(snapshot, dict) or snapshot.get('format') != SNAPSHOT_FORMAT:
+        raise DCOSException("Unsupported snapshot format: {}".format(path))
+    return snapshot
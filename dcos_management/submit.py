@@ -0,0 +1,106 @@
+"""Chunked submission of machines to `machine/up` and `machine/down`
+
+Machines are sent in chunks, a bounded number of chunks at once, so that
+no request grows with the cluster. The master refuses a whole request for
+a single bad machine: a refused chunk is split in halves and sent again,
+down to single machines, isolating k bad machines among n in O(k log n)
+requests while every other machine goes through.
+"""
+from concurrent import futures
+
+from dcos import util
+from dcos.errors import DCOSException, DCOSHTTPException
+
+DEFAULT_CHUNK_SIZE = 500
+"""Machines per request"""
+
+DEFAULT_PARALLEL = 4
+"""Requests sent at once"""
+
+logger = util.get_logger(__name__)
+
+
+def split(items, size):
+    """
+    :param items: items to split
+    :type: list
+    :param size: max items per chunk
+    :type: int
+    :returns: consecutive chunks
+    :rtype: list of list
+    """
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def refused(error):
+    """
+    :param error: error of a request
+    :type: DCOSException
+    :returns: True if the master refused the content of the request, as
+              opposed to being unreachable, unavailable or denying access
+    :rtype: boolean
+    """
+    if not isinstance(error, DCOSHTTPException):
+        return False
+    status = error.response.status_code
+    return 400 <= status < 500 and status not in (401, 403)
+
+
+def describe(error):
+    """
+    :param error: error of a request
+    :type: DCOSException
+    :returns: reason given by the master, if any
+    :rtype: string
+    """
+    if isinstance(error, DCOSHTTPException):
+        text = (error.response.text or "").strip()
+        return "HTTP {}: {}".format(error.response.status_code, text or error.response.reason)
+    return str(error)
+
+
+def _send(post, chunk):
+    # returns machines accepted, and machines failed along with the reason
+    try:
+        post(chunk)
+        return chunk, []
+    except DCOSException as e:
+        if len(chunk) == 1 or not refused(e):
+            return [], [(m, describe(e)) for m in chunk]
+        logger.info('%d machine(s) refused, retrying in halves: %s', len(chunk), describe(e))
+    half = len(chunk) // 2
+    accepted, failed = _send(post, chunk[:half])
+    more_accepted, more_failed = _send(post, chunk[half:])
+    return accepted + more_accepted, failed + more_failed
+
+
+def submit(post, machine_ids, chunk_size=DEFAULT_CHUNK_SIZE, parallel=DEFAULT_PARALLEL,
+           report=None):
+    """
+    :param post: sends a chunk of machine_ids, raises DCOSException on failure
+    :type: function
+    :param machine_ids: machine_ids to send
+    :type: list of MachineId
+    :param chunk_size: machine_ids per request
+    :type: int
+    :param parallel: requests sent at once
+    :type: int
+    :param report: called with the chunk number, chunk count, accepted and
+                   failed machine_ids of every chunk, as chunks complete
+    :type: function
+    :returns: accepted machine_ids, failed ones along with the reason
+    :rtype: (list of MachineId, list of (MachineId, string))
+    """
+    chunks = split(machine_ids, chunk_size)
+    accepted, failed = [], []
+    if not chunks:
+        return accepted, failed
+    with futures.ThreadPoolExecutor(max(1, min(parallel, len(chunks)))) as pool:
+        jobs = dict((pool.submit(_send, post, chunk), i) for i, chunk in enumerate(chunks))
+        for job in futures.as_completed(jobs):
+            chunk_accepted, chunk_failed = job.result()
+            accepted.extend(chunk_accepted)
+            failed.extend(chunk_failed)
+            if report:
+                report(jobs[job] + 1, len(chunks), chunk_accepted, chunk_failed)
+    return accepted, failed
@@ -1,34 +1,265 @@
-import copy
-import datetime
-import posixpath
+import json
+import numbers
 from collections import OrderedDict
 
-import prettytable
-from dcos import mesos, util
-from dcoscli import tables as dcoscli_tables
+import six
 
-def maintenance_table(maintenance):
-    """Returns a PrettyTable representation of the provided mesos tasks.
-    :rtype: PrettyTable
+from dcos.errors import DCOSException
+from dcos_management import profiling
+
+# header: (maintenance status field, alignment)
+MAINTENANCE_COLUMNS = OrderedDict([
+    ("HOST", ("hostname", "l")),
+    ("IP", ("ip", "l")),
+    ("ID", ("id", "l")),
+    ("STATE", ("state", "l")),
+    ("START", ("start", "l")),
+    ("DURATION", ("duration", "r")),
+    ("EXPIRED", ("expired", "c")),
+])
+
+
+# maintenance status of several clusters
+CLUSTER_COLUMNS = OrderedDict([("CLUSTER", ("cluster", "l"))] +
+                              [c for c in MAINTENANCE_COLUMNS.items()])
+
+
+def parse_columns(columns):
+    """
+    :param columns: comma separated column headers or fields, None for all
+    :type: string
+    :returns: selected column headers
+    :rtype: list of string
+    """
+    if not columns:
+        return list(MAINTENANCE_COLUMNS.keys())
+    return [column_header(c) for c in columns.split(',')]
+
+
+def column_header(column):
+    """
+    :param column: column header or field name, case insensitive
+    :type: string
+    :returns: column header
+    :rtype: string
+    """
+    for header, (field, _) in MAINTENANCE_COLUMNS.items():
+        if column.strip().upper() in (header, field.upper()):
+            return header
+    raise DCOSException("Unknown column: {}. Valid columns: {}".format(
+        column, ", ".join(MAINTENANCE_COLUMNS.keys())))
+
+
+def _sort_key(value):
+    # numbers first, then anything else (None, "None"...) as text
+    if isinstance(value, numbers.Number) and not isinstance(value, bool):
+        return (0, value, u"")
+    return (1, 0, u"{}".format(value))
+
+
+def sort_rows(rows, sort_by="STATE"):
+    """
+    :param rows: maintenance status
+    :type: list of dict
+    :param sort_by: column header or field to sort on
+    :type: string
+    :returns: sorted rows, stable
+    :rtype: list of dict
+    """
+    field = MAINTENANCE_COLUMNS[column_header(sort_by)][0]
+    with profiling.span("sort rows") as span:
+        values = [row.get(field) for row in rows]
+        # decorate each distinct value once, columns have few of them
+        keys = dict((v, _sort_key(v)) for v in set(values))
+        order = sorted(range(len(rows)), key=lambda i: keys[values[i]])
+        span.count(records=len(rows))
+        return [rows[i] for i in order]
+
+
+def _column(rows, field):
+    values = [row.get(field) for row in rows]
+    text = six.text_type
+    return [v if v.__class__ is text else text(v) for v in values]
+
+
+def maintenance_table(maintenance, columns=None, sort_by="STATE"):
+    """Returns a table representation of the provided maintenance status.
+    Cells are formatted column by column, widths are precomputed and every
+    line is rendered with a single format string.
+
+    :param maintenance: maintenance status
+    :type: list of dict
+    :param columns: column headers to render, None for all
+    :type: list of string
+    :param sort_by: column header or field to sort on, None to keep order
+    :type: string
+    :returns: the table, empty if there's no maintenance
+    :rtype: string
+    """
+    if not maintenance:
+        return u""
+    if sort_by:
+        maintenance = sort_rows(maintenance, sort_by)
+    return _render(maintenance, MAINTENANCE_COLUMNS, columns)
+
+
+def clusters_table(maintenance, columns=None, sort_by="STATE"):
+    """Returns a table representation of the maintenance status of several
+    clusters, grouped by cluster
+
+    :param maintenance: maintenance status, with a `cluster` field
+    :type: list of dict
+    :param columns: column headers to render after CLUSTER, None for all
+    :type: list of string
+    :param sort_by: column header or field to sort on within a cluster
+    :type: string
+    :returns: the table, empty if there's no maintenance
+    :rtype: string
+    """
+    if not maintenance:
+        return u""
+    if sort_by:
+        maintenance = sort_rows(maintenance, sort_by)
+    maintenance = sorted(maintenance, key=lambda row: row['cluster'])
+    return _render(maintenance, CLUSTER_COLUMNS,
+                   ["CLUSTER"] + (columns or list(MAINTENANCE_COLUMNS.keys())))
+
+
+def _render(rows, spec, headers=None):
+    with profiling.span("render table") as span:
+        table = _render_lines(rows, spec, headers)
+        span.count(records=len(rows), bytes=len(table))
+        return table
+
+
+def _render_lines(rows, spec, headers=None):
+    headers = headers or list(spec.keys())
+    cells = [_column(rows, spec[h][0]) for h in headers]
+    widths = [max([len(h)] + [len(c) for c in column])
+              for h, column in zip(headers, cells)]
+    align = {"l": u"<", "r": u">", "c": u"<"}
+    for i, h in enumerate(headers):
+        # str.center() distributes odd padding like prettytable did
+        if spec[h][1] == "c":
+            cells[i] = [c.center(widths[i]) for c in cells[i]]
+    line = u"".join(u"{{:{}{}}}  ".format(align[spec[h][1]], w)
+                    for h, w in zip(headers, widths))
+
+    lines = [line.format(*headers)]
+    lines.extend(line.format(*row) for row in zip(*cells))
+    return u"\n".join(lines)
+
+
+TIMELINE_COLUMNS = OrderedDict([
+    ("FROM", ("from", "l")),
+    ("TO", ("to", "l")),
+    ("WINDOWS", ("windows", "r")),
+    ("DRAINING", ("draining", "r")),
+    ("DOWN", ("down", "r")),
+])
+
+
+def timeline_table(timeline):
+    """Returns a table representation of a maintenance timeline
+
+    :param timeline: time buckets
+    :type: list of dict
+    :rtype: string
     """
+    if not timeline:
+        return u""
+    return _render(timeline, TIMELINE_COLUMNS)
+
 
-    fields = OrderedDict([
-        ("HOST", lambda t: t["hostname"]),
-        ("IP", lambda t: t["ip"]),
-        ("ID", lambda t: t["id"]),
-        ("STATE", lambda t: t["state"]),
-        ("START", lambda t: t["start"]),
-        ("DURATION", lambda t: t["duration"]),
-        ("EXPIRED", lambda t: t["expired"]),
+def impact_table(impact, resources):
+    """Returns a table representation of the capacity impact of windows
 
+    :param impact: windows impact
+    :type: list of dict
+    :param resources: resources shown, in order
+    :type: list of string
+    :rtype: string
+    """
+    if not impact:
+        return u""
+    spec = OrderedDict([
+        ("START", ("start", "l")),
+        ("DURATION", ("duration", "r")),
+        ("HOSTS", ("hosts", "r")),
     ])
+    for r in resources:
+        spec["{} LOST %".format(r.upper())] = (r + "_lost", "r")
+        spec["{} USED %".format(r.upper())] = (r + "_used", "r")
+    return _render(impact, spec)
+
+
+PROGRESS_COLUMNS = OrderedDict([
+    ("HOST", ("hostname", "l")),
+    ("IP", ("ip", "l")),
+    ("ID", ("id", "l")),
+    ("STATE", ("state", "l")),
+    ("TASKS", ("tasks", "r")),
+    ("CPUS", ("cpus", "r")),
+    ("MEM", ("mem", "r")),
+    ("DISK", ("disk", "r")),
+    ("FRAMEWORKS", ("frameworks", "l")),
+])
 
-    tb = dcoscli_tables.table(fields, maintenance, sortby="STATE")
-    tb.align["HOST"] = "l"
-    tb.align["IP"] = "l"
-    tb.align["ID"] = "l"
-    tb.align["STATE"] = "l"
-    tb.align["START"] = "l"
-    tb.align["DURATION"] = "r"
-    tb.align["EXPIRED"] = "c"
-    return tb
+
+def progress_table(progress):
+    """Returns a table representation of the drain progress of machines
+
+    :param progress: remaining tasks and resources of every machine
+    :type: list of dict
+    :rtype: string
+    """
+    if not progress:
+        return u""
+    rows = [dict(row, frameworks=u",".join(row['frameworks'])) for row in progress]
+    return _render(rows, PROGRESS_COLUMNS)
+
+
+PROFILE_COLUMNS = OrderedDict([
+    ("PHASE", ("phase", "l")),
+    ("CALLS", ("calls", "r")),
+    ("MS", ("ms", "r")),
+    ("BYTES", ("bytes", "r")),
+    ("RECORDS", ("records", "r")),
+])
+
+
+def profile_table(phases):
+    """Returns a table representation of time spent in each phase
+
+    :param phases: phases, as `Recorder.summary` returns them
+    :type: list of dict
+    :rtype: string
+    """
+    if not phases:
+        return u""
+    rows = [dict(p, ms="{:.1f}".format(p['seconds'] * 1000),
+                 bytes="" if p['bytes'] is None else p['bytes'],
+                 records="" if p['records'] is None else p['records'])
+            for p in phases]
+    return _render_lines(rows, PROFILE_COLUMNS)
+
+
+def ndjson(rows, columns=None):
+    """Serialize rows as newline delimited json, one record per line, as
+    rows are produced.
+
+    :param rows: maintenance status
+    :type: iterable of dict
+    :param columns: column headers to keep, CLUSTER included, None for
+                    every field
+    :type: list of string
+    :returns: json lines
+    :rtype: generator of string
+    """
+    fields = None
+    if columns:
+        fields = [CLUSTER_COLUMNS[h][0] for h in columns]
+    for row in rows:
+        if fields:
+            row = OrderedDict((f, row.get(f)) for f in fields)
+        yield json.dumps(row)
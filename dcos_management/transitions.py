@@ -0,0 +1,80 @@
+"""Transitions of machines between maintenance states
+
+A transition is planned in a single pass over the local schedule and
+maintenance status: the target schedule and the machines to bring down or
+up are computed first, then issued as the minimal ordered sequence of
+master calls, at most one of each:
+
+1. `maintenance/schedule`, only if the target schedule differs. It goes
+   first: machines must be scheduled before they're brought down, and
+   DOWN machines must stay scheduled until they're brought up, which
+   unschedules them.
+2. `machine/down`, only if machines are brought down.
+3. `machine/up`, only if machines are brought up.
+"""
+from dcos_management import schedule
+
+SCHEDULE_PATH = 'maintenance/schedule'
+DOWN_PATH = 'machine/down'
+UP_PATH = 'machine/up'
+# state machines are brought to, by endpoint
+TARGET_STATES = {DOWN_PATH: "DOWN", UP_PATH: "UP"}
+
+
+class Plan(object):
+    """ Master calls of a transition
+
+    :param base: schedule the transition starts from, or None
+    :type base: dict
+    :param windows: windows to add, their machines moved out of others
+    :type windows: list of dict
+    :param unscheduled: machines to remove from the schedule
+    :type unscheduled: list of MachineId
+    :param down: machines to bring down, scheduled by the target schedule
+    :type down: list of MachineId
+    :param up: DOWN machines to bring up
+    :type up: list of MachineId
+    """
+
+    def __init__(self, base, windows=None, unscheduled=None, down=None, up=None):
+        self.base = base
+        self.windows = windows or []
+        self.unscheduled = unscheduled or []
+        self.down = down or []
+        self.up = up or []
+        self.scheduled = self.apply(base)
+
+    def apply(self, scheduled):
+        """
+        :param scheduled: a schedule, or None
+        :type: dict
+        :returns: the schedule, with the changes of the plan
+        :rtype: dict
+        """
+        if self.windows:
+            scheduled = schedule.add_windows(scheduled, self.windows)
+        if self.unscheduled:
+            scheduled = schedule.remove_machines(scheduled, self.unscheduled)
+        return schedule.compact(scheduled)
+
+    @property
+    def updates_schedule(self):
+        """
+        :returns: True if the target schedule differs from the base one
+        :rtype: boolean
+        """
+        return self.scheduled != schedule.compact(self.base)
+
+    def calls(self):
+        """
+        :returns: master calls, in order, as endpoint and payload
+        :rtype: list of (string, dict | list of MachineId)
+        """
+        calls = []
+        if self.updates_schedule:
+            calls.append((SCHEDULE_PATH, self.scheduled))
+        if self.down:
+            calls.append((DOWN_PATH, self.down))
+        if self.up:
+            calls.append((UP_PATH, self.up))
+        return calls
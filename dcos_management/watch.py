@@ -0,0 +1,237 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from six.moves import queue
+
+from dcos import util
+from dcos.errors import DCOSException
+from dcos_management.machines import machine_key
+
+DEFAULT_INTERVAL = 2
+"""Seconds between two refreshes of maintenance status"""
+
+SUBSCRIBE_TIMEOUT = (5, 60)
+"""Connect and read timeouts of the event stream. Masters send a heartbeat
+every 15 seconds, a silent stream is considered lost"""
+
+ROW_FORMAT = u"{0:1} {1:<24} {2:<15} {3:<42} {4:<9} {5:>10} {6:>8} {7}"
+ROW_FIELDS = ["hostname", "ip", "id", "state", "start", "duration", "expired"]
+
+logger = util.get_logger(__name__)
+
+
+def read_recordio(chunks):
+    """ Decode a RecordIO stream, made of `<length>\\n<json record>`
+
+    :param chunks: raw stream chunks
+    :type: iterable of bytes
+    :returns: decoded records
+    :rtype: generator of dict
+    """
+    buf = b""
+    for chunk in chunks:
+        buf += chunk
+        while True:
+            newline = buf.find(b"\n")
+            if newline < 0:
+                break
+            length = int(buf[:newline])
+            end = newline + 1 + length
+            if len(buf) < end:
+                break
+            record = buf[newline + 1:end]
+            buf = buf[end:]
+            yield json.loads(record.decode('utf-8'))
+
+
+def subscribe(client):
+    """ Subscribe to mesos v1 operator API events, over the session of the
+    client: same leader, ACS token and SSL verification
+
+    :param client: client of the leading master
+    :type: MasterClient
+    :returns: master events
+    :rtype: generator of dict
+    """
+    try:
+        response = client.session.post(client.master_url('api/v1'),
+                                       json={"type": "SUBSCRIBE"}, stream=True,
+                                       verify=client.verify, timeout=SUBSCRIBE_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        raise DCOSException("Unable to subscribe to master events: {}".format(e))
+    if response.status_code != 200:
+        raise DCOSException("Unable to subscribe to master events: HTTP {}".format(
+            response.status_code))
+    return read_recordio(response.iter_content(chunk_size=None))
+
+
+def _agent(agent):
+    """
+    :param agent: agent of an operator API event
+    :type: dict
+    :returns: agent in the state summary format
+    :rtype: dict
+    """
+    info = agent['agent_info']
+    return {"hostname": info['hostname'], "pid": agent['pid'],
+            "id": info['id']['value']}
+
+
+class EventAgents(object):
+    """ Registered agents, maintained from master events """
+
+    def __init__(self):
+        self.agents = OrderedDict()
+        self.subscribed = False
+
+    def apply(self, event):
+        """
+        :param event: master event
+        :type: dict
+        :returns: True if registered agents changed
+        :rtype: boolean
+        """
+        if event['type'] == 'SUBSCRIBED':
+            self.agents.clear()
+            state = event['subscribed'].get('get_state', {})
+            for agent in state.get('get_agents', {}).get('agents', []):
+                agent = _agent(agent)
+                self.agents[agent['id']] = agent
+            self.subscribed = True
+            return True
+        if event['type'] == 'AGENT_ADDED':
+            agent = _agent(event['agent_added']['agent'])
+            self.agents[agent['id']] = agent
+            return True
+        if event['type'] == 'AGENT_REMOVED':
+            return self.agents.pop(event['agent_removed']['agent_id']['value'],
+                                   None) is not None
+        return False
+
+    def state_summary(self):
+        """
+        :returns: agents in the (trimmed) state summary format
+        :rtype: dict
+        """
+        return {"slaves": list(self.agents.values())}
+
+
+class MaintenanceView(object):
+    """ Rows of `maintenance list`, updated incrementally """
+
+    def __init__(self):
+        self.rows = OrderedDict()
+
+    def update(self, rows):
+        """
+        :param rows: current full maintenance status
+        :type: list of dict
+        :returns: changed rows, marked `+` (new), `~` (changed) or `-` (gone)
+        :rtype: list of (string, dict)
+        """
+        current = OrderedDict()
+        for row in rows:
+            current[machine_key(row)] = dict((f, row.get(f)) for f in ROW_FIELDS)
+        changes = []
+        for key, row in current.items():
+            previous = self.rows.get(key)
+            if previous is None:
+                changes.append(("+", row))
+            elif previous != row:
+                changes.append(("~", row))
+        for key, row in self.rows.items():
+            if key not in current:
+                changes.append(("-", row))
+        self.rows = current
+        return changes
+
+
+def format_row(marker, row):
+    """
+    :param marker: change marker
+    :type: string
+    :param row: maintenance status row
+    :type: dict
+    :returns: a line of output
+    :rtype: string
+    """
+    values = [u"" if row.get(f) is None else u"{}".format(row.get(f))
+              for f in ROW_FIELDS]
+    return ROW_FORMAT.format(marker, *values)
+
+
+def _pump(events, events_queue):
+    try:
+        for event in events:
+            events_queue.put(event)
+    except Exception as e:
+        logger.exception(e)
+    events_queue.put(None)
+
+
+def run(load_rows, publish, events=None, interval=DEFAULT_INTERVAL, updates=None):
+    """ Publish maintenance status, then only rows that changed.
+
+    Registered agents are maintained from the master event stream: agent
+    changes are rendered right away against the last maintenance status and
+    schedule, both small, which are only re-fetched every interval. Other
+    events (task updates, heartbeats...) cost nothing. Without event stream
+    (or once it's lost), everything is polled every interval.
+
+    :param load_rows: returns full maintenance status, given agents in the
+                      state summary format, or None to fetch them, and
+                      whether to fetch maintenance status and schedule
+                      again rather than reuse the last ones
+    :type: function
+    :param publish: publish a line of output
+    :type: function
+    :param events: master events
+    :type: iterable of dict
+    :param interval: seconds between two refreshes
+    :type: float
+    :param updates: stop after this number of refreshes, None to run forever
+    :type: int
+    """
+    agents = EventAgents()
+    events_queue = queue.Queue()
+    streaming = events is not None
+    if streaming:
+        pump = threading.Thread(target=_pump, args=(events, events_queue))
+        pump.daemon = True
+        pump.start()
+
+    view = MaintenanceView()
+    publish(format_row(" ", dict((f, f.upper()) for f in ROW_FIELDS)))
+    count = 0
+    fetched = None
+    while updates is None or count < updates:
+        changed = False
+        if streaming:
+            timeout = interval if fetched is None else max(0, fetched + interval - time.time())
+            try:
+                event = events_queue.get(timeout=timeout)
+                while event is not None:
+                    changed = agents.apply(event) or changed
+                    event = events_queue.get_nowait()
+            except queue.Empty:
+                event = False
+            if event is None:
+                streaming = False
+                publish("Master event stream lost, polling every {}s".format(interval))
+            elif not agents.subscribed:
+                continue
+        elif count > 0:
+            time.sleep(interval)
+
+        refetch = not streaming or fetched is None or time.time() - fetched >= interval
+        if not (refetch or changed):
+            continue
+        if refetch:
+            fetched = time.time()
+        state_summary = agents.state_summary() if agents.subscribed and streaming else None
+        for marker, row in view.update(load_rows(state_summary, refetch)):
+            publish(format_row(marker, row))
+        count += 1
@@ -70,6 +70,10 @@ setup(
     install_requires=[
         'docopt',
         'dcos',
+        'requests',
+        'six',
+        'toml',
+        'futures; python_version < "3"',
     ],
 
     # List additional groups of dependencies here (e.g. development
@@ -79,12 +83,13 @@ setup(
     extras_require={
         'dev': ['check-manifest'],
         'test': ['coverage'],
+        'impact': ['numpy'],
     },
 
     # If there are data files included in your packages that need to be
     # installed, specify them here.  If using Python 2.6 or less, then these
     # have to be included in MANIFEST.in as well.
-    package_data={},
+    package_data={'dcos_management': ['shell/*']},
 
     # Although 'package_data' is the preferred approach, in some case you may
     # need to place data files outside of your packages.
@@ -0,0 +1,237 @@
+"""Benchmark maintenance commands against a local stand-in master
+
+Usage:
+    bench.py [--sizes=<sizes>] [--latency=<secs>] [--repeat=<n>] [--commands=<commands>] [--output=<path>]
+
+Options:
+    --sizes=<sizes>        Comma separated numbers of agents [default: 100,1000,10000]
+    --latency=<secs>       Latency of every master request [default: 0]
+    --repeat=<n>           Runs per measure, the median is kept [default: 3]
+    --commands=<commands>  Comma separated commands to run, all by default
+    --output=<path>        Write results as json to this file
+"""
+import contextlib
+import copy
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+import docopt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import cluster  # noqa: E402
+from fake_master import FakeMaster  # noqa: E402
+from dcos_management import maintenance, tables  # noqa: E402
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+@contextlib.contextmanager
+def _quiet():
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+
+
+@contextlib.contextmanager
+def _timed(timings, phase):
+    start = time.time()
+    yield
+    timings[phase] = time.time() - start
+
+
+class Scenario(object):
+    """A synthetic cluster served by a local stand-in master
+
+    :param agents: number of machines
+    :type agents: int
+    :param latency: latency of every master request
+    :type latency: float
+    """
+
+    def __init__(self, agents, latency=0):
+        self.agents = agents
+        self.documents = cluster.generate(agents)
+        self.master = FakeMaster(latency=latency).start()
+        self.config_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.config_dir, 'dcos.toml'), 'w') as f:
+            f.write('[core]\nmesos_master_url = "{}"\n'.format(self.master.url))
+        os.environ['DCOS_CONFIG'] = os.path.join(self.config_dir, 'dcos.toml')
+        self.reset()
+
+    def reset(self):
+        state_summary, schedule, status = copy.deepcopy(self.documents)
+        self.master.documents.update({
+            '/master/state-summary': state_summary,
+            '/maintenance/schedule': schedule,
+            '/maintenance/status': status,
+        })
+
+    def close(self):
+        self.master.stop()
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+
+    def hosts(self, kind, ratio=0.01):
+        """
+        :param kind: `up`, `draining` or `down` machines
+        :type kind: str
+        :param ratio: ratio of the cluster to select
+        :type ratio: float
+        :returns: hostnames
+        :rtype: list of str
+        """
+        state_summary, schedule, status = self.documents
+        if kind == 'down':
+            return [m['hostname'] for m in status['down_machines']]
+        if kind == 'draining':
+            return [m['id']['hostname'] for m in status['draining_machines']]
+        scheduled = set(m['hostname'] for w in schedule['windows']
+                        for m in w['machine_ids'])
+        up = [a['hostname'] for a in state_summary['slaves']
+              if a['hostname'] not in scheduled]
+        return up[:max(1, int(self.agents * ratio))]
+
+
+def _list(m, timings):
+    with _timed(timings, 'filter'):
+        m.full_maintenance_status
+    with _timed(timings, 'render'):
+        tables.maintenance_table(m.full_maintenance_status)
+
+
+def _mutation(post):
+    def run(m, timings):
+        with _timed(timings, 'resolve'):
+            m.machine_ids
+        with _timed(timings, 'filter'):
+            m.filter(m.machine_ids)
+        with _timed(timings, 'post'):
+            post(m)
+    return run
+
+
+# command: (hosts kind, end to end function, phases function)
+COMMANDS = OrderedDict([
+    ('list', (None,
+              lambda hosts: maintenance.list(False, no_cache=True),
+              _list)),
+    ('down', ('up',
+              lambda hosts: maintenance.down(hosts, no_cache=True),
+              _mutation(lambda m: m.down()))),
+    ('up', ('down',
+            lambda hosts: maintenance.up(hosts, False, no_cache=True),
+            _mutation(lambda m: m.up()))),
+    ('schedule add', ('up',
+                      lambda hosts: maintenance.schedule_maintenance(
+                          None, None, hosts, no_cache=True),
+                      _mutation(lambda m: m.schedule_maintenance(None, None)))),
+    ('schedule remove', ('draining',
+                         lambda hosts: maintenance.flush_schedule(
+                             hosts, False, no_cache=True),
+                         _mutation(lambda m: m.flush()))),
+    ('rollout', ('up',
+                 lambda hosts: maintenance.rollout(
+                     None, None, None, '10%', hosts, no_cache=True),
+                 _mutation(lambda m: m.rollout(None, None, None, '10%')))),
+])
+
+
+def bench_command(scenario, command, repeat=3):
+    """
+    :param scenario: cluster to run against
+    :type scenario: Scenario
+    :param command: command name, from COMMANDS
+    :type command: str
+    :param repeat: runs per measure, the median is kept
+    :type repeat: int
+    :returns: end to end and per phase timings, in seconds
+    :rtype: dict
+    """
+    kind, end_to_end, phases = COMMANDS[command]
+    hosts = scenario.hosts(kind) if kind else []
+    runs = []
+    phase_runs = []
+    for _ in range(repeat):
+        scenario.reset()
+        with _quiet():
+            start = time.time()
+            end_to_end(list(hosts))
+            runs.append(time.time() - start)
+
+        scenario.reset()
+        timings = OrderedDict()
+        with _quiet():
+            with _timed(timings, 'fetch'):
+                m = maintenance.Maintenance(
+                    hosts=list(hosts), no_cache=True,
+                    datasets=maintenance.ALL_DATASETS)
+                m.agents
+                m.maintenance_status
+                m.scheduled
+            phases(m, timings)
+        phase_runs.append(timings)
+
+    return OrderedDict([
+        ('command', command),
+        ('agents', scenario.agents),
+        ('hosts', len(hosts)),
+        ('end_to_end', _median(runs)),
+        ('phases', OrderedDict((p, _median([t[p] for t in phase_runs]))
+                               for p in phase_runs[0])),
+    ])
+
+
+def run(sizes, latency=0, repeat=3, commands=None):
+    """
+    :returns: benchmark report
+    :rtype: dict
+    """
+    results = []
+    for size in sizes:
+        scenario = Scenario(size, latency)
+        try:
+            for command in commands or COMMANDS:
+                results.append(bench_command(scenario, command, repeat))
+        finally:
+            scenario.close()
+    return OrderedDict([
+        ('python', platform.python_version()),
+        ('date', int(time.time())),
+        ('latency', latency),
+        ('repeat', repeat),
+        ('results', results),
+    ])
+
+
+def main():
+    args = docopt.docopt(__doc__)
+    sizes = [int(s) for s in args['--sizes'].split(',')]
+    commands = args['--commands'].split(',') if args['--commands'] else None
+    report = run(sizes, float(args['--latency']), int(args['--repeat']),
+                 commands)
+    for r in report['results']:
+        print('{:>6} agents  {:<16} {:8.3f}s  {}'.format(
+            r['agents'], r['command'], r['end_to_end'],
+            '  '.join('{}={:.3f}'.format(p, t)
+                      for p, t in r['phases'].items())))
+    if args['--output']:
+        with open(args['--output'], 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import random
+import time
+
+STONS = 1000000000
+FRAMEWORK_ID = "dd85d3f3-ecc5-4f9d-b851-dc88086834ff"
+
+
+def machine_id(i):
+    """
+    :param i: machine number
+    :type i: int
+    :returns: machine_id of the i-th machine of a synthetic cluster
+    :rtype: dict
+    """
+    return {"hostname": "agent-{:05d}.cluster.local".format(i),
+            "ip": "10.{}.{}.{}".format(i >> 16, (i >> 8) & 255, i & 255)}
+
+
+def generate(agents, draining=0.05, down=0.02, window_size=50, seed=0):
+    """Generate master documents of a synthetic cluster.
+
+    Scheduled machines are grouped in windows of `window_size` machines,
+    starting up to two hours before or after now. Scheduled machines are
+    DRAINING, except DOWN ones, which are in past windows and are not
+    registered agents anymore.
+
+    :param agents: number of machines
+    :type agents: int
+    :param draining: ratio of DRAINING machines
+    :type draining: float
+    :param down: ratio of DOWN machines
+    :type down: float
+    :param window_size: machines per maintenance window
+    :type window_size: int
+    :param seed: random seed
+    :type seed: int
+    :returns: state summary, maintenance schedule and status
+    :rtype: (dict, dict, dict)
+    """
+    rng = random.Random(seed)
+    now = int(time.time())
+    machines = list(range(agents))
+    rng.shuffle(machines)
+    n_down = int(agents * down)
+    n_draining = int(agents * draining)
+    downs = set(machines[:n_down])
+    drainings = set(machines[n_down:n_down + n_draining])
+
+    state_summary = {"slaves": []}
+    for i in range(agents):
+        if i in downs:
+            continue
+        m = machine_id(i)
+        state_summary["slaves"].append({
+            "id": "{}-S{}".format(FRAMEWORK_ID, i),
+            "hostname": m["hostname"],
+            "pid": "slave(1)@{}:5051".format(m["ip"]),
+            "resources": {"cpus": 8, "mem": 32768, "disk": 102400,
+                          "ports": "[1025-2180, 2182-3887, 3889-5049]"},
+            "used_resources": {"cpus": rng.randint(0, 8),
+                               "mem": rng.randint(0, 32768),
+                               "disk": 0, "ports": "[]"},
+        })
+
+    windows = []
+    downs_, drainings_ = sorted(downs), sorted(drainings)
+    for offset in range(0, len(downs_), window_size):
+        windows.append((downs_[offset:offset + window_size],
+                        now - rng.randint(60, 3000)))
+    for offset in range(0, len(drainings_), window_size):
+        windows.append((drainings_[offset:offset + window_size],
+                        now + rng.randint(-7200, 7200)))
+    schedule = {"windows": [
+        {"machine_ids": [machine_id(i) for i in members],
+         "unavailability": {"start": {"nanoseconds": start * STONS},
+                            "duration": {"nanoseconds": 3600 * STONS}}}
+        for members, start in windows]}
+
+    status = {
+        "draining_machines": [{"id": machine_id(i)} for i in sorted(drainings)],
+        "down_machines": [machine_id(i) for i in sorted(downs)],
+    }
+    return state_summary, schedule, status
@@ -0,0 +1,27 @@
+import json
+
+import bench
+import cluster
+
+
+def test_generate():
+    state_summary, schedule, status = cluster.generate(200)
+    down = set(m['hostname'] for m in status['down_machines'])
+    draining = set(m['id']['hostname'] for m in status['draining_machines'])
+    registered = set(a['hostname'] for a in state_summary['slaves'])
+    scheduled = set(m['hostname'] for w in schedule['windows']
+                    for m in w['machine_ids'])
+
+    assert len(registered) + len(down) == 200
+    assert not down & registered
+    assert down | draining == scheduled
+
+
+def test_run():
+    report = bench.run([50], repeat=1)
+    assert [r['command'] for r in report['results']] == list(bench.COMMANDS)
+    for result in report['results']:
+        assert result['agents'] == 50
+        assert result['end_to_end'] > 0
+        assert 'fetch' in result['phases']
+    json.dumps(report)
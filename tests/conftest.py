@@ -0,0 +1,17 @@
+import pytest
+
+from fake_master import FakeMaster
+
+
+@pytest.fixture
+def fake_master():
+    """Builds and starts local stand-ins for a mesos master"""
+    masters = []
+
+    def start(**kwargs):
+        masters.append(FakeMaster(**kwargs).start())
+        return masters[-1]
+
+    yield start
+    for master in masters:
+        master.stop()
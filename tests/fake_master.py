@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+
+from six.moves import BaseHTTPServer, socketserver
+
+
+class FakeMaster(object):
+    """Local stand-in for a mesos master
+
+    :param state_summary: `master/state-summary` document
+    :type state_summary: dict
+    :param schedule: `maintenance/schedule` document
+    :type schedule: dict
+    :param status: `maintenance/status` document
+    :type status: dict
+    :param state: `master/state` document
+    :type state: dict
+    :param events: operator API events streamed on SUBSCRIBE
+    :type events: list of dict
+    :param latency: seconds to wait before answering any request
+    :type latency: float
+    :param stream_hold: seconds to keep the event stream open after events
+    :type stream_hold: float
+    :param leader: URL of the leading master to redirect requests to
+    :type leader: str
+    :param unavailable: number of requests answered with 503 first
+    :type unavailable: int
+    :param authorization: Authorization header required by every request,
+                          answered with 401 otherwise
+    :type authorization: str
+    :param errors: paths answered with 500, can be changed while running
+    :type errors: set of str
+    """
+
+    def __init__(self, state_summary=None, schedule=None, status=None,
+                 events=None, latency=0, stream_hold=0, leader=None,
+                 unavailable=0, state=None, authorization=None,
+                 errors=None):
+        self.documents = {
+            '/master/state-summary': state_summary or {"slaves": []},
+            '/maintenance/schedule': schedule or {},
+            '/maintenance/status': status or {},
+            '/master/state': state or {"frameworks": []},
+        }
+        self.events = events or []
+        self.latency = latency
+        self.stream_hold = stream_hold
+        self.leader = leader
+        self.unavailable = unavailable
+        self.authorization = authorization
+        self.errors = set(errors or [])
+        self.requests = []
+        self.posts = []
+        # Authorization header of every request
+        self.authorizations = []
+        # client addresses, one per connection
+        self.connections = set()
+        self._server = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/'.format(self._server.server_address[1])
+
+    def start(self):
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.master = self
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        return json.loads(body.decode('utf-8')) if body else None
+
+    def _send(self, code, document=None):
+        body = json.dumps(document).encode('utf-8') if document is not None else b''
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _redirected(self, master):
+        master.connections.add(self.client_address)
+        if master.authorization and \
+                self.headers.get('Authorization') != master.authorization:
+            self.send_response(401)
+            self.send_header('WWW-Authenticate', 'Basic realm="mesos"')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return True
+        if self.path in master.errors:
+            self._send(500)
+            return True
+        if master.leader:
+            self.send_response(307)
+            self.send_header('Location', master.leader.rstrip('/') + self.path)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return True
+        if master.unavailable > 0:
+            master.unavailable -= 1
+            self._send(503)
+            return True
+        return False
+
+    def do_GET(self):
+        master = self.server.master
+        master.requests.append(('GET', self.path))
+        master.authorizations.append(self.headers.get('Authorization'))
+        time.sleep(master.latency)
+        if self._redirected(master):
+            return
+        if self.path in master.documents:
+            self._send(200, master.documents[self.path])
+        else:
+            self._send(404)
+
+    def do_POST(self):
+        master = self.server.master
+        body = self._body()
+        master.requests.append(('POST', self.path))
+        master.authorizations.append(self.headers.get('Authorization'))
+        time.sleep(master.latency)
+        if self._redirected(master):
+            return
+        if self.path == '/api/v1' and body == {"type": "SUBSCRIBE"}:
+            return self._stream(master.events, master.stream_hold)
+        if self.path == '/maintenance/schedule':
+            master.documents[self.path] = body
+        elif self.path not in ('/machine/up', '/machine/down'):
+            return self._send(404)
+        master.posts.append((self.path, body))
+        self._send(200)
+
+    def _stream(self, events, hold):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for event in events:
+            record = json.dumps(event).encode('utf-8')
+            record = str(len(record)).encode('utf-8') + b'\n' + record
+            self.wfile.write('{:x}\r\n'.format(len(record)).encode('utf-8'))
+            self.wfile.write(record + b'\r\n')
+            self.wfile.flush()
+        time.sleep(hold)
+        self.wfile.write(b'0\r\n\r\n')
+        self.close_connection = True
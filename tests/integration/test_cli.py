@@ -1,18 +1,9 @@
 from common import exec_command
 
 
-def test_help():
+def test_info():
     returncode, stdout, stderr = exec_command(
-        ['dcos-helloworld', 'helloworld', '--help'])
+        ['dcos-management', 'management', '--info'])
 
     assert returncode == 0
-    assert stdout == b"""DCOS HelloWorld Example Subcommand
-
-Usage:
-    dcos helloworld --info
-
-Options:
-    --help           Show this screen
-    --version        Show version
-"""
-    assert stderr == b''
+    assert stdout.decode('utf-8').startswith('DCOS Management')
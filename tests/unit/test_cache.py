@@ -0,0 +1,31 @@
+import os
+
+from dcos_management.cache import Cache
+
+
+def test_store_and_load(tmpdir):
+    cache = Cache("http://master/", ttl=60, directory=str(tmpdir))
+    cache.store("schedule", {"windows": []})
+
+    assert cache.load("schedule") == {"windows": []}
+    assert cache.load("status") is None
+    assert [f for f in os.listdir(cache.path) if f.startswith('.')] == []
+
+
+def test_stale_refresh_and_other_cluster(tmpdir):
+    Cache("http://master/", directory=str(tmpdir)).store("agents", {})
+
+    assert Cache("http://master/", ttl=-1,
+                 directory=str(tmpdir)).load("agents") is None
+    assert Cache("http://master/", refresh=True,
+                 directory=str(tmpdir)).load("agents") is None
+    assert Cache("http://other/",
+                 directory=str(tmpdir)).load("agents") is None
+
+
+def test_invalidate(tmpdir):
+    cache = Cache("http://master/", directory=str(tmpdir))
+    cache.store("agents", {"slaves": []})
+    cache.invalidate()
+
+    assert cache.load("agents") is None
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from dcos.errors import DCOSException
+from dcos_management import capacity, schedule
+
+STONS = 1000000000
+
+
+def _state_summary(agents):
+    return {"slaves": [
+        {"hostname": "a{}".format(i), "pid": "slave(1)@10.0.0.{}:5051".format(i),
+         "id": "S{}".format(i),
+         "resources": {"cpus": 4, "mem": 1000, "disk": 100},
+         "used_resources": {"cpus": 1, "mem": 100}}
+        for i in range(agents)]}
+
+
+def _machine(i):
+    return {"hostname": "a{}".format(i), "ip": "10.0.0.{}".format(i)}
+
+
+@pytest.fixture(params=["numpy", "python"])
+def implementation(request, monkeypatch):
+    if request.param == "numpy":
+        if capacity.numpy is None:
+            pytest.skip("numpy is not installed")
+    else:
+        monkeypatch.setattr(capacity, "numpy", None)
+    return request.param
+
+
+def test_impact_of_overlapping_windows(implementation):
+    cap = capacity.Capacity(_state_summary(10))
+    scheduled = {"windows": [
+        schedule.window([_machine(0), _machine(1)], 100 * STONS, 100 * STONS),
+        schedule.window([_machine(2)], 150 * STONS, 100 * STONS),
+        schedule.window([_machine(3)], 300 * STONS, 10 * STONS),
+        # ended, left out
+        schedule.window([_machine(4)], 0, 10 * STONS),
+    ]}
+
+    impact = cap.impact(scheduled, 50 * STONS)
+
+    assert [(r['start'], r['hosts'], r['cpus_lost']) for r in impact] == [
+        (100, 3, 30.0), (150, 3, 30.0), (300, 1, 10.0)]
+    # 10 cpus used out of the 28 left
+    assert impact[0]['cpus_used'] == 35.7
+    assert capacity.exceeded(impact, 20) == [(impact[0], "cpus"), (impact[1], "cpus")]
+
+
+def test_impact_matches_brute_force(implementation):
+    rng = random.Random(0)
+    cap = capacity.Capacity(_state_summary(200))
+    windows = []
+    for i in range(0, 200, 4):
+        duration = rng.choice([None, 0, rng.randint(1, 500)])
+        window = schedule.window([_machine(j) for j in range(i, i + 4)],
+                                 rng.randint(0, 1000) * STONS, (duration or 0) * STONS)
+        if duration is None:
+            del window['unavailability']['duration']
+        windows.append(window)
+
+    impact = cap.impact({"windows": windows}, 0)
+
+    def running(w, t):
+        start = schedule.unavailability_key(w)[0]
+        end = schedule.window_end(w)
+        return start <= t and (end is None or t < end)
+
+    kept = [w for w in windows if (schedule.window_end(w) or capacity.NEVER) > 0]
+    for w, row in zip(kept, impact):
+        start = schedule.unavailability_key(w)[0]
+        starts = [schedule.unavailability_key(o)[0] for o in kept]
+        peak = max([sum(len(o['machine_ids']) for o in kept if running(o, t))
+                    for t in starts if running(w, t)] or [0])
+        assert row['start'] == start // STONS
+        assert row['hosts'] == peak
+
+
+def test_parse_percent():
+    assert capacity.parse_percent("20") == 20.0
+    assert capacity.parse_percent("12.5%") == 12.5
+    with pytest.raises(DCOSException):
+        capacity.parse_percent("200")
+    with pytest.raises(DCOSException):
+        capacity.parse_percent("abc")
+
+
+def test_impact_without_registered_agents(implementation):
+    cap = capacity.Capacity(_state_summary(0))
+    scheduled = {"windows": [schedule.window([_machine(0)], 100 * STONS, 100 * STONS)]}
+
+    [row] = cap.impact(scheduled, 0)
+
+    assert (row['hosts'], row['cpus_lost'], row['cpus_used']) == (0, 0.0, None)
@@ -0,0 +1,109 @@
+import pytest
+from requests.auth import HTTPBasicAuth, _basic_auth_str
+
+from dcos import http
+from dcos.errors import DCOSHTTPException
+from dcos_management import client, maintenance, sources
+from dcos_management.client import MasterClient, leader_base
+
+
+@pytest.fixture
+def config(tmpdir, monkeypatch):
+    """Points dcos config to the given master"""
+    def configure(master):
+        path = tmpdir.join("dcos.toml")
+        path.write('[core]\nmesos_master_url = "{}"\n'.format(master.url))
+        monkeypatch.setenv("DCOS_CONFIG", str(path))
+    return configure
+
+
+def test_leader_base():
+    assert leader_base("http://m1:5050/maintenance/status",
+                       "//m2:5050/maintenance/status",
+                       "maintenance/status") == "http://m2:5050/"
+    assert leader_base("https://dcos/mesos/master/state-summary",
+                       "/mesos/master/state-summary",
+                       "master/state-summary") == "https://dcos/mesos/"
+
+
+def test_keep_alive_session(fake_master, config, tmpdir):
+    master = fake_master(status={"down_machines": []})
+    config(master)
+    c = MasterClient(cache_dir=str(tmpdir))
+
+    for _ in range(3):
+        assert c.get('maintenance/status').json() == {"down_machines": []}
+    assert len(master.connections) == 1
+
+
+def test_token_on_keep_alive_session(fake_master, config, tmpdir):
+    master = fake_master(status={"down_machines": []}, authorization="token=secret")
+    config(master)
+    tmpdir.join("dcos.toml").write('dcos_acs_token = "secret"\n', mode="a")
+    source = maintenance.get_source()
+
+    for dataset in sources.ALL_DATASETS:
+        source.fetch(dataset)
+    assert master.authorizations == ["token=secret"] * 3
+    assert len(master.connections) == 1
+
+
+def test_credentials_move_to_session(fake_master, config, tmpdir, monkeypatch):
+    basic = HTTPBasicAuth("user", "password")
+    monkeypatch.setattr(http, "AUTH_CREDS", {})
+    monkeypatch.setattr(http, "_get_basic_auth_credentials", lambda user, host: basic)
+    master = fake_master(status={"down_machines": []},
+                         authorization=_basic_auth_str("user", "password"))
+    config(master)
+    c = MasterClient(cache_dir=str(tmpdir))
+
+    # sent without credentials, then prompted and sent again by dcos http
+    assert c.get('maintenance/status').json() == {"down_machines": []}
+    assert master.authorizations == [None, None, master.authorization]
+    connections = len(master.connections)
+
+    for _ in range(3):
+        c.get('maintenance/status')
+    assert master.authorizations[3:] == [master.authorization] * 3
+    assert len(master.connections) == connections
+
+
+def test_leader_redirect_is_cached(fake_master, config, tmpdir):
+    leader = fake_master(status={"down_machines": []})
+    follower = fake_master(leader=leader.url)
+    config(follower)
+
+    assert MasterClient(cache_dir=str(tmpdir)).get('maintenance/status').json() == \
+        {"down_machines": []}
+    assert len(follower.requests) == 1
+
+    c = MasterClient(cache_dir=str(tmpdir))
+    assert c.master_url('maintenance/status') == leader.url + 'maintenance/status'
+    c.get('maintenance/status')
+    assert len(follower.requests) == 1
+    assert len(leader.requests) == 2
+
+
+def test_unreachable_leader_falls_back(fake_master, config, tmpdir):
+    gone = fake_master()
+    master = fake_master(status={"down_machines": []})
+    config(master)
+    MasterClient(cache_dir=str(tmpdir)).set_leader(gone.url)
+    gone.stop()
+
+    c = MasterClient(cache_dir=str(tmpdir))
+    assert c.get('maintenance/status').json() == {"down_machines": []}
+    assert c.leader == master.url
+    assert MasterClient(cache_dir=str(tmpdir)).leader == master.url
+
+
+def test_retry_unavailable(fake_master, config, tmpdir, monkeypatch):
+    monkeypatch.setattr(client, "BACKOFF", 0)
+    master = fake_master(status={"down_machines": []}, unavailable=2)
+    config(master)
+    assert MasterClient(no_cache=True).get('maintenance/status').json() == \
+        {"down_machines": []}
+
+    master.unavailable = client.RETRIES + 1
+    with pytest.raises(DCOSHTTPException):
+        MasterClient(no_cache=True).get('maintenance/status')
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from dcos.errors import DCOSException
+from dcos_management import clusters, tables
+
+
+def attach(tmpdir, cluster_id, name, url):
+    tmpdir.join(cluster_id, "dcos.toml").write(
+        '[core]\nmesos_master_url = "{}"\n[cluster]\nname = "{}"\n'.format(url, name),
+        ensure=True)
+
+
+def test_select(tmpdir):
+    attach(tmpdir, "c2", "beta", "http://beta:5050")
+    attach(tmpdir, "c1", "alpha", "http://alpha:5050/")
+    directory = str(tmpdir)
+
+    assert [c.name for c in clusters.select(all_clusters=True, directory=directory)] == [
+        "alpha", "beta"]
+    selected = clusters.select("c2,alpha,beta", directory=directory)
+    assert [c.name for c in selected] == ["beta", "alpha"]
+    assert selected[0].master_url("master/state-summary") == "http://beta:5050/master/state-summary"
+    with pytest.raises(DCOSException):
+        clusters.select("gamma", directory=directory)
+    with pytest.raises(DCOSException):
+        clusters.select(all_clusters=True, directory=str(tmpdir.join("none")))
+
+
+def test_fan_out_isolates_failures_and_runs_concurrently(tmpdir):
+    for i in range(4):
+        attach(tmpdir, "c{}".format(i), "cluster{}".format(i), "http://master{}/".format(i))
+
+    def run(cluster):
+        time.sleep(0.2)
+        if cluster.name == "cluster2":
+            raise DCOSException("unreachable")
+        return cluster.name
+
+    started = time.time()
+    results = sorted(clusters.fan_out(clusters.select(all_clusters=True, directory=str(tmpdir)),
+                                      run), key=lambda r: r[0].name)
+    assert time.time() - started < 0.6
+    assert [(c.name, value, error) for c, value, error in results] == [
+        ("cluster0", "cluster0", None), ("cluster1", "cluster1", None),
+        ("cluster2", None, "unreachable"), ("cluster3", "cluster3", None)]
+
+
+def test_clusters_table():
+    rows = [{"cluster": "beta", "hostname": "b1", "state": "DOWN"},
+            {"cluster": "alpha", "hostname": "a2", "state": "DRAINING"},
+            {"cluster": "alpha", "hostname": "a1", "state": "DOWN"}]
+    assert tables.clusters_table(rows, ["HOST", "STATE"]).split("\n") == [
+        "CLUSTER  HOST  STATE     ",
+        "alpha    a1    DOWN      ",
+        "alpha    a2    DRAINING  ",
+        "beta     b1    DOWN      "]
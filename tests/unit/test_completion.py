@@ -0,0 +1,147 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from dcos_management import cli, completion
+
+STATE = {"slaves": [{"hostname": "a%d" % i, "pid": "slave(1)@10.0.0.%d:5051" % i,
+                     "id": "S%d" % i} for i in range(3)]}
+STATUS = {"down_machines": [{"hostname": "b0", "ip": "10.0.1.0"}]}
+
+
+def test_search(tmpdir):
+    path = str(tmpdir.join("hosts.idx"))
+    assert completion.search(path, "a") == []
+    completion.write_index(path, [])
+    assert completion.search(path, "a") == []
+
+    completion.write_index(path, ["b2", "a10", "a1", "a2", "a1", "c"])
+    assert completion.search(path, "a1") == ["a1", "a10"]
+    assert completion.search(path, "") == ["a1", "a10", "a2", "b2", "c"]
+    assert completion.search(path, "", limit=2) == ["a1", "a10"]
+    assert completion.search(path, "c") == ["c"]
+    assert completion.search(path, "0") == []
+    assert completion.search(path, "d") == []
+
+
+def test_index_words():
+    assert completion.index_words(STATE, STATUS) == set([
+        "a0", "a1", "a2", "10.0.0.0", "10.0.0.1", "10.0.0.2", "S0", "S1", "S2",
+        "b0", "10.0.1.0"])
+    assert completion.index_words(None, None) == set()
+
+
+def test_search_50k_agents(tmpdir):
+    path = str(tmpdir.join("hosts.idx"))
+    words = []
+    for i in range(50000):
+        words.extend(["agent-{:05d}.cluster.local".format(i),
+                      "10.{}.{}.{}".format(i >> 16, (i >> 8) & 255, i & 255),
+                      "{:08x}-S{}".format(i * 2654435761 % 2 ** 32, i)])
+    completion.write_index(path, words)
+
+    start = time.time()
+    for prefix in ["agent-4999", "10.0.12", "ffff", "zzz", "agent-00001"]:
+        assert len(completion.search(path, prefix)) <= completion.MAX_CANDIDATES
+    assert (time.time() - start) / 5 < 0.05
+    assert completion.search(path, "agent-4999") == [
+        "agent-4999{}.cluster.local".format(i) for i in range(10)]
+
+
+def test_complete(tmpdir):
+    path = str(tmpdir.join("hosts.idx"))
+    completion.write_index(path, completion.index_words(STATE, STATUS))
+
+    def complete(*words):
+        return completion.complete(cli.__doc__, list(words), path)
+
+    assert complete("") == ["management"]
+    assert complete("management", "") == ["maintenance", "serve"]
+    assert complete("management", "maintenance", "s") == ["schedule", "snapshot"]
+    assert complete("management", "maintenance", "schedule", "") == ["add", "remove"]
+    assert complete("management", "maintenance", "up", "--ch") == ["--chunk-size="]
+    assert complete("management", "maintenance", "up", "--chunk-size=") == []
+    assert complete("management", "maintenance", "list", "--watch", "--in") == ["--interval="]
+    assert complete("management", "maintenance", "down", "a1", "") == [
+        "10.0.0.0", "10.0.0.1", "10.0.0.2", "10.0.1.0", "S0", "S1", "S2",
+        "a0", "a1", "a2", "b0"]
+    assert complete("management", "maintenance", "down", "--dry-run", "S") == ["S0", "S1", "S2"]
+    assert complete("management", "maintenance", "list", "a") == []
+    assert completion.complete(cli.__doc__, ["management", "maintenance", "up", "a"]) == []
+
+
+def test_refresh_in_background(tmpdir, monkeypatch):
+    started = []
+    monkeypatch.setattr(subprocess, "Popen",
+                        lambda args, **kwargs: started.append(args))
+    path = str(tmpdir.join("completion", "hosts.idx"))
+
+    assert completion.refresh_in_background(path)
+    assert started[0][-3:] == ["management", "complete", "--refresh"]
+    # already refreshing
+    assert not completion.refresh_in_background(path)
+    # refresh timed out
+    stale = time.time() - completion.REFRESH_TIMEOUT - 1
+    os.utime(path + ".refreshing", (stale, stale))
+    assert completion.refresh_in_background(path)
+
+    os.remove(path + ".refreshing")
+    completion.write_index(path, ["a0"])
+    assert not completion.refresh_in_background(path)
+    assert completion.refresh_in_background(path, ttl=0)
+    assert len(started) == 3
+
+
+def test_main(fake_master, tmpdir, monkeypatch, capsys):
+    master = fake_master(state_summary=STATE, status=STATUS)
+    config = tmpdir.join("dcos.toml")
+    config.write('[core]\nmesos_master_url = "{}"\n'.format(master.url))
+    monkeypatch.setenv("DCOS_CONFIG", str(config))
+    monkeypatch.setattr(completion, "refresh_in_background", lambda path: False)
+    path = completion.get_index_path()
+    assert path.startswith(str(tmpdir.join("management", "completion")))
+
+    assert completion.main(["--refresh"], cli.__doc__) == 0
+    assert not os.path.exists(path + ".refreshing")
+    assert completion.get_index_path(str(config)) == path
+    assert completion.main(["--", "management", "maintenance", "up", "a"],
+                           cli.__doc__) == 0
+    assert capsys.readouterr()[0] == "a0\na1\na2\n"
+
+    assert completion.main(["--script=bash"], cli.__doc__) == 0
+    script = capsys.readouterr()[0]
+    assert "complete -F _dcos_management dcos" in script
+    assert "'-m' 'dcos_management.cli' 'management' 'complete' --" in script
+    assert completion.main(["--script=fish"], cli.__doc__) == 1
+
+
+BASH_COMPLETIONS = """
+for line in "dcos " "dcos no" "dcos node " "dcos management maintenance d"; do
+    COMP_LINE="$line"
+    COMP_POINT=${#line}
+    _dcos_management dcos
+    echo "${COMPREPLY[*]}"
+done
+complete -p dcos
+"""
+
+
+@pytest.mark.skipif(not os.path.exists("/bin/bash"), reason="needs bash")
+@pytest.mark.parametrize("previous, expected", [
+    ("_dcos() { COMPREPLY=(node package); }\ncomplete -o nospace -F _dcos dcos\n",
+     ["node package management", "node package", "node package", "down",
+      "complete -o nospace -F _dcos_management dcos"]),
+    ("", ["management", "", "", "down", "complete -F _dcos_management dcos"]),
+])
+def test_bash_script_leaves_other_subcommands(tmpdir, previous, expected):
+    script = completion.script("bash")
+    env = dict(os.environ, DCOS_CONFIG=str(tmpdir.join("none.toml")),
+               PYTHONPATH=os.pathsep.join(p or '.' for p in sys.path))
+    process = subprocess.Popen(["/bin/bash", "-c", previous + script + BASH_COMPLETIONS],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    stdout, stderr = process.communicate()
+    assert process.returncode == 0, stderr
+    assert stdout.decode('utf-8').splitlines() == expected
@@ -0,0 +1,41 @@
+import random
+
+from dcos_management.intervals import IntervalTree
+
+
+def _contains(interval, point):
+    start, end, _ = interval
+    return start <= point and (end is None or point < end)
+
+
+def test_queries_match_brute_force():
+    rng = random.Random(0)
+    intervals = []
+    for i in range(500):
+        start = rng.randint(0, 1000)
+        end = rng.choice([None, start, start + rng.randint(1, 200)])
+        intervals.append((start, end, i))
+    tree = IntervalTree(intervals)
+
+    for point in range(-10, 1300, 7):
+        assert sorted(tree.at(point)) == [
+            v for s, e, v in intervals if _contains((s, e, v), point)]
+    for start in range(-10, 1300, 13):
+        end = start + rng.randint(1, 100)
+        assert sorted(tree.overlapping(start, end)) == [
+            v for s, e, v in intervals
+            if s < end and (e is None or e > start) and s != e]
+
+
+def test_empty_tree():
+    tree = IntervalTree([])
+
+    assert len(tree) == 0
+    assert tree.at(0) == []
+    assert tree.overlapping(0, 10) == []
+    assert tree.last_end() is None
+
+
+def test_last_end():
+    assert IntervalTree([(0, 10, "a"), (5, 20, "b")]).last_end() == 20
+    assert IntervalTree([(0, 10, "a"), (5, None, "b")]).last_end() is None
@@ -0,0 +1,57 @@
+from dcos_management.machines import AgentRecord, MachineId, MachineIndex, machine_key
+
+
+def _agent(hostname, ip, id_, state=None):
+    return AgentRecord(MachineId(hostname, ip), id_, state)
+
+
+def test_find_machine_id_first_match_wins():
+    index = MachineIndex([_agent("a", "10.0.0.1", "S1"),
+                          _agent("b", "10.0.0.1", "S2")])
+
+    assert index.find_machine_id("10.0.0.1") == MachineId("a", "10.0.0.1")
+    assert index.find_machine_id("S2") == MachineId("b", "10.0.0.1")
+    assert index.find_machine_id("unknown") is None
+
+
+def test_down_entries_are_not_resolved_by_id():
+    index = MachineIndex([], [_agent("a", "10.0.0.1", "S1", "DOWN")])
+
+    assert index.find_machine_id("S1") is None
+    assert index.find_machine_id("a") == MachineId("a", "10.0.0.1")
+
+
+def test_status_added_after_agents_is_honored():
+    agent = _agent("a", "10.0.0.1", "S1")
+    index = MachineIndex([agent])
+    assert index.find_machine_id("S1") == MachineId("a", "10.0.0.1")
+    index.add_status(agent.tagged("DOWN"))
+
+    assert index.find_machine_id("S1") is None
+    assert agent.state is None
+
+
+def test_find_agent_status_and_scheduled():
+    agent = _agent("a", "10.0.0.1", "S1")
+    index = MachineIndex([agent])
+    ms = _agent("b", "10.0.0.2", "", "DRAINING")
+    index.add_status(ms)
+    index.add_scheduled(ms)
+
+    assert index.find_agent({"hostname": "a", "ip": "10.0.0.1"}) is agent
+    assert index.find_agent(MachineId("a", "10.0.0.2")) is None
+    assert index.find_status({"hostname": "b", "ip": "10.0.0.2"}) is ms
+    assert index.find_scheduled(MachineId("b", "10.0.0.2")) is ms
+    assert index.scheduled("DRAINING") == set([MachineId("b", "10.0.0.2")])
+    assert index.scheduled("DOWN") == set()
+
+
+def test_machine_keys_are_shared_by_dicts_and_records():
+    key = MachineId("a", "10.0.0.1")
+
+    assert machine_key({"hostname": "a", "ip": "10.0.0.1"}) == key
+    assert machine_key(_agent("a", "10.0.0.1", "S1", "DOWN")) == key
+    assert machine_key(key) is key
+    assert key == ("a", "10.0.0.1")
+    assert key.to_dict() == {"hostname": "a", "ip": "10.0.0.1"}
+    assert MachineId("a", None).to_dict() == {"hostname": "a"}
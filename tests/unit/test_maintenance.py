@@ -0,0 +1,333 @@
+import json
+import threading
+import time
+
+import pytest
+from six import StringIO
+
+from dcos.errors import DCOSException
+from dcos_management import maintenance, schedule
+from dcos_management.machines import MachineId
+from dcos_management.maintenance import Maintenance
+
+A0 = {"hostname": "a0", "ip": "10.0.0.0"}
+A1 = {"hostname": "a1", "ip": "10.0.0.1"}
+AGENTS = {"slaves": [{"hostname": m['hostname'], "pid": "slave(1)@{}:5051".format(m['ip']),
+                      "id": "S" + m['hostname']} for m in [A0, A1]]}
+
+
+class Source(object):
+    """In-memory source, serving successive schedules"""
+
+    cacheable = False
+    url = "http://master/"
+
+    def __init__(self, schedules):
+        self.schedules = schedules
+        self.posts = []
+
+    def fetch(self, dataset):
+        if dataset == maintenance.SCHEDULE:
+            if len(self.schedules) > 1:
+                return self.schedules.pop(0)
+            return self.schedules[0]
+        if dataset == maintenance.AGENTS:
+            return {"slaves": []}
+        return {}
+
+    def post(self, path, json_):
+        self.posts.append((path, json_))
+
+
+class RecordingSource(Source):
+    """In-memory source recording fetches, and how many ran at once"""
+
+    def __init__(self, schedules, data=None, delay=0):
+        Source.__init__(self, schedules)
+        self.data = data or {}
+        self.delay = delay
+        self.fetched = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def fetch(self, dataset):
+        with self.lock:
+            self.fetched.append(dataset)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        if dataset in self.data:
+            return self.data[dataset]
+        return Source.fetch(self, dataset)
+
+
+def test_update_schedule_applies_change_on_current_schedule(monkeypatch):
+    monkeypatch.setattr(maintenance, "backoff", lambda attempt: 0)
+    concurrent = schedule.add_windows(None, [schedule.window([A1], 10, 20)])
+    source = Source([schedule.empty(), concurrent])
+    m = Maintenance(source=source)
+
+    m.update_schedule(lambda s: schedule.add_windows(s, [schedule.window([A0], 30, 40)]))
+
+    [(path, posted)] = source.posts
+    assert path == 'maintenance/schedule'
+    assert [w['machine_ids'] for w in posted['windows']] == [[A1], [A0]]
+
+
+def test_update_schedule_gives_up(monkeypatch):
+    monkeypatch.setattr(maintenance, "backoff", lambda attempt: 0)
+    source = Source([schedule.add_windows(None, [schedule.window([A1], i, 20)])
+                     for i in range(maintenance.SCHEDULE_RETRIES + 2)])
+    m = Maintenance(source=source)
+
+    with pytest.raises(DCOSException):
+        m.update_schedule(lambda s: schedule.remove_machines(s, [A1]))
+    assert source.posts == []
+
+
+def test_failed_schedule_read_stops_the_update(fake_master, tmpdir, monkeypatch):
+    current = schedule.add_windows(None, [schedule.window([A1], 10, 20)])
+    master = fake_master(schedule=current)
+    config = tmpdir.join("dcos.toml")
+    config.write('[core]\nmesos_master_url = "{}"\n'.format(master.url))
+    monkeypatch.setenv("DCOS_CONFIG", str(config))
+    m = Maintenance(datasets=[maintenance.SCHEDULE], no_cache=True,
+                    source=maintenance.get_source(no_cache=True))
+    master.errors.add('/maintenance/schedule')
+
+    # never mistaken for an empty schedule, replaced by the change alone
+    with pytest.raises(DCOSException):
+        m.update_schedule(lambda s: schedule.add_windows(s, [schedule.window([A0], 30, 40)]))
+    assert master.requests.count(('GET', '/maintenance/schedule')) == 2
+    assert master.posts == []
+
+
+def test_maintenance_status_leaves_raw_datasets_untouched():
+    raw = {
+        maintenance.AGENTS: {"slaves": [
+            {"hostname": h, "pid": "slave(1)@{}:5051".format(m['ip']), "id": "S" + h}
+            for h, m in [("a0", A0), ("a1", A1)]]},
+        maintenance.SCHEDULE: schedule.add_windows(None, [schedule.window([A0, A1], 10, 20)]),
+        maintenance.STATUS: {"draining_machines": [{"id": dict(A0)}],
+                             "down_machines": [dict(A1), {"hostname": "x", "ip": "10.0.0.9"}]},
+    }
+    m = Maintenance(source=Source([raw[maintenance.SCHEDULE]]), data=raw)
+
+    rows = m.full_maintenance_status
+    assert [(r['hostname'], r['id'], r['state']) for r in rows] == [
+        ("a0", "Sa0", "DRAINING"), ("a1", "Sa1", "DOWN")]
+    assert raw[maintenance.STATUS]["draining_machines"] == [{"id": A0}]
+    assert "state" not in raw[maintenance.STATUS]["down_machines"][1]
+
+    machine_ids = m.get_all_agents()
+    assert [k.hostname for k in machine_ids] == ["a0", "a1", "x"]
+    not_scheduled, down, draining = m.filter(machine_ids)
+    assert [k.hostname for k in not_scheduled] == ["x"]
+    assert [k.hostname for k in down] == ["a1"]
+    assert [k.hostname for k in draining] == ["a0"]
+
+
+def test_schedule_refused_above_max_capacity_loss():
+    raw = {
+        maintenance.AGENTS: {"slaves": [
+            {"hostname": m['hostname'], "pid": "slave(1)@{}:5051".format(m['ip']),
+             "id": "S" + m['hostname'], "resources": {"cpus": 4}}
+            for m in [A0, A1]]},
+        maintenance.STATUS: {},
+    }
+    source = Source([schedule.empty()])
+    m = Maintenance(hosts=["a0"], source=source, data=raw, max_capacity_loss=40.0)
+
+    with pytest.raises(DCOSException) as e:
+        m.schedule_maintenance(None, None)
+    assert "50.0% of cpus" in str(e.value)
+    assert source.posts == []
+
+    m.max_capacity_loss = 50.0
+    m.schedule_maintenance(None, None)
+    assert len(source.posts) == 1
+
+
+def test_timeline_and_at(capsys):
+    scheduled = {"windows": [schedule.window([A0], 0, 20 * maintenance.stons),
+                             schedule.window([A1], 10 * maintenance.stons, 20 * maintenance.stons)]}
+    raw = {maintenance.AGENTS: {"slaves": []},
+           maintenance.SCHEDULE: scheduled,
+           maintenance.STATUS: {"down_machines": [A1]}}
+    m = Maintenance(source=Source([scheduled]), data=raw)
+
+    m.timeline(True, "0", "40", "10")
+    timeline = json.loads(capsys.readouterr()[0])
+    assert [(b['from'], b['windows'], b['draining'], b['down']) for b in timeline] == [
+        (0, 1, 1, 0), (10, 2, 1, 1), (20, 1, 0, 1), (30, 0, 0, 0)]
+
+    m.at(True, "25")
+    assert [(r['hostname'], r['state']) for r in json.loads(capsys.readouterr()[0])] == [
+        ("a1", "DOWN")]
+
+
+def test_list_filters(capsys):
+    now = int(time.time()) * maintenance.stons
+    scheduled = {"windows": [schedule.window([A0], 0, 20 * maintenance.stons),
+                             schedule.window([A1], now, 3600 * maintenance.stons)]}
+    raw = {maintenance.SCHEDULE: scheduled,
+           maintenance.STATUS: {"draining_machines": [{"id": A0}], "down_machines": [A1]}}
+
+    def listed(**kwargs):
+        m = Maintenance(datasets=[maintenance.SCHEDULE, maintenance.STATUS],
+                        source=Source([scheduled]), data=raw)
+        m.list(True, row_filter=maintenance.get_list_filter(**kwargs))
+        return [r['hostname'] for r in json.loads(capsys.readouterr()[0])]
+
+    assert listed(state="down") == ["a1"]
+    assert listed(state="draining,down") == ["a0", "a1"]
+    assert listed(host="10.0.0.0") == ["a0"]
+    assert listed(host="A*") == ["a0", "a1"]
+    assert listed(expired=True) == ["a0"]
+    assert listed(active=True) == ["a1"]
+    assert listed(starting_after="10") == ["a1"]
+    assert listed(starting_before="10", state="DOWN") == []
+    with pytest.raises(DCOSException):
+        maintenance.get_list_filter(state="UP")
+
+
+def test_up_unschedules_draining_machines_before_bringing_down_ones_up(capsys):
+    scheduled = {"windows": [schedule.window([A0, A1], 0, 20 * maintenance.stons)]}
+    raw = {maintenance.AGENTS: {"slaves": []},
+           maintenance.SCHEDULE: scheduled,
+           maintenance.STATUS: {"draining_machines": [{"id": A0}], "down_machines": [A1]}}
+    hosts = [json.dumps(A0), json.dumps(A1)]
+
+    source = Source([scheduled])
+    Maintenance(hosts=hosts, source=source, data=raw).up(dry_run=True)
+    assert source.posts == []
+    assert capsys.readouterr()[0].splitlines() == [
+        "1. POST maintenance/schedule: 1 window(s) of 1 host(s)",
+        "2. POST machine/up: 1 host(s) to bring UP: a1"]
+
+    assert Maintenance(hosts=hosts, source=source, data=raw).up() == 0
+    assert source.posts == [
+        ("maintenance/schedule", {"windows": [schedule.window([A1], 0, 20 * maintenance.stons)]}),
+        ("machine/up", [A1])]
+
+
+def test_declared_datasets_are_fetched_concurrently():
+    source = RecordingSource([schedule.empty()], delay=0.1)
+
+    Maintenance(source=source)
+
+    assert sorted(source.fetched) == sorted(maintenance.ALL_DATASETS)
+    assert source.max_in_flight == len(maintenance.ALL_DATASETS)
+
+
+def test_undeclared_datasets_are_fetched_lazily():
+    source = RecordingSource([schedule.empty()])
+
+    m = Maintenance(datasets=[maintenance.SCHEDULE], source=source)
+    assert source.fetched == [maintenance.SCHEDULE]
+    m.agents
+    m.agents
+    assert source.fetched == [maintenance.SCHEDULE, maintenance.AGENTS]
+
+
+def test_schedule_remove_of_machine_ids_only_fetches_schedule():
+    source = RecordingSource([{"windows": [schedule.window([A0, A1], 0, 10)]}])
+
+    maintenance.flush_schedule([json.dumps(A0)], False, source=source)
+
+    assert set(source.fetched) == set([maintenance.SCHEDULE])
+    assert source.posts == [("maintenance/schedule",
+                             {"windows": [schedule.window([A1], 0, 10)]})]
+
+
+def test_read_hosts(tmpdir, monkeypatch):
+    path = tmpdir.join("hosts")
+    path.write("a0\n\n  # comment\n a1 \n\n")
+    assert list(maintenance.read_hosts(str(path))) == ["a0", "a1"]
+
+    monkeypatch.setattr("sys.stdin", StringIO(u"a1\n\na0\n"))
+    assert list(maintenance.get_hosts(["ignored"], "-")) == ["a1", "a0"]
+    assert maintenance.get_hosts(["a0"]) == ["a0"]
+
+
+def test_get_machine_ids_resolves_mixed_hosts_once(capsys):
+    m = Maintenance(datasets=[maintenance.AGENTS], source=Source([schedule.empty()]),
+                    data={maintenance.AGENTS: AGENTS})
+    m.agents
+    hosts = ["a0", "10.0.0.1", "Sa0", json.dumps(A1), "a0", '{"hostname": "x"}', "[1]",
+             "nope", "gone"]
+
+    machine_ids = maintenance.get_machine_ids(iter(hosts), m.index)
+
+    assert machine_ids == [MachineId("a0", "10.0.0.0"), MachineId("a1", "10.0.0.1")]
+    assert capsys.readouterr()[0].splitlines() == [
+        '2 host(s) with malformed unmanaged entry: {"hostname": "x"}, [1]',
+        "2 host(s) not found: nope, gone"]
+
+
+def test_schedule_hosts_from_stdin(monkeypatch, capsys):
+    monkeypatch.setattr("sys.stdin", StringIO(u"a0\n\n10.0.0.1\nSa0\nnope\n"))
+    source = RecordingSource([schedule.empty()], data={maintenance.AGENTS: AGENTS})
+
+    maintenance.schedule_maintenance("0", "10", [], from_file="-", source=source)
+
+    assert capsys.readouterr()[0].splitlines() == ["1 host(s) not found: nope", "Schedules updated"]
+    [(path, posted)] = source.posts
+    assert posted == {"windows": [schedule.window([A0, A1], 0, 10 * maintenance.stons)]}
+
+
+def test_split_waves():
+    machine_ids = [MachineId("a{}".format(i), None) for i in range(10)]
+
+    assert [len(w) for w in maintenance.split_waves(machine_ids, "3")] == [3, 3, 3, 1]
+    # percentages round up
+    assert [len(w) for w in maintenance.split_waves(machine_ids, "25%")] == [3, 3, 3, 1]
+    assert [len(w) for w in maintenance.split_waves(machine_ids, "1%")] == [1] * 10
+    assert maintenance.split_waves(machine_ids, "20") == [machine_ids]
+    for size in ["0", "0%", "-1", "abc", "%"]:
+        with pytest.raises(DCOSException):
+            maintenance.split_waves(machine_ids, size)
+
+
+def test_rollout_skips_scheduled_hosts(capsys):
+    a2 = {"hostname": "a2", "ip": "10.0.0.2"}
+    a3 = {"hostname": "a3", "ip": "10.0.0.3"}
+    scheduled = {"windows": [schedule.window([A0, A1], 0, 10)]}
+    source = RecordingSource([scheduled], data={maintenance.STATUS: {
+        "draining_machines": [{"id": A0}], "down_machines": [A1]}})
+    hosts = [json.dumps(m) for m in [A0, A1, a2, a3]]
+
+    maintenance.rollout("100", "60", "30", "1", hosts, source=source)
+
+    stons = maintenance.stons
+    [(path, posted)] = source.posts
+    assert posted["windows"] == scheduled["windows"] + [
+        schedule.window([a2], 100 * stons, 60 * stons),
+        schedule.window([a3], 190 * stons, 60 * stons)]
+    assert capsys.readouterr()[0].splitlines()[:3] == [
+        "2 host(s) already scheduled, skipped: a1, a0",
+        "wave 1: 1 host(s) starting at 100 for 60s",
+        "wave 2: 1 host(s) starting at 190 for 60s"]
+    assert maintenance.AGENTS not in source.fetched
+
+    source.posts = []
+    maintenance.rollout("100", "60", "30", "50%", hosts[:2], source=source)
+    assert capsys.readouterr()[0].splitlines()[-1] == "No host to schedule"
+    assert source.posts == []
+
+
+def test_failed_schedule_update_stops_the_transition():
+    raw = {maintenance.AGENTS: {"slaves": []}, maintenance.STATUS: {}}
+
+    class FailingSource(Source):
+        def post(self, path, json_):
+            Source.post(self, path, json_)
+            raise DCOSException("refused")
+
+    source = FailingSource([schedule.empty()])
+    with pytest.raises(DCOSException):
+        Maintenance(hosts=[json.dumps(A0)], source=source, data=raw).down()
+    assert [path for path, _ in source.posts] == ["maintenance/schedule"]
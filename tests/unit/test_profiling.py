@@ -0,0 +1,49 @@
+import json
+
+from dcos_management import cli, profiling, tables
+
+
+def test_disabled_spans_record_nothing():
+    assert profiling.span("phase") is profiling.NULL_SPAN
+    with profiling.span("phase") as span:
+        span.count(records=1)
+    assert not profiling.enabled()
+    assert profiling.stop() is None
+
+
+def test_summary_and_trace_events(tmpdir):
+    profiling.start()
+    try:
+        with profiling.span("GET master/state-summary") as span:
+            span.count(bytes=100)
+        with profiling.span("join schedule") as span:
+            span.count(records=2)
+            span.count(records=3)
+        with profiling.span("GET master/state-summary") as span:
+            span.count(bytes=50)
+    finally:
+        recorder = profiling.stop()
+
+    summary = recorder.summary()
+    assert [(p['phase'], p['calls'], p['bytes'], p['records']) for p in summary] == [
+        ("GET master/state-summary", 2, 150, None), ("join schedule", 1, None, 5)]
+    assert tables.profile_table(summary).split("\n")[0].split() == [
+        "PHASE", "CALLS", "MS", "BYTES", "RECORDS"]
+
+    path = str(tmpdir.join("trace.json"))
+    profiling.write_trace(recorder, path)
+    with open(path) as f:
+        events = json.load(f)['traceEvents']
+    assert [(e['name'], e['ph'], e['args']) for e in events] == [
+        ("GET master/state-summary", "X", {"bytes": 100}),
+        ("join schedule", "X", {"records": 5}),
+        ("GET master/state-summary", "X", {"bytes": 50})]
+    assert all(e['dur'] >= 0 and e['ts'] >= 0 for e in events)
+
+
+def test_profiling_options_are_taken_out():
+    assert cli._profiling_options(
+        ['management', 'maintenance', 'list', '--profile', '--trace-file', 't.json']) == (
+        ['management', 'maintenance', 'list'], True, 't.json')
+    assert cli._profiling_options(['management', '--trace-file=t.json', 'serve']) == (
+        ['management', 'serve'], False, 't.json')
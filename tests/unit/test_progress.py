@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from dcos.errors import DCOSException
+from dcos_management import maintenance, sources
+from dcos_management.maintenance import Maintenance
+
+STATE = {"frameworks": [
+    {"id": "F0", "name": "marathon", "tasks": [
+        {"id": "t0", "slave_id": "S0", "state": "TASK_RUNNING",
+         "resources": {"cpus": 0.5, "mem": 128, "ports": "[31000-31000]"}},
+        {"id": "t1", "slave_id": "S1", "state": "TASK_RUNNING", "resources": {"cpus": 1}},
+        {"id": "t2", "slave_id": "S0", "state": "TASK_FINISHED", "resources": {"cpus": 4}}]},
+    {"id": "F1", "name": "spark", "tasks": [
+        {"id": "t3", "slave_id": "S0", "state": "TASK_STAGING", "resources": {"cpus": 1}}]}]}
+
+DATASETS = {
+    maintenance.AGENTS: {"slaves": [
+        {"hostname": "a%d" % i, "pid": "slave(1)@10.0.0.%d:5051" % i, "id": "S%d" % i}
+        for i in range(3)]},
+    maintenance.STATUS: {"draining_machines": [
+        {"id": {"hostname": "a0", "ip": "10.0.0.0"}},
+        {"id": {"hostname": "a2", "ip": "10.0.0.2"}}]},
+}
+
+
+class TasksSource(object):
+    """In-memory source, serving successive master states"""
+
+    cacheable = False
+    url = "http://master/"
+
+    def __init__(self, states):
+        self.states = states
+        self.polls = 0
+
+    def fetch(self, dataset):
+        assert dataset == sources.TASKS
+        self.polls += 1
+        state = self.states.pop(0) if len(self.states) > 1 else self.states[0]
+        return sources.trim_state(state)
+
+
+def test_progress_of_draining_machines(capsys):
+    m = Maintenance(datasets=[], source=TasksSource([STATE]), data=DATASETS)
+    assert m.progress(True) == 0
+    rows = json.loads(capsys.readouterr()[0])
+    assert [(r['hostname'], r['id'], r['tasks'], r['frameworks'], r['cpus'], r['mem'])
+            for r in rows] == [("a0", "S0", 2, ["marathon", "spark"], 1.5, 128),
+                               ("a2", "S2", 0, [], 0, 0)]
+
+
+def test_progress_of_given_hosts(capsys):
+    m = Maintenance(hosts=["a1"], datasets=[], source=TasksSource([STATE]), data=DATASETS)
+    m.progress(True)
+    assert [(r['hostname'], r['state'], r['tasks'])
+            for r in json.loads(capsys.readouterr()[0])] == [("a1", None, 1)]
+
+
+def test_wait_until_empty(capsys):
+    drained = {"frameworks": [{"id": "F0", "name": "marathon", "tasks": [
+        {"id": "t1", "slave_id": "S1", "state": "TASK_RUNNING", "resources": {}}]}]}
+    source = TasksSource([STATE, STATE, drained])
+    m = Maintenance(datasets=[], source=source, data=DATASETS)
+
+    assert m.progress(False, wait=True, interval="0") == 0
+    assert source.polls == 3
+    assert capsys.readouterr()[0].splitlines()[-2:] == [
+        "a0 (10.0.0.0) is empty", "2 machine(s) empty"]
+
+    m = Maintenance(datasets=[], source=TasksSource([STATE]), data=DATASETS)
+    with pytest.raises(DCOSException) as e:
+        m.progress(True, wait=True, interval="0.01", timeout="0.05")
+    assert "1 host(s) still running tasks: a0" in str(e.value)
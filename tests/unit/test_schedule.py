@@ -0,0 +1,51 @@
+from dcos_management import schedule
+
+A = {"hostname": "a", "ip": "10.0.0.1"}
+B = {"hostname": "b", "ip": "10.0.0.2"}
+C = {"hostname": "c", "ip": "10.0.0.3"}
+
+
+def test_remove_machines_drops_empty_windows():
+    scheduled = {"windows": [schedule.window([A, B], 10, 5),
+                             schedule.window([C], 20, 5)]}
+
+    result = schedule.remove_machines(scheduled, [C, B])
+
+    assert result == {"windows": [schedule.window([A], 10, 5)]}
+    assert scheduled['windows'][0]['machine_ids'] == [A, B]
+
+
+def test_add_windows_moves_machines():
+    scheduled = {"windows": [schedule.window([A, B], 10, 5)]}
+
+    result = schedule.add_windows(scheduled, [schedule.window([B], 20, 5)])
+
+    assert result == {"windows": [schedule.window([A], 10, 5),
+                                  schedule.window([B], 20, 5)]}
+    assert schedule.add_windows(None, []) == schedule.empty()
+
+
+def test_compact_merges_identical_windows_and_duplicates():
+    scheduled = {"windows": [schedule.window([A], 10, 5),
+                             schedule.window([], 15, 5),
+                             schedule.window([B, A], 20, 5),
+                             schedule.window([C, B], 10, 5)]}
+
+    assert schedule.compact(scheduled) == {
+        "windows": [schedule.window([A, C], 10, 5),
+                    schedule.window([B], 20, 5)]}
+
+
+def test_remove_expired_keeps_running_and_down_machines():
+    running = schedule.window([C], 10, 100)
+    scheduled = {"windows": [schedule.window([A, B], 10, 5),
+                             running,
+                             {"machine_ids": [C],
+                              "unavailability": {"start": {"nanoseconds": 0}}}]}
+
+    result, removed = schedule.remove_expired(scheduled, 50, kept=[B])
+
+    assert result == {"windows": [schedule.window([B], 10, 5), running,
+                                  scheduled['windows'][2]]}
+    assert removed == [schedule.window([A], 10, 5)]
+    assert schedule.remove_expired(None, 50) == (schedule.empty(), [])
@@ -0,0 +1,92 @@
+import threading
+
+import docopt
+import pytest
+
+from dcos_management import cli, dispatch, serve, sources
+
+STATE = {"slaves": [{"hostname": "a%d" % i, "pid": "slave(1)@10.0.0.%d:5051" % i,
+                     "id": "S%d" % i} for i in range(3)]}
+SCHEDULE = {"windows": [{"machine_ids": [{"hostname": "a1", "ip": "10.0.0.1"}],
+                         "unavailability": {"start": {"nanoseconds": 0},
+                                            "duration": {"nanoseconds": 10}}}]}
+STATUS = {"draining_machines": [{"id": {"hostname": "a1", "ip": "10.0.0.1"}}]}
+
+
+@pytest.fixture
+def daemon(fake_master, tmpdir, monkeypatch):
+    """Starts a daemon serving a fake master"""
+    master = fake_master(state_summary=STATE, schedule=SCHEDULE, status=STATUS)
+    config = tmpdir.join("dcos.toml")
+    config.write('[core]\nmesos_master_url = "{}"\n'.format(master.url))
+    monkeypatch.setenv("DCOS_CONFIG", str(config))
+
+    model = serve.Model(sources.MasterSource(no_cache=True))
+    model.refresh()
+    path = serve.get_socket_path(model.source.url)
+    d = serve.listen(path, model, cli._cmds())
+    thread = threading.Thread(target=d.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield master, path
+    d.shutdown()
+    d.server_close()
+
+
+def args(*argv):
+    return docopt.docopt(cli.__doc__, argv=['management'] + list(argv))
+
+
+def test_list_is_served_warm(daemon, capsys):
+    master, path = daemon
+    requests = len(master.requests)
+
+    assert dispatch.delegate(args('maintenance', 'list')) == 0
+    out = capsys.readouterr()[0]
+    assert "a1" in out and "DRAINING" in out
+    assert len(master.requests) == requests
+
+
+def test_mutation_reads_schedule_live(daemon, capsys):
+    master, path = daemon
+
+    assert dispatch.delegate(args('maintenance', 'schedule', 'remove', 'a1')) == 0
+    assert "Schedules updated" in capsys.readouterr()[0]
+    assert ('GET', '/maintenance/schedule') in master.requests[3:]
+    assert master.posts == [('/maintenance/schedule', {"windows": []})]
+
+
+def test_model_refreshed_once_per_mutation(daemon, capsys):
+    master, path = daemon
+
+    assert dispatch.delegate(args('maintenance', 'down', 'a0', 'a2', '--chunk-size=1')) == 0
+    assert [p for p, _ in master.posts] == [
+        '/maintenance/schedule', '/machine/down', '/machine/down']
+    first_post = master.requests.index(('POST', '/maintenance/schedule'))
+    assert master.requests[first_post:].count(('GET', '/maintenance/status')) == 1
+    assert master.requests[-2:] in ([('GET', '/maintenance/schedule'),
+                                     ('GET', '/maintenance/status')],
+                                    [('GET', '/maintenance/status'),
+                                     ('GET', '/maintenance/schedule')])
+
+
+def test_no_daemon_and_bypass(daemon, tmpdir, monkeypatch):
+    assert dispatch.delegate(args('maintenance', 'list', '--no-cache')) is None
+    assert dispatch.call(str(tmpdir.join("none.sock")), {}) is None
+    with pytest.raises(Exception):
+        serve.listen(daemon[1], None, [])
+
+
+def test_sweep_expired(daemon, tmpdir, capsys):
+    master, path = daemon
+    model = serve.Model(sources.MasterSource(no_cache=True))
+    model.refresh()
+    d = serve.listen(str(tmpdir.join("sweep.sock")), model, [])
+
+    d.sweep()
+
+    assert master.posts == [('/maintenance/schedule', {"windows": []})]
+    assert "1 host(s) reclaimed" in capsys.readouterr()[0]
+    d.sweep()
+    assert len(master.posts) == 1
+    d.server_close()
@@ -0,0 +1,53 @@
+import gzip
+
+import pytest
+
+from dcos.errors import DCOSException
+from dcos_management import sources
+from dcos_management.machines import AgentRecord, MachineId
+from dcos_management.maintenance import Maintenance
+
+DATASETS = {
+    "agents": {"slaves": [{"hostname": "a0", "pid": "slave(1)@10.0.0.0:5051",
+                           "id": "S0"}]},
+    "schedule": {"windows": []},
+    "status": {},
+}
+
+
+def test_snapshot_round_trip(tmpdir):
+    path = str(tmpdir.join("snapshot.gz"))
+    sources.save_snapshot(path, "http://master/", DATASETS)
+
+    source = sources.SnapshotSource(path)
+    assert source.url == "http://master/"
+    assert not source.cacheable
+    assert source.fetch("agents") == DATASETS["agents"]
+
+    m = Maintenance(source=source)
+    assert m.agents == [AgentRecord(MachineId("a0", "10.0.0.0"), "S0", None)]
+    assert m.cache is None
+
+
+def test_snapshot_post_is_not_sent(tmpdir, capsys):
+    path = str(tmpdir.join("snapshot.gz"))
+    sources.save_snapshot(path, "http://master/", DATASETS)
+    source = sources.SnapshotSource(path)
+
+    scheduled = {"windows": [{"machine_ids": [{"hostname": "a0", "ip": "10.0.0.0"}],
+                              "unavailability": {"start": {"nanoseconds": 0}}}]}
+    source.post("maintenance/schedule", scheduled)
+
+    assert "not sent: POST maintenance/schedule" in capsys.readouterr()[0]
+    assert source.fetch("schedule") == scheduled
+    assert sources.SnapshotSource(path).fetch("schedule") == {"windows": []}
+
+
+def test_invalid_snapshot(tmpdir):
+    path = str(tmpdir.join("snapshot.gz"))
+    with gzip.open(path, 'wb') as f:
+        f.write(b'{"format": 0}')
+    with pytest.raises(DCOSException):
+        sources.SnapshotSource(path)
+    with pytest.raises(DCOSException):
+        sources.SnapshotSource(str(tmpdir.join("missing.gz")))
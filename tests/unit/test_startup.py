@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+IMPORT_BUDGET_US = 100000
+"""Max cumulative import time of the CLI module, in microseconds, generous
+to leave room for slow machines"""
+
+HEAVY_MODULES = ['dcos.util', 'dcos.http', 'dcos.mesos', 'dcos.emitting',
+                 'dcoscli', 'docopt', 'requests', 'concurrent', 'concurrent.futures']
+
+
+def run(code, *options):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p or '.' for p in sys.path))
+    process = subprocess.Popen([sys.executable] + list(options) + ['-c', code],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               env=env)
+    stdout, stderr = process.communicate()
+    assert process.returncode == 0, stderr
+    return stdout.decode('utf-8'), stderr.decode('utf-8')
+
+
+@pytest.mark.parametrize('argv', [['management', '--info'], ['--version'],
+                                  ['management', 'complete', '--', 'management', '']])
+def test_fast_path_imports_nothing_heavy(argv):
+    stdout, _ = run("import sys\n"
+                    "from dcos_management import cli\n"
+                    "sys.argv = ['dcos-management'] + {!r}\n"
+                    "cli.main()\n"
+                    "print(sorted(m for m in {!r} if m in sys.modules))".format(
+                        argv, HEAVY_MODULES))
+    assert stdout.splitlines()[-1] == '[]'
+
+
+def test_cli_import_loads_nothing_heavy():
+    stdout, _ = run("import sys\n"
+                    "import dcos_management.cli\n"
+                    "print(sorted(m for m in {!r} if m in sys.modules))".format(HEAVY_MODULES))
+    assert stdout.splitlines()[-1] == '[]'
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="needs python -X importtime")
+def test_import_time_budget():
+    _, stderr = run("import dcos_management.cli", '-X', 'importtime')
+    cumulative = dict((line.split('|')[2].strip(), int(line.split('|')[1]))
+                      for line in stderr.splitlines()[1:]
+                      if line.startswith('import time:'))
+    assert cumulative['dcos_management.cli'] < IMPORT_BUDGET_US
@@ -0,0 +1,71 @@
+import threading
+
+from dcos.errors import DCOSException, DCOSHTTPException
+from dcos_management import submit
+from dcos_management.machines import MachineId
+
+MACHINES = [MachineId("a%d" % i, "10.0.0.%d" % i) for i in range(16)]
+
+
+class Response(object):
+    reason = "Bad Request"
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+
+class Master(object):
+    """Refuses any request holding a bad machine"""
+
+    def __init__(self, bad=(), status_code=400):
+        self.bad = set(bad)
+        self.status_code = status_code
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def post(self, chunk):
+        with self.lock:
+            self.requests.append(chunk)
+        bad = [m for m in chunk if m in self.bad]
+        if bad:
+            raise DCOSHTTPException(Response(self.status_code,
+                                             "Machine {} is invalid".format(bad[0].hostname)))
+
+
+def test_split():
+    assert submit.split(list(range(5)), 2) == [[0, 1], [2, 3], [4]]
+    assert submit.split([], 2) == []
+
+
+def test_chunks_are_reported():
+    master = Master()
+    reports = []
+    accepted, failed = submit.submit(master.post, MACHINES, chunk_size=5, parallel=2,
+                                     report=lambda *r: reports.append(r))
+    assert sorted(accepted) == sorted(MACHINES) and failed == []
+    assert sorted(len(r) for r in master.requests) == [1, 5, 5, 5]
+    assert sorted((n, count, len(a)) for n, count, a, _ in reports) == [
+        (1, 4, 5), (2, 4, 5), (3, 4, 5), (4, 4, 1)]
+
+
+def test_refused_chunks_are_bisected():
+    master = Master(bad=[MACHINES[3], MACHINES[12]])
+    accepted, failed = submit.submit(master.post, MACHINES, chunk_size=16)
+    assert sorted(accepted) == sorted(set(MACHINES) - master.bad)
+    assert sorted(failed) == [(MACHINES[12], "HTTP 400: Machine a12 is invalid"),
+                              (MACHINES[3], "HTTP 400: Machine a3 is invalid")]
+    # one request per level of bisection and bad machine, at most
+    assert len(master.requests) <= 1 + 2 * 2 * 4
+
+
+def test_unavailable_master_is_not_bisected():
+    master = Master(bad=[MACHINES[0]], status_code=401)
+    accepted, failed = submit.submit(master.post, MACHINES[:8], chunk_size=8)
+    assert accepted == [] and len(failed) == 8 and len(master.requests) == 1
+
+    def unreachable(chunk):
+        raise DCOSException("URL [http://master/] is unreachable")
+
+    accepted, failed = submit.submit(unreachable, MACHINES[:2], chunk_size=8)
+    assert failed == [(m, "URL [http://master/] is unreachable") for m in MACHINES[:2]]
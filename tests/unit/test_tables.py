@@ -0,0 +1,42 @@
+import json
+
+import pytest
+from dcos.errors import DCOSException
+from dcos_management import tables
+
+ROWS = [
+    {"hostname": "b", "ip": "10.0.0.2", "id": "", "state": "DRAINING",
+     "start": 10, "duration": 3600, "expired": False},
+    {"hostname": "agent-a", "ip": "10.0.0.1", "id": "S1", "state": "DOWN",
+     "start": "None", "duration": None, "expired": True},
+]
+
+
+def test_maintenance_table():
+    assert tables.maintenance_table(ROWS).split("\n") == [
+        "HOST     IP        ID  STATE     START  DURATION  EXPIRED  ",
+        "agent-a  10.0.0.1  S1  DOWN      None       None    True   ",
+        "b        10.0.0.2      DRAINING  10         3600   False   ",
+    ]
+
+
+def test_empty_tables():
+    assert tables.maintenance_table([]) == ""
+    assert tables.clusters_table([], ["HOST"]) == ""
+
+
+def test_columns_and_sort():
+    columns = tables.parse_columns("host,START")
+
+    assert tables.maintenance_table(ROWS, columns, "start").split("\n") == [
+        "HOST     START  ", "b        10     ", "agent-a  None   "]
+    with pytest.raises(DCOSException):
+        tables.parse_columns("HOST,nope")
+
+
+def test_ndjson():
+    lines = list(tables.ndjson(iter(ROWS), ["HOST", "STATE"]))
+
+    assert [json.loads(line) for line in lines] == [
+        {"hostname": "b", "state": "DRAINING"},
+        {"hostname": "agent-a", "state": "DOWN"}]
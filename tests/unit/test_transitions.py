@@ -0,0 +1,36 @@
+from dcos_management import schedule, transitions
+from dcos_management.machines import MachineId
+
+A0 = MachineId("a0", "10.0.0.0")
+A1 = MachineId("a1", "10.0.0.1")
+A2 = MachineId("a2", "10.0.0.2")
+
+
+def test_calls_are_ordered_and_minimal():
+    base = {"windows": [schedule.window([A0, A1], 0, 10)]}
+
+    plan = transitions.Plan(base, windows=[schedule.window([A2], 5, 10)], down=[A2, A1])
+    assert [path for path, _ in plan.calls()] == [
+        "maintenance/schedule", "machine/down"]
+    assert plan.scheduled == {"windows": [schedule.window([A0, A1], 0, 10),
+                                          schedule.window([A2], 5, 10)]}
+
+    plan = transitions.Plan(base, unscheduled=[A1], up=[A0])
+    assert plan.calls() == [("maintenance/schedule", {"windows": [schedule.window([A0], 0, 10)]}),
+                            ("machine/up", [A0])]
+
+
+def test_unchanged_schedule_is_not_posted():
+    base = {"windows": [schedule.window([A0], 0, 10)]}
+
+    assert transitions.Plan(base, windows=[schedule.window([A0], 0, 10)],
+                            down=[A0]).calls() == [("machine/down", [A0])]
+    assert transitions.Plan(base, unscheduled=[A2]).calls() == []
+    assert transitions.Plan(None).calls() == []
+
+
+def test_plan_applies_on_top_of_a_changed_schedule():
+    plan = transitions.Plan({"windows": [schedule.window([A0, A1], 0, 10)]}, unscheduled=[A1])
+    changed = {"windows": [schedule.window([A0, A1], 0, 10), schedule.window([A2], 20, 10)]}
+    assert plan.apply(changed) == {"windows": [schedule.window([A0], 0, 10),
+                                               schedule.window([A2], 20, 10)]}
@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+from dcos_management import watch
+from dcos_management.client import MasterClient
+
+
+def _agent(id_, hostname, ip):
+    return {"agent_info": {"hostname": hostname, "id": {"value": id_}},
+            "pid": "slave(1)@{}:5051".format(ip)}
+
+
+EVENTS = [
+    {"type": "SUBSCRIBED", "subscribed": {"get_state": {"get_agents": {
+        "agents": [_agent("S1", "a1", "10.0.0.1"),
+                   _agent("S2", "a2", "10.0.0.2")]}}}},
+    {"type": "HEARTBEAT"},
+    {"type": "AGENT_REMOVED", "agent_removed": {"agent_id": {"value": "S2"}}},
+]
+
+
+@pytest.fixture
+def client(tmpdir, monkeypatch):
+    """Client of the given master"""
+    def build(master, token=None):
+        path = tmpdir.join("dcos.toml")
+        path.write('[core]\nmesos_master_url = "{}"\n'.format(master.url))
+        monkeypatch.setenv("DCOS_CONFIG", str(path))
+        return MasterClient(no_cache=True, token=token)
+    return build
+
+
+def test_read_recordio_across_chunks():
+    chunks = [b'8\n{"a": 1', b'}8\n{"b": 2}']
+
+    assert list(watch.read_recordio(chunks)) == [{"a": 1}, {"b": 2}]
+
+
+def test_subscribe_to_fake_master(fake_master, client):
+    master = fake_master(events=EVENTS)
+
+    events = list(watch.subscribe(client(master, token="secret")))
+
+    assert events == EVENTS
+    assert master.authorizations == ["token=secret"]
+
+
+def test_event_agents():
+    agents = watch.EventAgents()
+    for event in EVENTS:
+        agents.apply(event)
+
+    assert agents.state_summary() == {"slaves": [
+        {"hostname": "a1", "pid": "slave(1)@10.0.0.1:5051", "id": "S1"}]}
+
+
+def test_view_reports_changed_rows_only():
+    view = watch.MaintenanceView()
+    a = {"hostname": "a", "ip": "1", "state": "DRAINING"}
+    b = {"hostname": "b", "ip": "2", "state": "DRAINING"}
+
+    assert view.update([a, b]) == [("+", dict(a, id=None, start=None,
+                                              duration=None, expired=None)),
+                                   ("+", dict(b, id=None, start=None,
+                                              duration=None, expired=None))]
+    assert view.update([a, b]) == []
+    changes = view.update([dict(a, state="DOWN")])
+    assert [(m, r['hostname'], r['state']) for m, r in changes] == [
+        ("~", "a", "DOWN"), ("-", "b", "DRAINING")]
+
+
+def _run(events, updates, interval=0.01):
+    calls = []
+    lines = []
+
+    def load_rows(state_summary, refetch):
+        calls.append((state_summary, refetch))
+        return [{"hostname": "a1", "ip": "10.0.0.1", "state": "DRAINING"}]
+
+    watch.run(load_rows, lines.append, events=events, interval=interval, updates=updates)
+    return calls, lines
+
+
+def test_run_uses_streamed_agents(fake_master, client):
+    master = fake_master(events=EVENTS, stream_hold=5)
+
+    calls, lines = _run(watch.subscribe(client(master)), 3)
+
+    assert [c[0] for c in calls] == [{"slaves": [
+        {"hostname": "a1", "pid": "slave(1)@10.0.0.1:5051", "id": "S1"}]}] * 3
+    # intervals passed
+    assert [c[1] for c in calls[1:]] == [True, True]
+    assert len(lines) == 2
+    assert lines[1].startswith("+ a1 ")
+
+
+def test_run_renders_agent_changes_only():
+    released = threading.Event()
+
+    def events():
+        yield EVENTS[0]
+        yield {"type": "HEARTBEAT"}
+        time.sleep(0.2)
+        for _ in range(3):
+            yield {"type": "TASK_UPDATED"}
+        time.sleep(0.2)
+        yield {"type": "AGENT_REMOVED", "agent_removed": {"agent_id": {"value": "S1"}}}
+        released.wait(5)
+
+    calls, _ = _run(events(), 2, interval=30)
+    released.set()
+
+    # rendered again for the removed agent only, on the last status and schedule
+    assert [len(c[0]["slaves"]) for c in calls] == [2, 1]
+    assert [c[1] for c in calls] == [True, False]
+
+
+def test_run_falls_back_to_polling(fake_master, client):
+    master = fake_master(events=EVENTS)
+    ended = threading.Event()
+    lost = "Master event stream lost, polling every 0.1s"
+    polled = []
+    lines = []
+
+    def events():
+        for event in watch.subscribe(client(master)):
+            yield event
+        ended.set()
+
+    def load_rows(state_summary, refetch):
+        # the stream may end before or after a first render of streamed
+        # agents, never after a second one
+        ended.wait(5)
+        if lost in lines:
+            polled.append((state_summary, refetch))
+        return [{"hostname": "a1", "ip": "10.0.0.1", "state": "DRAINING"}]
+
+    watch.run(load_rows, lines.append, events=events(), interval=0.1, updates=3)
+
+    assert lost in lines
+    assert polled[-2:] == [(None, True), (None, True)]